@@ -9,6 +9,142 @@ import io
 from typing import Dict, Optional, Tuple
 from loguru import logger
 
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Columnas de la matriz de features por frame (F0 + energía)
+FEAT_F0 = 0  # Hz (0 = no sonoro)
+FEAT_VOICING = 1  # Pico de autocorrelación normalizado (0-1)
+FEAT_F0_SEMITONES = 2  # F0 en semitonos respecto a 100 Hz (0 = no sonoro)
+FEAT_RMS = 3
+FEAT_ENERGY_DB = 4  # dBFS
+FEAT_BAND_LOW_DB = 5  # < 500 Hz
+FEAT_BAND_MID_DB = 6  # 500 - 2000 Hz
+FEAT_BAND_HIGH_DB = 7  # > 2000 Hz
+FEAT_ZCR = 8
+FEAT_SPECTRAL_CENTROID = 9  # Hz
+FEAT_PEAK = 10
+N_FRAME_FEATURES = 11
+
+FRAME_HOP = 512  # 32ms a 16kHz
+DB_FLOOR = -100.0
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True, fastmath=True, boundscheck=False)
+    def _frame_features_kernel(frames, power, autocorr, freqs, sample_rate,
+                               min_lag, max_lag, voicing_threshold, out):
+        """
+        Reducciones por frame (F0, energía, bandas, ZCR, centroide, pico) en una
+        sola pasada compilada, sin arrays temporales. La FFT se hace en NumPy.
+        """
+        n, hop = frames.shape
+        n_bins = power.shape[1]
+        eps = 1e-10
+
+        for i in range(n):
+            # F0 por autocorrelación
+            best_lag = min_lag
+            best = autocorr[i, min_lag]
+            for lag in range(min_lag + 1, max_lag + 1):
+                if autocorr[i, lag] > best:
+                    best = autocorr[i, lag]
+                    best_lag = lag
+            voicing = best / (autocorr[i, 0] + eps)
+
+            # Dominio temporal: energía, pico, cruces por cero
+            sq = 0.0
+            peak = 0.0
+            crossings = 0
+            prev_neg = frames[i, 0] < 0
+            for j in range(hop):
+                x = frames[i, j]
+                sq += x * x
+                a = abs(x)
+                if a > peak:
+                    peak = a
+                neg = x < 0
+                if neg != prev_neg:
+                    crossings += 1
+                prev_neg = neg
+            rms = np.sqrt(sq / hop)
+            energy_db = max(20.0 * np.log10(rms + eps), DB_FLOOR)
+
+            # Dominio espectral: bandas y centroide
+            low = 0.0
+            mid = 0.0
+            high = 0.0
+            weighted = 0.0
+            for k in range(n_bins):
+                p = power[i, k]
+                f = freqs[k]
+                weighted += p * f
+                if f < 500.0:
+                    low += p
+                elif f >= 2000.0:
+                    high += p
+                else:
+                    mid += p
+            total = low + mid + high + eps
+
+            voiced = voicing > voicing_threshold and energy_db > DB_FLOOR / 2
+            f0 = sample_rate / best_lag if voiced else 0.0
+
+            out[i, FEAT_F0] = f0
+            out[i, FEAT_VOICING] = min(max(voicing, 0.0), 1.0)
+            out[i, FEAT_F0_SEMITONES] = 12.0 * np.log2(max(f0, eps) / 100.0) if voiced else 0.0
+            out[i, FEAT_RMS] = rms
+            out[i, FEAT_ENERGY_DB] = energy_db
+            out[i, FEAT_BAND_LOW_DB] = max(10.0 * np.log10(low + eps), DB_FLOOR)
+            out[i, FEAT_BAND_MID_DB] = max(10.0 * np.log10(mid + eps), DB_FLOOR)
+            out[i, FEAT_BAND_HIGH_DB] = max(10.0 * np.log10(high + eps), DB_FLOOR)
+            out[i, FEAT_ZCR] = crossings / hop
+            out[i, FEAT_SPECTRAL_CENTROID] = weighted / total
+            out[i, FEAT_PEAK] = peak
+
+
+class ProsodyIncrementalState:
+    """
+    Estado incremental de prosodia por conversación.
+
+    Guarda las features de cada frame ya analizado en un ring buffer
+    (frame i = muestras [i * FRAME_HOP, (i + 1) * FRAME_HOP)), de modo que
+    cada chunk nuevo solo requiere analizar el audio recién llegado.
+    """
+
+    def __init__(self, max_frames: int = 1024):
+        self.max_frames = max_frames
+        self.frame_features = np.zeros((max_frames, N_FRAME_FEATURES), dtype=np.float32)
+        self.n_frames_committed = 0
+        self.last_decision: Optional[Dict] = None
+        self._pending = np.empty(0, dtype=np.int16)  # Muestras que no completan un frame
+        self._max_energy_db = DB_FLOOR
+        self._energy_db_sum = 0.0
+
+    def reset(self):
+        """Reinicia el estado al comenzar un nuevo turno"""
+        self.n_frames_committed = 0
+        self.last_decision = None
+        self._pending = np.empty(0, dtype=np.int16)
+        self._max_energy_db = DB_FLOOR
+        self._energy_db_sum = 0.0
+
+    @property
+    def n_samples(self) -> int:
+        """Muestras recibidas en el turno actual"""
+        return self.n_frames_committed * FRAME_HOP + len(self._pending)
+
+    def window(self, n_frames: int) -> np.ndarray:
+        """Features de los últimos n_frames (copia contigua, sin importar el wrap)"""
+        n_frames = min(n_frames, self.n_frames_committed, self.max_frames)
+        start = self.n_frames_committed - n_frames
+        idx = np.arange(start, self.n_frames_committed) % self.max_frames
+        return self.frame_features[idx]
+
 
 class ProsodyAnalyzer:
     """
@@ -29,9 +165,179 @@ class ProsodyAnalyzer:
         self.thinking_pause_max = 2.5  # segundos
         self.end_of_turn_pause = 1.5  # segundos
 
-    def analyze_audio(self, audio_bytes: bytes) -> Dict:
+        # Ventanas del análisis incremental
+        self.syllable_window = int(4 * 0.2 * sample_rate / FRAME_HOP)  # ~4 sílabas
+        self.context_window = int(3.0 * sample_rate / FRAME_HOP)  # ~3 segundos
+        self.voicing_threshold = 0.45
+        self.f0_min = 65.0
+        self.f0_max = 400.0
+
+        # Compilar el kernel al arrancar, no en el primer turno
+        if NUMBA_AVAILABLE:
+            self._extract_frame_features(np.zeros((1, FRAME_HOP), dtype=np.float32))
+
+    def append_audio(self, state: ProsodyIncrementalState, pcm) -> None:
+        """
+        Agrega audio PCM int16 (cualquier objeto con buffer protocol) al estado
+        incremental, calculando features solo para los frames nuevos.
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2)
+        if len(state._pending):
+            samples = np.concatenate((state._pending, samples))
+
+        n_new = len(samples) // FRAME_HOP
+        state._pending = samples[n_new * FRAME_HOP:].copy()
+        if n_new == 0:
+            return
+
+        frames = samples[:n_new * FRAME_HOP].reshape(n_new, FRAME_HOP).astype(np.float32)
+        frames *= 1.0 / 32768.0
+        features = self._extract_frame_features(frames)
+
+        # Escribir en el ring buffer (solo se conservan los últimos max_frames)
+        if n_new > state.max_frames:
+            features = features[-state.max_frames:]
+        idx = np.arange(
+            state.n_frames_committed + n_new - len(features),
+            state.n_frames_committed + n_new
+        ) % state.max_frames
+        state.frame_features[idx] = features
+        state.n_frames_committed += n_new
+
+        energy_db = features[:, FEAT_ENERGY_DB]
+        state._max_energy_db = max(state._max_energy_db, float(energy_db.max()))
+        state._energy_db_sum += float(energy_db.sum())
+
+    def analyze_incremental(self, state: ProsodyIncrementalState) -> Dict:
+        """
+        Clasifica el estado actual usando solo las ventanas recientes.
+        Mismo formato de salida que analyze_audio().
+        """
+        try:
+            if state.n_samples < self.sample_rate * 0.1 or state.n_frames_committed == 0:
+                return self._empty_analysis()
+
+            context = state.window(self.context_window)
+            rel_db = context[:, FEAT_ENERGY_DB] - state._max_energy_db
+
+            # Voz vs silencio (media de todo el turno, acumulada)
+            energy_turn_mean = state._energy_db_sum / state.n_frames_committed - state._max_energy_db
+            has_speech = bool(energy_turn_mean > self.silence_threshold)
+
+            # Pausa final
+            is_silence = rel_db < self.silence_threshold
+            voiced_idx = np.flatnonzero(~is_silence)
+            trailing_silence = len(is_silence) - (voiced_idx[-1] + 1) if len(voiced_idx) else len(is_silence)
+            pause_duration = trailing_silence * FRAME_HOP / self.sample_rate
+            is_thinking_pause = self.thinking_pause_min <= pause_duration <= self.thinking_pause_max
+
+            # Ritmo de habla (transiciones silencio-voz en la ventana de contexto)
+            transitions = int(np.count_nonzero(np.diff(is_silence.astype(np.int8))))
+            duration_minutes = len(context) * FRAME_HOP / (self.sample_rate * 60)
+            speech_rate = float(transitions / duration_minutes / 2.5) if duration_minutes > 0 else 150.0
+
+            # Pitch: contorno en el contexto, tendencia en la ventana de sílabas
+            f0_context = context[:, FEAT_F0]
+            f0_valid = f0_context[f0_context > 0]
+            f0_syllables = state.window(self.syllable_window)[:, FEAT_F0]
+            f0_syllables = f0_syllables[f0_syllables > 0]
+
+            pitch_trend = 1.0
+            split_point = int(len(f0_syllables) * 0.3)
+            if split_point > 0:
+                start_pitch = np.mean(f0_syllables[:split_point])
+                end_pitch = np.mean(f0_syllables[-split_point:])
+                pitch_trend = float(end_pitch / start_pitch) if start_pitch > 0 else 1.0
+
+            pitch_contour = f0_valid[-50:].tolist()
+            pitch_mean = float(np.mean(f0_valid)) if len(f0_valid) else 0.0
+            pitch_std = float(np.std(f0_valid)) if len(f0_valid) else 0.0
+            energy_mean = float(np.mean(rel_db))
+
+            emotional_tone = self._analyze_emotional_tone(pitch_std, energy_mean, speech_rate)
+            is_question = self._detect_question(f0_syllables.tolist(), pitch_trend)
+            should_wait = self._should_wait_for_more(pause_duration, is_question, has_speech)
+
+            state.last_decision = {
+                "is_question": is_question,
+                "has_speech": has_speech,
+                "pause_duration": float(pause_duration),
+                "is_thinking_pause": is_thinking_pause,
+                "should_wait": should_wait,
+                "pitch_contour": pitch_contour,
+                "pitch_mean": pitch_mean,
+                "pitch_std": pitch_std,
+                "energy_level": energy_mean,
+                "speech_rate": speech_rate,
+                "emotional_tone": emotional_tone,
+                "confidence": 0.85
+            }
+            return state.last_decision
+
+        except Exception as e:
+            logger.error(f"Error en análisis incremental de prosodia: {e}")
+            return self._empty_analysis()
+
+    def _extract_frame_features(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Calcula las features F0 + energía para un bloque de frames [n, FRAME_HOP]
         """
-        Análisis completo de audio para contexto conversacional
+        n = frames.shape[0]
+        out = np.empty((n, N_FRAME_FEATURES), dtype=np.float32)
+        sr = self.sample_rate
+        eps = 1e-10
+
+        # Espectro (zero-padding 2x para autocorrelación lineal)
+        spectrum = np.fft.rfft(frames, n=2 * FRAME_HOP, axis=1)
+        power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+        freqs = np.fft.rfftfreq(2 * FRAME_HOP, d=1.0 / sr)
+
+        # F0 por autocorrelación
+        autocorr = np.fft.irfft(power, axis=1)[:, :FRAME_HOP]
+        min_lag = int(sr / self.f0_max)
+        max_lag = min(int(sr / self.f0_min), FRAME_HOP - 1)
+
+        if NUMBA_AVAILABLE:
+            _frame_features_kernel(
+                frames, power, autocorr, freqs, float(sr),
+                min_lag, max_lag, float(self.voicing_threshold), out
+            )
+            return out
+
+        best_lag = np.argmax(autocorr[:, min_lag:max_lag + 1], axis=1) + min_lag
+        voicing = autocorr[np.arange(n), best_lag] / (autocorr[:, 0] + eps)
+
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        energy_db = np.maximum(20 * np.log10(rms + eps), DB_FLOOR)
+
+        voiced = (voicing > self.voicing_threshold) & (energy_db > DB_FLOOR / 2)
+        f0 = np.where(voiced, sr / best_lag, 0.0)
+
+        out[:, FEAT_F0] = f0
+        out[:, FEAT_VOICING] = np.clip(voicing, 0.0, 1.0)
+        out[:, FEAT_F0_SEMITONES] = np.where(voiced, 12 * np.log2(np.maximum(f0, eps) / 100.0), 0.0)
+        out[:, FEAT_RMS] = rms
+        out[:, FEAT_ENERGY_DB] = energy_db
+
+        # Energía por bandas
+        total_power = power.sum(axis=1) + eps
+        low = freqs < 500
+        high = freqs >= 2000
+        mid = ~(low | high)
+        for col, band in ((FEAT_BAND_LOW_DB, low), (FEAT_BAND_MID_DB, mid), (FEAT_BAND_HIGH_DB, high)):
+            out[:, col] = np.maximum(10 * np.log10(power[:, band].sum(axis=1) + eps), DB_FLOOR)
+
+        signs = np.signbit(frames)
+        out[:, FEAT_ZCR] = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / FRAME_HOP
+        out[:, FEAT_SPECTRAL_CENTROID] = (power @ freqs) / total_power
+        out[:, FEAT_PEAK] = np.abs(frames).max(axis=1)
+
+        return out
+
+    def analyze_audio(self, audio_bytes) -> Dict:
+        """
+        Análisis completo de audio para contexto conversacional.
+        Acepta bytes o cualquier objeto con buffer protocol (memoryview).
 
         Returns:
             {
@@ -323,20 +629,24 @@ class ProsodyAnalyzer:
         # Default: esperar si pausa < 1.5s
         return pause_duration < self.end_of_turn_pause
 
-    def _bytes_to_numpy(self, audio_bytes: bytes) -> np.ndarray:
+    def _bytes_to_numpy(self, audio_bytes) -> np.ndarray:
         """
-        Convierte bytes de audio a numpy array
+        Convierte audio (bytes, bytearray o memoryview) a numpy array.
+        El PCM raw se lee sin copiar el buffer original.
         """
-        try:
-            # Intentar cargar como WAV
-            audio_io = io.BytesIO(audio_bytes)
-            audio, sr = librosa.load(audio_io, sr=self.sample_rate, mono=True)
-            return audio
-        except Exception:
-            # Si falla, asumir PCM raw
-            audio_np = np.frombuffer(audio_bytes, dtype=np.int16)
-            audio = audio_np.astype(np.float32) / 32768.0
-            return audio
+        if bytes(audio_bytes[:4]) == b"RIFF":
+            try:
+                # Cargar como WAV
+                audio_io = io.BytesIO(audio_bytes)
+                audio, sr = librosa.load(audio_io, sr=self.sample_rate, mono=True)
+                return audio
+            except Exception:
+                pass
+
+        # PCM raw
+        audio_np = np.frombuffer(audio_bytes, dtype=np.int16, count=len(audio_bytes) // 2)
+        audio = audio_np.astype(np.float32) / 32768.0
+        return audio
 
     def _empty_analysis(self) -> Dict:
         """
@@ -57,13 +57,13 @@ class TargetSpeakerExtractor:
             logger.error(f"Error cargando modelos: {e}")
             raise
 
-    def create_voice_profile(self, audio_bytes: bytes, sample_rate: int = 16000) -> torch.Tensor:
+    def create_voice_profile(self, audio_bytes, sample_rate: int = 16000) -> torch.Tensor:
         """
         Crea un perfil de voz (embedding) a partir de audio de referencia.
         Usa los primeros segundos de audio del cliente para crear su "firma de voz".
 
         Args:
-            audio_bytes: Audio en formato bytes (WAV)
+            audio_bytes: Audio WAV, PCM int16 (bytes, bytearray o memoryview) o ndarray float32/int16
             sample_rate: Frecuencia de muestreo del audio
 
         Returns:
@@ -89,7 +89,7 @@ class TargetSpeakerExtractor:
 
     def extract_target_speaker(
         self,
-        audio_bytes: bytes,
+        audio_bytes,
         target_embedding: torch.Tensor,
         sample_rate: int = 16000,
         similarity_threshold: float = 0.5
@@ -98,7 +98,7 @@ class TargetSpeakerExtractor:
         Extrae la voz del hablante objetivo del audio mezclado.
 
         Args:
-            audio_bytes: Audio mezclado (cliente + ruido + otras voces)
+            audio_bytes: Audio mezclado (cliente + ruido + otras voces), bytes, memoryview o ndarray
             target_embedding: Perfil de voz del hablante objetivo
             sample_rate: Frecuencia de muestreo
             similarity_threshold: Umbral de similitud para considerar que es el hablante (0-1)
@@ -214,32 +214,42 @@ class TargetSpeakerExtractor:
 
         return output_waveform
 
-    def _bytes_to_tensor(self, audio_bytes: bytes, sample_rate: int) -> torch.Tensor:
+    def _bytes_to_tensor(self, audio_bytes, sample_rate: int) -> torch.Tensor:
         """
-        Convierte bytes de audio a tensor PyTorch
+        Convierte audio (bytes, bytearray, memoryview o ndarray) a tensor PyTorch.
+        El PCM raw y los arrays float32 se leen sin copiar el buffer original.
         """
-        # Intentar cargar como WAV desde bytes
-        try:
-            audio_io = io.BytesIO(audio_bytes)
-            waveform, sr = torchaudio.load(audio_io)
-
-            # Resamplear si es necesario
-            if sr != sample_rate:
-                resampler = torchaudio.transforms.Resample(sr, sample_rate)
-                waveform = resampler(waveform)
-
-            # Convertir a mono si es estéreo
-            if waveform.shape[0] > 1:
-                waveform = torch.mean(waveform, dim=0, keepdim=True)
-
-            return waveform
-
-        except Exception:
-            # Si falla, asumir que son samples PCM raw
-            audio_np = np.frombuffer(audio_bytes, dtype=np.int16)
-            waveform = torch.from_numpy(audio_np).float() / 32768.0
-            waveform = waveform.unsqueeze(0)  # Add channel dimension
-            return waveform
+        # Samples ya decodificados (float32 en [-1, 1] o int16)
+        if isinstance(audio_bytes, np.ndarray):
+            if audio_bytes.dtype == np.float32:
+                return torch.from_numpy(audio_bytes).unsqueeze(0)
+            waveform = torch.from_numpy(audio_bytes.astype(np.float32)) / 32768.0
+            return waveform.unsqueeze(0)
+
+        # Cargar como WAV si tiene cabecera RIFF
+        if bytes(audio_bytes[:4]) == b"RIFF":
+            try:
+                audio_io = io.BytesIO(audio_bytes)
+                waveform, sr = torchaudio.load(audio_io)
+
+                # Resamplear si es necesario
+                if sr != sample_rate:
+                    resampler = torchaudio.transforms.Resample(sr, sample_rate)
+                    waveform = resampler(waveform)
+
+                # Convertir a mono si es estéreo
+                if waveform.shape[0] > 1:
+                    waveform = torch.mean(waveform, dim=0, keepdim=True)
+
+                return waveform
+            except Exception:
+                pass
+
+        # Samples PCM raw
+        audio_np = np.frombuffer(audio_bytes, dtype=np.int16, count=len(audio_bytes) // 2)
+        waveform = torch.from_numpy(audio_np.astype(np.float32)) / 32768.0
+        waveform = waveform.unsqueeze(0)  # Add channel dimension
+        return waveform
 
     def _tensor_to_bytes(self, waveform: torch.Tensor, sample_rate: int) -> bytes:
         """
@@ -15,7 +15,8 @@ import json
 import logging
 from typing import Dict, Any, Optional, Literal
 from pathlib import Path
-import httpx
+
+from service_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -200,18 +201,18 @@ class AdaptiveCallFlow:
     async def _preprocess_audio(self, audio: bytes) -> bytes:
         """Preprocesa audio (eliminación de ruido, etc.)"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.service_urls['audio_preprocess']}/denoise",
-                    content=audio,
-                    headers={"Content-Type": "audio/raw"}
-                )
-
-                if response.status_code == 200:
-                    return response.content
-                else:
-                    logger.warning(f"Audio preprocessing falló: {response.status_code}")
-                    return audio  # Retornar original
+            response = await get_http_client().post(
+                f"{self.service_urls['audio_preprocess']}/denoise",
+                content=audio,
+                headers={"Content-Type": "audio/raw"},
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                return response.content
+            else:
+                logger.warning(f"Audio preprocessing falló: {response.status_code}")
+                return audio  # Retornar original
 
         except Exception as e:
             logger.error(f"Error en preprocessing: {e}")
@@ -220,19 +221,19 @@ class AdaptiveCallFlow:
     async def _transcribe(self, audio: bytes) -> str:
         """Transcribe audio a texto usando STT"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.service_urls['stt']}/transcribe",
-                    content=audio,
-                    headers={"Content-Type": "audio/raw"}
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("text", "")
-                else:
-                    logger.error(f"STT error: {response.status_code}")
-                    return ""
+            response = await get_http_client().post(
+                f"{self.service_urls['stt']}/transcribe",
+                content=audio,
+                headers={"Content-Type": "audio/raw"},
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("text", "")
+            else:
+                logger.error(f"STT error: {response.status_code}")
+                return ""
 
         except Exception as e:
             logger.error(f"Error en transcripción: {e}")
@@ -241,21 +242,21 @@ class AdaptiveCallFlow:
     async def _generate_response(self, text: str, conversation_id: str) -> str:
         """Genera respuesta usando LLM"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.service_urls['llm']}/generate",
-                    json={
-                        "text": text,
-                        "conversation_id": conversation_id
-                    }
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("response", "")
-                else:
-                    logger.error(f"LLM error: {response.status_code}")
-                    return "Disculpa, no pude procesar tu solicitud."
+            response = await get_http_client().post(
+                f"{self.service_urls['llm']}/generate",
+                json={
+                    "text": text,
+                    "conversation_id": conversation_id
+                },
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("response", "")
+            else:
+                logger.error(f"LLM error: {response.status_code}")
+                return "Disculpa, no pude procesar tu solicitud."
 
         except Exception as e:
             logger.error(f"Error en LLM: {e}")
@@ -264,17 +265,17 @@ class AdaptiveCallFlow:
     async def _synthesize(self, text: str) -> bytes:
         """Sintetiza texto a audio usando TTS"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.service_urls['tts']}/synthesize",
-                    json={"text": text}
-                )
-
-                if response.status_code == 200:
-                    return response.content
-                else:
-                    logger.error(f"TTS error: {response.status_code}")
-                    return b""
+            response = await get_http_client().post(
+                f"{self.service_urls['tts']}/synthesize",
+                json={"text": text},
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                return response.content
+            else:
+                logger.error(f"TTS error: {response.status_code}")
+                return b""
 
         except Exception as e:
             logger.error(f"Error en síntesis: {e}")
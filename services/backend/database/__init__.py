@@ -4,8 +4,8 @@ Database Package
 Dual-database architecture: Local PostgreSQL + Supabase (remote).
 
 Usage (backwards compatible):
-    from database import Database, Conversation, Message
-    db = Database()
+    from database import get_database, Conversation, Message
+    db = get_database()
     await db.connect()
 """
 
@@ -21,7 +21,7 @@ from .connections import (
 )
 
 # Manager
-from .manager import DatabaseManager
+from .manager import DatabaseManager, get_database
 
 # Local models (Level 2 - operational)
 from .models_local import (
@@ -69,6 +69,7 @@ __all__ = [
     # Manager
     "DatabaseManager",
     "Database",
+    "get_database",
     # Local models
     "Conversation",
     "Message",
@@ -7,6 +7,7 @@ Manages two independent PostgreSQL connections:
 """
 
 import os
+import asyncio
 from typing import AsyncGenerator, Optional
 from contextlib import asynccontextmanager
 
@@ -45,7 +46,13 @@ def _get_local_url() -> str:
     user = os.getenv("POSTGRES_USER", "callcenter")
     password = os.getenv("POSTGRES_PASSWORD", "password")
     db = os.getenv("POSTGRES_DB", "callcenter")
-    return f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{db}"
+    # asyncpg prepares every statement; this is the per-connection LRU of prepared
+    # statements (parse + plan skipped on reuse). Hot vocabulary/metrics queries fit easily.
+    statement_cache = os.getenv("POSTGRES_STATEMENT_CACHE_SIZE", "500")
+    return (
+        f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{db}"
+        f"?prepared_statement_cache_size={statement_cache}"
+    )
 
 
 def _get_platform_url() -> str:
@@ -80,6 +87,12 @@ def _get_platform_url() -> str:
 # Engine and Session Factories
 # =============================================
 
+# Local pool: POSTGRES_POOL_SIZE persistent connections (opened at startup by
+# warm_local_pool) plus up to POSTGRES_POOL_MAX_OVERFLOW extra under bursts
+LOCAL_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", "10"))
+LOCAL_POOL_MAX_OVERFLOW = int(os.getenv("POSTGRES_POOL_MAX_OVERFLOW", "20"))
+LOCAL_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "10"))
+
 _local_engine: Optional[AsyncEngine] = None
 _local_session_factory: Optional[async_sessionmaker] = None
 
@@ -94,8 +107,9 @@ def get_local_engine() -> AsyncEngine:
         _local_engine = create_async_engine(
             _get_local_url(),
             echo=False,
-            pool_size=10,
-            max_overflow=20,
+            pool_size=LOCAL_POOL_SIZE,
+            max_overflow=LOCAL_POOL_MAX_OVERFLOW,
+            pool_timeout=LOCAL_POOL_TIMEOUT,
             pool_pre_ping=True,
         )
     return _local_engine
@@ -183,9 +197,31 @@ async def get_platform_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 # =============================================
-# Shutdown helpers
+# Startup / shutdown helpers
 # =============================================
 
+async def warm_local_pool(size: int = LOCAL_POOL_SIZE):
+    """
+    Open the persistent local connections up front (concurrently), so the
+    first calls don't pay TCP + auth handshakes one by one.
+    """
+    engine = get_local_engine()
+
+    async def _open():
+        return await engine.connect()
+
+    connections = await asyncio.gather(*(_open() for _ in range(size)), return_exceptions=True)
+    opened = 0
+    for conn in connections:
+        if isinstance(conn, BaseException):
+            continue
+        opened += 1
+        await conn.close()  # back to the pool, kept open
+    if opened < size:
+        logger.warning(f"Local database pool warm-up: {opened}/{size} connections")
+    else:
+        logger.info(f"Local database pool warmed: {opened} connections")
+
 async def dispose_all_engines():
     """Dispose both engines on application shutdown"""
     global _local_engine, _platform_engine
@@ -6,8 +6,10 @@ Provides the same methods as the existing Database class for backwards compatibi
 plus new methods for platform and cross-database operations.
 """
 
+import os
 import uuid
 import re
+import asyncio
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -22,6 +24,7 @@ from .connections import (
     get_platform_session,
     get_local_session_factory,
     dispose_all_engines,
+    warm_local_pool,
 )
 from .models_local import (
     Conversation,
@@ -37,6 +40,15 @@ from .models_local import (
 )
 
 
+# Write-behind batching for per-turn messages and call events
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "50"))
+DB_WRITE_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "0.1"))  # seconds
+DB_WRITE_QUEUE_SIZE = int(os.getenv("DB_WRITE_QUEUE_SIZE", "10000"))
+
+# Queued by _stop_flusher: the flusher writes the batch in hand and exits
+_STOP_FLUSHER = object()
+
+
 def _to_uuid(value) -> uuid.UUID:
     """Convert string or UUID to uuid.UUID"""
     if isinstance(value, uuid.UUID):
@@ -55,6 +67,8 @@ class DatabaseManager:
     def __init__(self):
         self._local_engine = None
         self._platform_engine = None
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
 
     # =========================================
     # Lifecycle
@@ -64,6 +78,7 @@ class DatabaseManager:
         """Initialize both database connections"""
         self._local_engine = get_local_engine()
         logger.info("Local database engine initialized")
+        await warm_local_pool()
 
         self._platform_engine = get_platform_engine()
         if self._platform_engine:
@@ -75,6 +90,7 @@ class DatabaseManager:
 
     async def disconnect(self):
         """Close all database connections"""
+        await self._stop_flusher()
         await dispose_all_engines()
         self._local_engine = None
         self._platform_engine = None
@@ -195,6 +211,96 @@ class DatabaseManager:
             )
             session.add(log)
 
+    # =========================================
+    # Batched writes (off the turn's critical path)
+    # =========================================
+
+    def queue_message(self, conversation_id: str, role: str, content: str, audio_path: Optional[str] = None):
+        """Like add_message, but non-blocking: the row is inserted by the background flusher"""
+        self._enqueue(Message(
+            id=uuid.uuid4(),
+            conversation_id=_to_uuid(conversation_id),
+            role=role,
+            content=content,
+            audio_path=audio_path,
+            timestamp=datetime.utcnow(),  # enqueue time keeps the turn order within a batch
+        ))
+
+    def queue_event(self, conversation_id: str, event_type: str, details: Optional[dict] = None):
+        """Like log_event, but non-blocking: the row is inserted by the background flusher"""
+        self._enqueue(CallLog(
+            conversation_id=_to_uuid(conversation_id),
+            event_type=event_type,
+            details=details or {},
+            created_at=datetime.utcnow(),
+        ))
+
+    def _enqueue(self, row):
+        if self._write_queue is None:
+            self._write_queue = asyncio.Queue(maxsize=DB_WRITE_QUEUE_SIZE)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_writes())
+        try:
+            self._write_queue.put_nowait(row)
+        except asyncio.QueueFull:
+            logger.warning(f"DB write queue full, dropping {type(row).__name__} row")
+
+    async def _flush_writes(self):
+        """Insert queued rows in batches of up to DB_WRITE_BATCH_SIZE, at most every DB_WRITE_FLUSH_INTERVAL"""
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self._write_queue.get()
+            if row is _STOP_FLUSHER:
+                return
+            rows = [row]
+            deadline = loop.time() + DB_WRITE_FLUSH_INTERVAL
+            while len(rows) < DB_WRITE_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._write_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP_FLUSHER:
+                    await self._insert_rows(rows)
+                    return
+                rows.append(row)
+            await self._insert_rows(rows)
+
+    async def _insert_rows(self, rows: list):
+        try:
+            async with get_local_session() as session:
+                session.add_all(rows)
+            return
+        except Exception as e:
+            if len(rows) == 1:
+                logger.error(f"DB write failed for {type(rows[0]).__name__} row: {e}")
+                return
+            logger.warning(f"Batched DB write failed ({len(rows)} rows), retrying row by row: {e}")
+
+        # One bad row (FK violation, bad value) must not drop the rest of the batch
+        for row in rows:
+            try:
+                async with get_local_session() as session:
+                    session.add(row)
+            except Exception as e:
+                logger.error(f"DB write failed for {type(row).__name__} row: {e}")
+
+    async def _stop_flusher(self):
+        """Stop the flusher after its current batch and write whatever is still queued"""
+        if self._flusher is not None:
+            if not self._flusher.done():
+                # Wait for room rather than cancel: a cancelled flusher loses the batch in hand
+                await self._write_queue.put(_STOP_FLUSHER)
+                await self._flusher
+            self._flusher = None
+        if self._write_queue is not None and not self._write_queue.empty():
+            rows = []
+            while not self._write_queue.empty():
+                rows.append(self._write_queue.get_nowait())
+            await self._insert_rows(rows)
+
     async def get_conversation_metrics(self, conversation_id: str) -> Dict:
         """Get aggregated metrics for a conversation"""
         conv_uuid = _to_uuid(conversation_id)
@@ -280,7 +386,7 @@ class DatabaseManager:
             await session.execute(text(converted_query), params)
 
     async def fetch(self, query: str, *args) -> List[Dict]:
-        """Fetch multiple rows from local database"""
+        """Fetch multiple rows from local database (plain dicts, ready to serialize as-is)"""
         async with get_local_session() as session:
             converted_query, params = self._convert_asyncpg_params(query, args)
             result = await session.execute(text(converted_query), params)
@@ -303,6 +409,15 @@ class DatabaseManager:
             row = result.first()
             return row[0] if row else None
 
+    async def stream(self, query: str, *args, batch_size: int = 500):
+        """Iterate rows of a raw SQL query through a server-side cursor (constant memory)"""
+        async with get_local_session() as session:
+            converted_query, params = self._convert_asyncpg_params(query, args)
+            result = await session.stream(text(converted_query), params)
+            async for partition in result.mappings().partitions(batch_size):
+                for row in partition:
+                    yield dict(row)
+
     @staticmethod
     def _convert_asyncpg_params(query: str, args: tuple) -> tuple:
         """Convert asyncpg $1, $2 style params to SQLAlchemy :p1, :p2 style"""
@@ -393,3 +508,15 @@ class DatabaseManager:
                 }
                 for r in regs
             ]
+
+
+# Singleton: one manager (and one batched-write queue) for the app and every router
+_database: Optional[DatabaseManager] = None
+
+
+def get_database() -> DatabaseManager:
+    """Get the shared DatabaseManager (engines and pools are process-wide as well)"""
+    global _database
+    if _database is None:
+        _database = DatabaseManager()
+    return _database
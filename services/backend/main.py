@@ -4,28 +4,36 @@ FastAPI application with WebSocket support for real-time voice processing
 """
 
 import os
+import re
+import time
 import uuid
 import asyncio
+import base64
+import struct
+import heapq
+import hashlib
 import json
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Union
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 import httpx
+import numpy as np
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from loguru import logger
 
-from database import Database, Conversation, Message
-from websocket_manager import ConnectionManager
-from outbound import router as outbound_router
+from database import get_database, Conversation, Message
+from websocket_manager import ConnectionManager, BackpressureGate, dumps_json, ORJSON_AVAILABLE
+from outbound import router as outbound_router, start_channel_poller, close_ari_client
 from vocabulary import router as vocabulary_router
-from webhooks import router as webhooks_router, trigger_webhook_event
+from webhooks import router as webhooks_router, enqueue_webhook_event, start_webhook_workers, stop_webhook_workers
 from config_manager import router as config_router, init_config_manager
 from adaptive_flow import initialize_adaptive_flow, get_current_flow
 from license_validator import get_license_validator
@@ -33,6 +41,9 @@ from license_admin import router as license_admin_router
 from admin_api import router as admin_api_router
 from client_api import router as client_api_router
 from auth import expire_old_tokens
+from response_cache import get_response_cache
+from service_client import get_http_client, close_http_client
+from vad import get_vad
 from __version__ import __version__, __license_required__
 
 # Configure loguru
@@ -99,9 +110,24 @@ async def lifespan(app: FastAPI):
     token_task = asyncio.create_task(_token_expiry_loop())
     logger.info("Token expiration scheduler started (every 1h)")
 
+    # Outbound webhook delivery
+    await start_webhook_workers()
+
+    # Outbound call status (one ARI poll for all calls)
+    start_channel_poller()
+
+    # Warm the greeting audio (TTS may still be starting; retried on first call)
+    run_in_background(generate_greeting_audio())
+
+    # Load the response cache embedding model before the first call needs it
+    run_in_background(response_cache.warm())
+
     yield
     # Shutdown
     token_task.cancel()
+    await stop_webhook_workers()
+    await close_http_client()
+    await close_ari_client()
     if __license_required__:
         try:
             license_validator = get_license_validator()
@@ -118,7 +144,9 @@ app = FastAPI(
     title="AI Call Center API",
     description="Backend API for AI-powered call center with VOIP integration",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson encodes REST responses (row lists, metrics) much faster than stdlib json
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
 )
 
 app.add_middleware(
@@ -168,17 +196,38 @@ async def vocabulary_manager():
     return {"message": "Vocabulary Manager", "api": "/vocabulary"}
 
 
-db = Database()
+db = get_database()
 manager = ConnectionManager()
+response_cache = get_response_cache()
 
-# Shared HTTP client with retry capability
-http_client = httpx.AsyncClient(timeout=60.0)
+# Shared pooled HTTP client for the internal services (retries via tenacity)
+http_client = get_http_client()
 
 # Global state for interruption handling
-conversation_playback_state = {}  # {conversation_id: {"is_speaking": bool, "task": asyncio.Task}}
+conversation_playback_state = {}  # {conversation_id: ConversationPlayback}
 
 # Global state for voice profiles (Target Speaker Extraction)
-conversation_voice_profiles = {}  # {conversation_id: {"profile": tensor, "audio_buffer": bytes}}
+conversation_voice_profiles = {}  # {conversation_id: {"profile": tensor, "pcm": float32 ndarray, "write_idx": int}}
+VOICE_PROFILE_SAMPLES = 16000 * 3  # 3 seconds at 16kHz
+# Hard cap of buffered user audio per connection (16kHz, 16-bit)
+MAX_TURN_AUDIO_BYTES = int(float(os.getenv("MAX_TURN_AUDIO_SECONDS", "6")) * 16000 * 2)
+
+# Strong references to fire-and-forget tasks (the event loop only keeps weak ones)
+_background_tasks = set()
+
+
+def _on_background_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Background task error: {task.exception()}")
+
+
+def run_in_background(coro) -> asyncio.Task:
+    """Schedule a coroutine off the turn's critical path"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+    return task
 
 # Import sentiment analysis function
 try:
@@ -191,6 +240,8 @@ except ImportError:
 # Target Speaker Extraction and Prosody Analysis (optional, improve quality)
 ENABLE_TARGET_EXTRACTION = os.getenv("ENABLE_TARGET_EXTRACTION", "false").lower() == "true"
 ENABLE_PROSODY_ANALYSIS = os.getenv("ENABLE_PROSODY_ANALYSIS", "true").lower() == "true"
+# Stream LLM tokens into sentence-level TTS in the main audio path (no function calling on that path)
+ENABLE_LLM_STREAMING = os.getenv("ENABLE_LLM_STREAMING", "false").lower() == "true"
 
 
 # ===========================================
@@ -239,7 +290,7 @@ if ENABLE_PROSODY_ANALYSIS:
     try:
         import sys
         sys.path.append(str(Path(__file__).parent.parent / "audio_preprocess"))
-        from prosody_analyzer import get_prosody_analyzer
+        from prosody_analyzer import get_prosody_analyzer, ProsodyIncrementalState
         prosody_analyzer = get_prosody_analyzer()
         logger.info("Prosody Analysis habilitado")
     except Exception as e:
@@ -274,8 +325,12 @@ async def call_denoise(audio_data: bytes) -> bytes:
     retry=retry_if_exception_type((httpx.ConnectError, httpx.ReadTimeout)),
     reraise=True
 )
-async def call_stt(audio_data: bytes, denoise: bool = True) -> str:
+async def call_stt(audio_data: Union[bytes, memoryview], denoise: bool = True) -> str:
     """Call STT service with optional noise suppression"""
+    # httpx needs bytes; audio usually arrives as a zero-copy memoryview
+    if not isinstance(audio_data, bytes):
+        audio_data = bytes(audio_data)
+
     # Apply noise suppression if enabled
     if ENABLE_DENOISE and denoise:
         try:
@@ -332,24 +387,291 @@ async def call_llm(conversation_id: str, message: str, use_tools: bool = False,
     }
 
 
+async def call_llm_stream(conversation_id: str, message: str, context: Optional[str] = None):
+    """Stream LLM response tokens (SSE) from the LLM service"""
+    payload = {
+        "conversation_id": conversation_id,
+        "message": message
+    }
+    if context:
+        payload["context"] = {"sentiment_guidance": context}
+
+    async with http_client.stream("POST", f"{LLM_URL}/chat/stream", json=payload, timeout=60.0) as stream:
+        stream.raise_for_status()
+        async for line in stream.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            token = line[6:]  # Remove "data: " prefix
+            if token == "[DONE]":
+                return
+            if token.startswith("[ERROR]"):
+                raise RuntimeError(f"LLM streaming error: {token}")
+            yield token
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=0.5, min=0.5, max=5),
     retry=retry_if_exception_type((httpx.ConnectError, httpx.ReadTimeout)),
     reraise=True
 )
-async def call_tts(text: str, return_bytes: bool = False) -> dict:
+async def _call_tts_remote(
+    text: str,
+    return_bytes: bool = False,
+    audio_format: str = "wav",
+    sample_rate: Optional[int] = None
+) -> dict:
     """Call TTS service with retry logic"""
     logger.debug(f"Calling TTS for text: {text[:30]}...")
+    payload = {"text": text, "return_bytes": return_bytes}
+    if return_bytes:
+        payload["format"] = audio_format
+        if sample_rate:
+            payload["sample_rate"] = sample_rate
     response = await http_client.post(
         f"{TTS_URL}/synthesize",
-        json={"text": text, "return_bytes": return_bytes},
+        json=payload,
         timeout=30.0
     )
     response.raise_for_status()
     if return_bytes:
-        return {"content": response.content}
-    return response.json()
+        duration_ms = int(response.headers.get("X-Audio-Duration-Ms", 0))
+        if not duration_ms:
+            if audio_format == "slin" and sample_rate:
+                duration_ms = len(response.content) * 1000 // (2 * sample_rate)
+            else:
+                duration_ms = wav_duration_ms(response.content)
+        return {"content": response.content, "duration_ms": duration_ms}
+    result = response.json()
+    duration_ms = int(result.get("duration_seconds", 0) * 1000)
+    if not duration_ms and result.get("audio_base64"):
+        duration_ms = wav_duration_ms(result["audio_base64"])
+    result["duration_ms"] = duration_ms
+    return result
+
+
+def wav_duration_ms(audio: Union[bytes, str]) -> int:
+    """
+    Audio duration from the WAV header, for providers that don't report it.
+    Accepts raw bytes or base64 (only the header is decoded).
+    """
+    try:
+        if isinstance(audio, str):
+            header = base64.b64decode(audio[:64])
+            total_bytes = len(audio) * 3 // 4 - audio[-2:].count("=")
+        else:
+            header = audio[:48]
+            total_bytes = len(audio)
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return 0
+        byte_rate = struct.unpack_from("<I", header, 28)[0]
+        return int((total_bytes - 44) * 1000 / byte_rate) if byte_rate else 0
+    except Exception:
+        return 0
+
+
+# TTS results for short repeated phrases (greeting, confirmations, fillers)
+TTS_CACHE_MAX_ENTRIES = int(os.getenv("TTS_CACHE_MAX_ENTRIES", "256"))
+TTS_CACHE_MAX_CHARS = int(os.getenv("TTS_CACHE_MAX_CHARS", "200"))
+_tts_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+
+async def call_tts(
+    text: str,
+    return_bytes: bool = False,
+    audio_format: str = "wav",
+    sample_rate: Optional[int] = None
+) -> dict:
+    """
+    Call TTS service, reusing cached audio for repeated short phrases.
+    With return_bytes, audio_format="slin" + sample_rate give raw PCM ready for
+    the telephony leg (no base64, no WAV header, no resampling here).
+    """
+    if len(text) > TTS_CACHE_MAX_CHARS or TTS_CACHE_MAX_ENTRIES <= 0:
+        return await _call_tts_remote(text, return_bytes, audio_format, sample_rate)
+
+    key = hashlib.blake2b(
+        f"{int(return_bytes)}|{audio_format}|{sample_rate}|{text}".encode(), digest_size=16
+    ).hexdigest()
+    cached = _tts_cache.get(key)
+    if cached is not None:
+        _tts_cache.move_to_end(key)
+        return cached
+
+    result = await _call_tts_remote(text, return_bytes, audio_format, sample_rate)
+    _tts_cache[key] = result
+    if len(_tts_cache) > TTS_CACHE_MAX_ENTRIES:
+        _tts_cache.popitem(last=False)
+    return result
+
+
+# ===========================================
+# Playback State
+# ===========================================
+class ConversationPlayback:
+    """Playback state of the assistant audio for one conversation"""
+
+    __slots__ = ("is_speaking", "task", "speaking_since_ns", "audio_duration_ms", "tts_pipeline",
+                 "turn_task", "turn_started_ns", "turn_audio", "turn_committed")
+
+    def __init__(self):
+        self.is_speaking = False
+        self.task: Optional[asyncio.Task] = None
+        self.speaking_since_ns = 0
+        self.audio_duration_ms = 0
+        self.tts_pipeline = None
+        # Turn currently going through STT -> LLM -> TTS (see turn_worker)
+        self.turn_task: Optional[asyncio.Task] = None
+        self.turn_started_ns = 0
+        self.turn_audio: Optional[bytes] = None
+        # Set once the turn has side effects (transcript saved/sent, LLM called)
+        self.turn_committed = False
+
+
+def get_playback(conversation_id: str) -> ConversationPlayback:
+    """Get (or create) the playback state of a conversation"""
+    playback = conversation_playback_state.get(conversation_id)
+    if playback is None:
+        playback = conversation_playback_state[conversation_id] = ConversationPlayback()
+    return playback
+
+
+def add_playback_audio(conversation_id: str, duration_ms: int):
+    """Account audio sent to the client; the first chunk starts the playback clock"""
+    playback = get_playback(conversation_id)
+    if not playback.is_speaking:
+        playback.is_speaking = True
+        playback.speaking_since_ns = time.perf_counter_ns()
+        playback.audio_duration_ms = 0
+    playback.audio_duration_ms += duration_ms
+
+
+async def _mark_speaking_done(playback: ConversationPlayback):
+    # Re-check after each sleep: more chunks may have been queued meanwhile
+    while playback.is_speaking:
+        elapsed_ms = (time.perf_counter_ns() - playback.speaking_since_ns) // 1_000_000
+        remaining_ms = playback.audio_duration_ms - elapsed_ms
+        if remaining_ms <= 0:
+            playback.is_speaking = False
+            return
+        await asyncio.sleep(remaining_ms / 1000)
+
+
+def schedule_speaking_done(conversation_id: str):
+    """Clear is_speaking once the audio sent so far has finished playing"""
+    playback = conversation_playback_state.get(conversation_id)
+    if playback is None:
+        return
+    if playback.task and not playback.task.done():
+        playback.task.cancel()
+    playback.task = asyncio.create_task(_mark_speaking_done(playback))
+
+
+async def handle_interruption(gate: BackpressureGate, conversation_id: str) -> bool:
+    """
+    Barge-in: if the assistant is speaking, stop its playback and notify the client.
+    Returns True if an interruption was handled.
+    """
+    playback = conversation_playback_state.get(conversation_id)
+    if playback is None or not playback.is_speaking:
+        return False
+
+    logger.info(f"[{conversation_id}] Interruption detected!")
+
+    # Cancel current playback (and pending streamed synthesis)
+    if playback.task and not playback.task.done():
+        playback.task.cancel()
+    if playback.tts_pipeline is not None:
+        playback.tts_pipeline.cancel()
+    playback.is_speaking = False
+
+    await gate.send_json({"type": "interrupt"})
+
+    # Log interruption event without blocking the turn
+    db.queue_event(
+        conversation_id=conversation_id,
+        event_type="interruption",
+        details={"timestamp": datetime.utcnow().isoformat()}
+    )
+    return True
+
+
+# ===========================================
+# Turn pipeline
+# ===========================================
+# Turns are processed by a per-connection worker so the receive loop keeps
+# reading audio (and detecting speech) while STT/LLM/TTS run
+TURN_QUEUE_SIZE = int(os.getenv("TURN_QUEUE_SIZE", "2"))
+SPECULATIVE_CANCEL_MS = int(os.getenv("SPECULATIVE_CANCEL_MS", "300"))
+SPECULATIVE_SPEECH_LEVEL = float(os.getenv("SPECULATIVE_SPEECH_LEVEL", "500"))
+
+
+async def turn_worker(websocket: WebSocket, conversation_id: str, queue: asyncio.Queue):
+    """Process queued turns (audio, prosody_data, with_context) one at a time, in order"""
+    playback = get_playback(conversation_id)
+    while True:
+        audio_data, prosody_data, with_context = await queue.get()
+        if with_context:
+            coro = process_audio_chunk_with_context(websocket, conversation_id, audio_data, prosody_data)
+        else:
+            coro = process_audio_chunk(websocket, conversation_id, audio_data)
+
+        playback.turn_audio = audio_data
+        playback.turn_committed = False
+        playback.turn_started_ns = time.perf_counter_ns()
+        playback.turn_task = asyncio.create_task(coro)
+        # wait() instead of await: a cancelled turn must not stop the worker
+        await asyncio.wait({playback.turn_task})
+        if not playback.turn_task.cancelled() and playback.turn_task.exception():
+            logger.error(f"[{conversation_id}] Turn failed: {playback.turn_task.exception()}")
+        playback.turn_audio = None
+        queue.task_done()
+
+
+def cancel_speculative_turn(conversation_id: str, chunk: bytes, max_bytes: int) -> Optional[bytes]:
+    """
+    Speech right after a turn was dispatched means the caller had not finished:
+    cancel that turn while it is still in STT (nothing saved or sent to the LLM
+    yet) and return its audio, to be merged with the new speech. Returns None
+    if nothing was cancelled.
+    """
+    playback = conversation_playback_state.get(conversation_id)
+    if playback is None or playback.turn_task is None or playback.turn_task.done():
+        return None
+    if playback.turn_committed:
+        return None
+    if playback.is_speaking or playback.turn_audio is None or len(playback.turn_audio) > max_bytes:
+        return None
+    if (time.perf_counter_ns() - playback.turn_started_ns) > SPECULATIVE_CANCEL_MS * 1_000_000:
+        return None
+    if pcm_level(chunk) < SPECULATIVE_SPEECH_LEVEL:
+        return None
+
+    playback.turn_task.cancel()
+    if playback.tts_pipeline is not None:
+        playback.tts_pipeline.cancel()
+    logger.info(f"[{conversation_id}] Caller kept talking, speculative turn cancelled")
+    return playback.turn_audio
+
+
+def commit_turn(conversation_id: str):
+    """Mark the current turn as no longer cancellable (call before its first side effect)"""
+    playback = conversation_playback_state.get(conversation_id)
+    if playback is not None:
+        playback.turn_committed = True
+
+
+async def sync_llm_history(conversation_id: str, user_message: str, ai_response: str):
+    """Record a turn answered from the response cache in the LLM service memory"""
+    response = await http_client.post(
+        f"{LLM_URL}/conversation/{conversation_id}/history",
+        json={"messages": [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": ai_response}
+        ]},
+        timeout=10.0
+    )
+    response.raise_for_status()
 
 
 
@@ -462,11 +784,11 @@ async def end_conversation(conversation_id: str):
     metrics = await db.get_conversation_metrics(conversation_id)
 
     # Trigger webhook
-    asyncio.create_task(trigger_webhook_event(
+    enqueue_webhook_event(
         "call_ended",
         conversation_id,
         {"metrics": metrics}
-    ))
+    )
 
     return {"status": "ended", "metrics": metrics}
 
@@ -497,27 +819,27 @@ async def chat(request: ChatRequest):
     )
     
     # Get LLM response
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        llm_response = await client.post(
-            f"{LLM_URL}/chat",
-            json={
-                "conversation_id": request.conversation_id,
-                "message": request.message
-            }
-        )
-        llm_data = llm_response.json()
-        ai_response = llm_data.get("response", "Lo siento, no pude procesar su solicitud.")
+    llm_response = await http_client.post(
+        f"{LLM_URL}/chat",
+        json={
+            "conversation_id": request.conversation_id,
+            "message": request.message
+        },
+        timeout=60.0
+    )
+    llm_data = llm_response.json()
+    ai_response = llm_data.get("response", "Lo siento, no pude procesar su solicitud.")
     
     # Generate TTS audio
     audio_url = None
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            tts_response = await client.post(
-                f"{TTS_URL}/synthesize",
-                json={"text": ai_response}
-            )
-            if tts_response.status_code == 200:
-                audio_url = tts_response.json().get("audio_url")
+        tts_response = await http_client.post(
+            f"{TTS_URL}/synthesize",
+            json={"text": ai_response},
+            timeout=30.0
+        )
+        if tts_response.status_code == 200:
+            audio_url = tts_response.json().get("audio_url")
     except Exception as e:
         print(f"TTS error: {e}")
     
@@ -535,12 +857,26 @@ async def chat(request: ChatRequest):
 @app.post("/synthesize")
 async def synthesize_speech(request: SynthesizeRequest):
     """Synthesize speech from text"""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(
-            f"{TTS_URL}/synthesize",
-            json={"text": request.text, "reference_audio": request.reference_audio}
-        )
-        return response.json()
+    response = await http_client.post(
+        f"{TTS_URL}/synthesize",
+        json={"text": request.text, "reference_audio": request.reference_audio},
+        timeout=30.0
+    )
+    return response.json()
+
+
+# Minimum change in pause_duration (seconds) worth a new prosody event
+PROSODY_PAUSE_DELTA = 0.15
+
+
+def prosody_changed(previous: Optional[dict], current: dict) -> bool:
+    """True if a prosody event carries a state transition the client hasn't seen"""
+    if previous is None:
+        return True
+    for key in ("is_question", "should_wait", "emotional_tone", "has_speech"):
+        if previous[key] != current[key]:
+            return True
+    return abs(current["pause_duration"] - previous["pause_duration"]) >= PROSODY_PAUSE_DELTA
 
 
 # ===========================================
@@ -569,53 +905,98 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
         logger.info(f"Active calls: {license_validator._active_calls}/{license_validator.max_concurrent_calls}")
 
     await manager.connect(websocket, conversation_id)
+    gate = manager.get_gate(conversation_id)
+    worker: Optional[asyncio.Task] = None
 
     try:
         # Send greeting
-        greeting_audio = await generate_greeting_audio()
-        await websocket.send_json({
-            "type": "greeting",
-            "text": GREETING,
-            "audio": greeting_audio
-        })
+        await gate.send(await greeting_frame())
 
-        audio_buffer = bytearray()
-        last_speech_time = datetime.utcnow()
+        # Fixed-size turn buffer: bounded memory, never reallocated
+        audio_buffer = bytearray(MAX_TURN_AUDIO_BYTES)
+        audio_view = memoryview(audio_buffer)
+        write_pos = 0
+        last_speech_ns = time.perf_counter_ns()
         waiting_for_more = False
 
+        # Per-frame prosody features, analyzed incrementally as chunks arrive
+        prosody_state = ProsodyIncrementalState() if ENABLE_PROSODY_ANALYSIS else None
+        last_sent_prosody = None
+
         # Initialize voice profile state
         if ENABLE_TARGET_EXTRACTION and conversation_id not in conversation_voice_profiles:
             conversation_voice_profiles[conversation_id] = {
                 "profile": None,
-                "audio_buffer": bytearray(),
+                "pcm": np.empty(VOICE_PROFILE_SAMPLES, dtype=np.float32),
+                "write_idx": 0,
                 "profile_created": False
             }
 
+        # Turns are handed to the worker (bounded: the receive loop waits when it falls behind)
+        turn_queue: asyncio.Queue = asyncio.Queue(maxsize=TURN_QUEUE_SIZE)
+        worker = asyncio.create_task(turn_worker(websocket, conversation_id, turn_queue))
+
         while True:
             # Receive audio data
             data = await websocket.receive()
 
+            # receive() reports a client disconnect as a message instead of raising
+            if data["type"] == "websocket.disconnect":
+                break
+
             if "bytes" in data:
                 # Audio chunk received
-                audio_buffer.extend(data["bytes"])
+                chunk = data["bytes"][:MAX_TURN_AUDIO_BYTES]
+
+                # Buffer full: force-process what we have, regardless of prosody
+                if write_pos + len(chunk) > MAX_TURN_AUDIO_BYTES:
+                    prosody_data = None
+                    if ENABLE_PROSODY_ANALYSIS:
+                        prosody_data = prosody_analyzer.analyze_incremental(prosody_state)
+                        prosody_state.reset()
+                    await turn_queue.put((bytes(audio_view[:write_pos]), prosody_data, ENABLE_PROSODY_ANALYSIS))
+                    write_pos = 0
+                    waiting_for_more = False
+
+                audio_view[write_pos:write_pos + len(chunk)] = chunk
+                write_pos += len(chunk)
+                if ENABLE_PROSODY_ANALYSIS:
+                    prosody_analyzer.append_audio(prosody_state, chunk)
+
+                # Caller resumed talking just after a turn was dispatched: merge it back
+                if turn_queue.empty():
+                    restored = cancel_speculative_turn(conversation_id, chunk, MAX_TURN_AUDIO_BYTES - write_pos)
+                    if restored is not None:
+                        tail = bytes(audio_view[:write_pos])
+                        audio_view[:len(restored)] = restored
+                        audio_view[len(restored):len(restored) + len(tail)] = tail
+                        write_pos += len(restored)
+                        if ENABLE_PROSODY_ANALYSIS:
+                            prosody_state.reset()
+                            prosody_analyzer.append_audio(prosody_state, restored)
+                            prosody_analyzer.append_audio(prosody_state, tail)
 
                 # Build voice profile from first 3 seconds
                 if ENABLE_TARGET_EXTRACTION:
                     profile_state = conversation_voice_profiles.get(conversation_id)
                     if profile_state and not profile_state["profile_created"]:
-                        profile_state["audio_buffer"].extend(data["bytes"])
+                        # Convert int16 -> float32 straight into the preallocated buffer
+                        chunk_bytes = data["bytes"]
+                        samples = np.frombuffer(chunk_bytes, dtype=np.int16, count=len(chunk_bytes) // 2)
+                        write_idx = profile_state["write_idx"]
+                        n = min(len(samples), VOICE_PROFILE_SAMPLES - write_idx)
+                        np.multiply(samples[:n], 1.0 / 32768.0, out=profile_state["pcm"][write_idx:write_idx + n])
+                        profile_state["write_idx"] = write_idx + n
 
                         # Create profile when we have 3 seconds
-                        if len(profile_state["audio_buffer"]) >= 16000 * 2 * 3:  # 3 seconds
+                        if profile_state["write_idx"] >= VOICE_PROFILE_SAMPLES:
                             try:
-                                profile = target_extractor.create_voice_profile(
-                                    bytes(profile_state["audio_buffer"])
-                                )
+                                profile = target_extractor.create_voice_profile(profile_state["pcm"])
                                 profile_state["profile"] = profile
                                 profile_state["profile_created"] = True
                                 logger.info(f"[{conversation_id}] Voice profile created")
 
-                                await websocket.send_json({
+                                await gate.send_json({
                                     "type": "voice_profile_created",
                                     "message": "Perfil de voz creado exitosamente"
                                 })
@@ -623,71 +1004,61 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
                                 logger.error(f"Error creating voice profile: {e}")
 
                 # Analyze prosody to decide when to process
-                if ENABLE_PROSODY_ANALYSIS and len(audio_buffer) >= 16000 * 2:  # At least 1 second
-                    prosody_data = prosody_analyzer.analyze_audio(bytes(audio_buffer))
-
-                    # Send prosody info to client (for UI/debugging)
-                    await websocket.send_json({
-                        "type": "prosody",
-                        "data": {
-                            "is_question": prosody_data["is_question"],
-                            "pause_duration": prosody_data["pause_duration"],
-                            "should_wait": prosody_data["should_wait"],
-                            "emotional_tone": prosody_data["emotional_tone"],
-                            "has_speech": prosody_data["has_speech"]
-                        }
-                    })
+                if ENABLE_PROSODY_ANALYSIS and write_pos >= 16000 * 2:  # At least 1 second
+                    prosody_data = prosody_analyzer.analyze_incremental(prosody_state)
+
+                    # Send prosody info to client (for UI/debugging) only when it changed,
+                    # skipped under backpressure
+                    prosody_event = {
+                        "is_question": prosody_data["is_question"],
+                        "pause_duration": prosody_data["pause_duration"],
+                        "should_wait": prosody_data["should_wait"],
+                        "emotional_tone": prosody_data["emotional_tone"],
+                        "has_speech": prosody_data["has_speech"]
+                    }
+                    if prosody_changed(last_sent_prosody, prosody_event) and not gate.is_backpressured():
+                        await gate.send_json({"type": "prosody", "data": prosody_event})
+                        last_sent_prosody = prosody_event
 
                     # Decide if we should process now
                     if prosody_data["has_speech"]:
-                        last_speech_time = datetime.utcnow()
+                        last_speech_ns = time.perf_counter_ns()
                         waiting_for_more = prosody_data["should_wait"]
 
                     # Process if:
                     # 1. Not waiting for more speech
                     # 2. OR timeout (2.5 seconds since last speech)
-                    time_since_speech = (datetime.utcnow() - last_speech_time).total_seconds()
+                    time_since_speech = (time.perf_counter_ns() - last_speech_ns) / 1_000_000_000
 
                     if not waiting_for_more or time_since_speech > 2.5:
-                        if prosody_data["has_speech"] or len(audio_buffer) >= 16000 * 4:  # 2 seconds minimum
-                            await process_audio_chunk_with_context(
-                                websocket,
-                                conversation_id,
-                                bytes(audio_buffer),
-                                prosody_data
-                            )
-                            audio_buffer.clear()
+                        if prosody_data["has_speech"] or write_pos >= 16000 * 4:  # 2 seconds minimum
+                            # Copy out: the buffer is reused while the worker processes the turn
+                            await turn_queue.put((bytes(audio_view[:write_pos]), prosody_data, True))
+                            write_pos = 0
+                            prosody_state.reset()
                             waiting_for_more = False
 
-                # Fallback: Process if buffer too large (prevent memory issues)
-                elif len(audio_buffer) >= 16000 * 2 * 10:  # 10 seconds
-                    await process_audio_chunk(
-                        websocket,
-                        conversation_id,
-                        bytes(audio_buffer)
-                    )
-                    audio_buffer.clear()
-
             elif "text" in data:
                 # Text command received
                 message = data["text"]
                 if message == "end_turn":
                     # Process remaining audio
-                    if audio_buffer:
+                    if write_pos:
                         prosody_data = None
                         if ENABLE_PROSODY_ANALYSIS:
-                            prosody_data = prosody_analyzer.analyze_audio(bytes(audio_buffer))
+                            prosody_data = prosody_analyzer.analyze_incremental(prosody_state)
+                            prosody_state.reset()
 
-                        await process_audio_chunk_with_context(
-                            websocket,
-                            conversation_id,
-                            bytes(audio_buffer),
-                            prosody_data
-                        )
-                        audio_buffer.clear()
+                        await turn_queue.put((bytes(audio_view[:write_pos]), prosody_data, True))
+                        write_pos = 0
 
     except WebSocketDisconnect:
+        pass
+
+    finally:
         manager.disconnect(conversation_id)
+        if worker is not None:
+            worker.cancel()
 
         # Decrement active calls counter
         if __license_required__:
@@ -701,10 +1072,173 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: str):
         # Clean up voice profile
         if conversation_id in conversation_voice_profiles:
             del conversation_voice_profiles[conversation_id]
+        playback = conversation_playback_state.pop(conversation_id, None)
+        if playback:
+            for task in (playback.task, playback.turn_task):
+                if task and not task.done():
+                    task.cancel()
+            # Sentence synthesis tasks are independent of the turn task
+            if playback.tts_pipeline is not None:
+                playback.tts_pipeline.cancel()
+        response_cache.forget(conversation_id)
 
         await db.end_conversation(conversation_id)
 
 
+# Sentence boundary: terminal punctuation followed by whitespace, or a line
+# break. End of buffer is not a boundary (the next token may be "5" in "3.5");
+# the remainder is flushed when the stream ends.
+_SENT_END = re.compile(r"[.?!;:]+(?=\s)|\n")
+# Characters without which no boundary can appear (cheap per-token pre-check)
+_SENT_END_CHARS = frozenset(".?!;:\n")
+# Flush long runs without punctuation so TTS is not starved
+MAX_SENTENCE_WORDS = 80
+
+TTS_STREAM_WORKERS = int(os.getenv("TTS_STREAM_WORKERS", "3"))
+
+
+class OrderedTTSPipeline:
+    """
+    Synthesizes streamed sentences concurrently (bounded worker pool) and
+    emits the audio chunks to the client strictly in chunk_id order.
+    cancel() drops everything pending (barge-in).
+    """
+
+    def __init__(self, gate: BackpressureGate, conversation_id: str,
+                 max_workers: int = TTS_STREAM_WORKERS):
+        self.gate = gate
+        self.conversation_id = conversation_id
+        self.full_response = ""
+        self.chunks_sent = 0
+        self.first_audio_ns = 0
+        self.cancel_event = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._emit_lock = asyncio.Lock()
+        self._next_chunk_id = 0
+        self._next_emit_id = 0
+        self._ready = []  # heap of (chunk_id, audio_base64, duration_ms, text)
+        self._tasks = set()
+
+    def submit(self, text: str):
+        """Queue a completed sentence for synthesis"""
+        chunk_id = self._next_chunk_id
+        self._next_chunk_id += 1
+        task = asyncio.create_task(self._synthesize(chunk_id, text))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _synthesize(self, chunk_id: int, text: str):
+        audio_base64 = None
+        duration_ms = 0
+        async with self._semaphore:
+            if not self.cancel_event.is_set():
+                try:
+                    tts_result = await call_tts(text)
+                    audio_base64 = tts_result.get("audio_base64")
+                    duration_ms = tts_result.get("duration_ms", 0)
+                except Exception as tts_error:
+                    logger.error(f"TTS streaming error: {tts_error}")
+
+        # Failed chunks are still pushed so later chunks are not blocked
+        heapq.heappush(self._ready, (chunk_id, audio_base64, duration_ms, text))
+        await self._emit_ready()
+
+    async def _emit_ready(self):
+        async with self._emit_lock:
+            while self._ready and self._ready[0][0] == self._next_emit_id:
+                _, audio_base64, duration_ms, text = heapq.heappop(self._ready)
+                self._next_emit_id += 1
+                if self.cancel_event.is_set() or not audio_base64:
+                    continue
+
+                await self.gate.send_json({
+                    "type": "audio_chunk",
+                    "audio": audio_base64,
+                    "text": text
+                })
+                self.chunks_sent += 1
+                if self.chunks_sent == 1:
+                    self.first_audio_ns = time.perf_counter_ns()
+                add_playback_audio(self.conversation_id, duration_ms)
+
+    async def finish(self):
+        """Wait until every submitted sentence has been synthesized and emitted"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def cancel(self):
+        """Barge-in: stop emitting and cancel pending synthesis"""
+        self.cancel_event.set()
+        for task in list(self._tasks):
+            task.cancel()
+        self._ready.clear()
+
+
+async def stream_llm_to_tts(
+    gate: BackpressureGate,
+    conversation_id: str,
+    message: str,
+    context: Optional[str] = None
+) -> OrderedTTSPipeline:
+    """
+    Stream the LLM response and synthesize it sentence by sentence while it is
+    still being generated. Audio chunks are sent in order as they become ready.
+    Returns the finished pipeline (full_response, chunks_sent, first_audio_ns).
+    """
+    tts_pipeline = OrderedTTSPipeline(gate, conversation_id)
+    playback = get_playback(conversation_id)
+    playback.tts_pipeline = tts_pipeline
+
+    response_parts = []
+    sentence_buffer = ""
+    scan_pos = 0
+    try:
+        async for token in call_llm_stream(conversation_id, message, context):
+            response_parts.append(token)
+            # A boundary needs punctuation/newline in the token, or whitespace right after
+            # punctuation already buffered; most tokens are neither and skip the regex
+            boundary_possible = (
+                not _SENT_END_CHARS.isdisjoint(token)
+                or (token[:1].isspace() and sentence_buffer[-1:] in _SENT_END_CHARS)
+            )
+            sentence_buffer += token
+
+            # Flush every completed sentence (tokens may be multi-char, e.g. "fin. Luego")
+            match = _SENT_END.search(sentence_buffer, scan_pos) if boundary_possible else None
+            while match:
+                sentence = sentence_buffer[:match.end()].strip()
+                if sentence:
+                    # Synthesize without waiting for earlier sentences
+                    tts_pipeline.submit(sentence)
+                sentence_buffer = sentence_buffer[match.end():]
+                match = _SENT_END.search(sentence_buffer)
+
+            # No punctuation for too long: flush up to the last complete word
+            if sentence_buffer.count(" ") > MAX_SENTENCE_WORDS:
+                cut = sentence_buffer.rstrip().rfind(" ")
+                if cut > 0:
+                    tts_pipeline.submit(sentence_buffer[:cut].strip())
+                    sentence_buffer = sentence_buffer[cut:]
+
+            # Only the tail can start a new boundary (punctuation run + whitespace)
+            scan_pos = max(0, len(sentence_buffer) - 1)
+
+        # Process any remaining text
+        if sentence_buffer.strip():
+            tts_pipeline.submit(sentence_buffer.strip())
+
+        await tts_pipeline.finish()
+    except Exception:
+        tts_pipeline.cancel()
+        raise
+    finally:
+        if playback.tts_pipeline is tts_pipeline:
+            playback.tts_pipeline = None
+
+    tts_pipeline.full_response = "".join(response_parts)
+    return tts_pipeline
+
+
 async def process_audio_chunk_streaming(
     websocket: WebSocket,
     conversation_id: str,
@@ -714,110 +1248,51 @@ async def process_audio_chunk_streaming(
     Process audio chunk with streaming LLM response for lower perceived latency.
     Synthesizes audio sentence by sentence as LLM generates text.
     """
-    start_time = datetime.utcnow()
+    start_ns = time.perf_counter_ns()
     metrics = {}
+    gate = manager.get_gate(conversation_id)
+    if gate is None:
+        return  # Connection already closed
 
     try:
         # Check for interruptions
-        if conversation_id in conversation_playback_state:
-            state = conversation_playback_state[conversation_id]
-            if state.get("is_speaking", False):
-                logger.info(f"[{conversation_id}] Interruption detected!")
-                if "task" in state and not state["task"].done():
-                    state["task"].cancel()
-                await websocket.send_json({"type": "interrupt"})
-                state["is_speaking"] = False
-                await db.log_event(conversation_id=conversation_id, event_type="interruption",
-                                  details={"timestamp": datetime.utcnow().isoformat()})
+        await handle_interruption(gate, conversation_id)
 
         # 1. STT with metrics
-        stt_start = datetime.utcnow()
+        stt_start = time.perf_counter_ns()
         transcription = await call_stt(audio_data)
-        metrics["stt_latency_ms"] = int((datetime.utcnow() - stt_start).total_seconds() * 1000)
+        metrics["stt_latency_ms"] = (time.perf_counter_ns() - stt_start) // 1_000_000
 
         if not transcription.strip():
             return
 
+        # From here on the turn is saved and sent to the LLM: no speculative cancel
+        commit_turn(conversation_id)
+
         logger.info(f"[{conversation_id}] User: {transcription[:50]}...")
-        await websocket.send_json({"type": "transcription", "text": transcription})
-        await db.add_message(conversation_id, "user", transcription)
 
-        # 2. Sentiment analysis
-        sentiment = await analyze_sentiment(transcription)
+        # 2. Sentiment analysis, overlapped with the transcription send and DB write
+        sentiment_task = asyncio.create_task(analyze_sentiment(transcription))
+        db.queue_message(conversation_id, "user", transcription)
+        await gate.send_json({"type": "transcription", "text": transcription})
+        sentiment = await sentiment_task
         metrics["sentiment_score"] = sentiment["score"]
         metrics["sentiment_label"] = sentiment["label"]
-        await websocket.send_json({"type": "sentiment", "sentiment": sentiment["label"], "score": sentiment["score"]})
+        if not gate.is_backpressured():
+            await gate.send_json({"type": "sentiment", "sentiment": sentiment["label"], "score": sentiment["score"]})
 
         # 3. LLM Streaming
-        llm_start = datetime.utcnow()
-        full_response = ""
-        sentence_buffer = ""
+        llm_start = time.perf_counter_ns()
         audio_chunks_sent = 0
 
         try:
-            # Call streaming endpoint
-            async with http_client.stream(
-                "POST",
-                f"{LLM_URL}/chat/stream",
-                json={
-                    "conversation_id": conversation_id,
-                    "message": transcription,
-                    "context": {"sentiment_guidance": sentiment.get("guidance", "")}
-                },
-                timeout=60.0
-            ) as stream:
-                async for line in stream.aiter_lines():
-                    if line.startswith("data: "):
-                        chunk = line[6:]  # Remove "data: " prefix
-
-                        if chunk == "[DONE]":
-                            break
-
-                        if chunk.startswith("[ERROR]"):
-                            logger.error(f"LLM streaming error: {chunk}")
-                            break
-
-                        full_response += chunk
-                        sentence_buffer += chunk
-
-                        # Check if we completed a sentence
-                        if chunk in [".", "?", "!", ":", ";"]:
-                            # Synthesize completed sentence immediately
-                            if sentence_buffer.strip():
-                                try:
-                                    tts_result = await call_tts(sentence_buffer.strip())
-                                    audio_base64 = tts_result.get("audio_base64")
-
-                                    if audio_base64:
-                                        await websocket.send_json({
-                                            "type": "audio_chunk",
-                                            "audio": audio_base64,
-                                            "text": sentence_buffer.strip()
-                                        })
-                                        audio_chunks_sent += 1
-
-                                        # Mark as speaking on first chunk
-                                        if audio_chunks_sent == 1:
-                                            if conversation_id not in conversation_playback_state:
-                                                conversation_playback_state[conversation_id] = {}
-                                            conversation_playback_state[conversation_id]["is_speaking"] = True
-
-                                except Exception as tts_error:
-                                    logger.error(f"TTS streaming error: {tts_error}")
-
-                                sentence_buffer = ""
-
-                # Process any remaining text
-                if sentence_buffer.strip():
-                    tts_result = await call_tts(sentence_buffer.strip())
-                    audio_base64 = tts_result.get("audio_base64")
-                    if audio_base64:
-                        await websocket.send_json({
-                            "type": "audio_chunk",
-                            "audio": audio_base64,
-                            "text": sentence_buffer.strip()
-                        })
-                        audio_chunks_sent += 1
+            tts_pipeline = await stream_llm_to_tts(
+                gate, conversation_id, transcription, sentiment.get("guidance")
+            )
+            full_response = tts_pipeline.full_response
+            audio_chunks_sent = tts_pipeline.chunks_sent
+            if tts_pipeline.first_audio_ns:
+                metrics["first_audio_ms"] = (tts_pipeline.first_audio_ns - start_ns) // 1_000_000
 
         except Exception as stream_error:
             logger.error(f"Streaming error: {stream_error}. Falling back to non-streaming.")
@@ -825,59 +1300,79 @@ async def process_audio_chunk_streaming(
             llm_result = await call_llm(conversation_id, transcription, use_tools=False, context=sentiment.get("guidance"))
             full_response = llm_result["response"]
 
-        metrics["llm_latency_ms"] = int((datetime.utcnow() - llm_start).total_seconds() * 1000)
+        metrics["llm_latency_ms"] = (time.perf_counter_ns() - llm_start) // 1_000_000
 
         logger.info(f"[{conversation_id}] AI: {full_response[:50]}... ({audio_chunks_sent} chunks)")
 
         # Send complete response
-        await websocket.send_json({"type": "response", "text": full_response})
-        await db.add_message(conversation_id, "assistant", full_response)
+        await gate.send_json({"type": "response", "text": full_response})
+        db.queue_message(conversation_id, "assistant", full_response)
 
-        # Mark speaking done
-        async def mark_speaking_done():
-            await asyncio.sleep(len(full_response) * 0.05)
-            if conversation_id in conversation_playback_state:
-                conversation_playback_state[conversation_id]["is_speaking"] = False
-
-        task = asyncio.create_task(mark_speaking_done())
-        if conversation_id in conversation_playback_state:
-            conversation_playback_state[conversation_id]["task"] = task
+        # Mark speaking done once the streamed audio has played
+        schedule_speaking_done(conversation_id)
 
         # Log metrics
-        metrics["total_latency_ms"] = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+        metrics["total_latency_ms"] = (time.perf_counter_ns() - start_ns) // 1_000_000
         metrics["streaming_chunks"] = audio_chunks_sent
-        await db.log_event(conversation_id=conversation_id, event_type="turn_completed_streaming", details=metrics)
+        db.queue_event(conversation_id=conversation_id, event_type="turn_completed_streaming", details=metrics)
 
         logger.info(f"[{conversation_id}] Streaming metrics: STT={metrics['stt_latency_ms']}ms, "
                    f"Total={metrics['total_latency_ms']}ms, Chunks={audio_chunks_sent}")
 
     except Exception as e:
         logger.error(f"[{conversation_id}] Streaming processing error: {e}")
-        await websocket.send_json({"type": "error", "message": str(e)})
+        await gate.send_json({"type": "error", "message": str(e)})
+
+
+# Sentiment keywords, matched in a single pass over the text
+SENTIMENT_KEYWORDS = {
+    # Frustration indicators
+    "frustrated": ["no funciona", "problema", "mal", "molesto", "frustrado", "cansado", "harto"],
+    # Confusion indicators
+    "confused": ["no entiendo", "qué", "cómo", "confundido", "explicar", "duda"],
+    # Positive indicators
+    "positive": ["gracias", "perfecto", "excelente", "bien", "contento", "feliz"],
+}
+_KEYWORD_CATEGORY = {k: category for category, keywords in SENTIMENT_KEYWORDS.items() for k in keywords}
+
+try:
+    import ahocorasick
+    _sentiment_automaton = ahocorasick.Automaton()
+    for _keyword, _category in _KEYWORD_CATEGORY.items():
+        _sentiment_automaton.add_word(_keyword, (_category, _keyword))
+    _sentiment_automaton.make_automaton()
+except ImportError:
+    _sentiment_automaton = None
+
+_SENTIMENT_RE = re.compile("|".join(
+    re.escape(k) for k in sorted(_KEYWORD_CATEGORY, key=len, reverse=True)
+))
+
+
+def _count_sentiment_keywords(text_lower: str) -> Dict[str, int]:
+    """Count distinct keywords per sentiment category found in the text"""
+    if _sentiment_automaton is not None:
+        matched = {value for _, value in _sentiment_automaton.iter(text_lower)}
+    else:
+        matched = {(_KEYWORD_CATEGORY[k], k) for k in _SENTIMENT_RE.findall(text_lower)}
+
+    scores = {category: 0 for category in SENTIMENT_KEYWORDS}
+    for category, _ in matched:
+        scores[category] += 1
+    return scores
 
 
 async def analyze_sentiment(text: str) -> dict:
     """Analyze sentiment of a message"""
     try:
         # Simple keyword-based sentiment analysis
-        text_lower = text.lower()
-
-        # Frustration indicators
-        frustrated_keywords = ["no funciona", "problema", "mal", "molesto", "frustrado", "cansado", "harto"]
-        # Confusion indicators
-        confused_keywords = ["no entiendo", "qué", "cómo", "confundido", "explicar", "duda"]
-        # Positive indicators
-        positive_keywords = ["gracias", "perfecto", "excelente", "bien", "contento", "feliz"]
+        scores = _count_sentiment_keywords(text.lower())
 
-        frustration_score = sum(1 for k in frustrated_keywords if k in text_lower)
-        confusion_score = sum(1 for k in confused_keywords if k in text_lower)
-        positive_score = sum(1 for k in positive_keywords if k in text_lower)
-
-        if frustration_score >= 2:
+        if scores["frustrated"] >= 2:
             return {"label": "frustrated", "score": -0.7, "guidance": "El cliente parece frustrado. Sé más empático y ofrece transferencia a un agente humano."}
-        elif confusion_score >= 2:
+        elif scores["confused"] >= 2:
             return {"label": "confused", "score": -0.3, "guidance": "El cliente no entiende. Simplifica tu respuesta y usa lenguaje más claro."}
-        elif positive_score >= 1:
+        elif scores["positive"] >= 1:
             return {"label": "positive", "score": 0.8, "guidance": "El cliente está satisfecho. Mantén el tono positivo."}
         else:
             return {"label": "neutral", "score": 0.0, "guidance": ""}
@@ -950,110 +1445,127 @@ async def execute_tool_call(tool_name: str, arguments: dict, conversation_id: st
         return {"success": False, "message": str(e)}
 
 
-async def generate_greeting_audio() -> Optional[str]:
-    """Generate audio for the greeting message"""
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{TTS_URL}/synthesize",
-                json={"text": GREETING}
-            )
-            if response.status_code == 200:
-                return response.json().get("audio_base64")
-    except Exception as e:
-        print(f"Greeting audio error: {e}")
-    return None
+# Greeting audio synthesized once per process, keyed by greeting text
+_greeting_audio_cache: Dict[str, str] = {}
+_greeting_lock = asyncio.Lock()
+
+
+async def generate_greeting_audio(text: str = GREETING) -> Optional[str]:
+    """Get the greeting audio (synthesized on first use, then cached)"""
+    audio_base64 = _greeting_audio_cache.get(text)
+    if audio_base64:
+        return audio_base64
+
+    async with _greeting_lock:
+        # Another connection may have synthesized it while we waited
+        if text in _greeting_audio_cache:
+            return _greeting_audio_cache[text]
+        try:
+            tts_result = await call_tts(text)
+            audio_base64 = tts_result.get("audio_base64")
+        except Exception as e:
+            logger.error(f"Greeting audio error: {e}")
+            return None
+
+        # Failures are not cached, so the next connection retries
+        if audio_base64:
+            _greeting_audio_cache[text] = audio_base64
+        return audio_base64
+
+
+# Serialized greeting message: identical for every connection, encoded once
+_greeting_frame_cache: Dict[str, str] = {}
+
+
+async def greeting_frame(text: str = GREETING) -> str:
+    """Get the JSON text frame of the greeting message (audio base64 included)"""
+    frame = _greeting_frame_cache.get(text)
+    if frame is not None:
+        return frame
+    audio_base64 = await generate_greeting_audio(text)
+    frame = dumps_json({"type": "greeting", "text": text, "audio": audio_base64})
+    if audio_base64:
+        _greeting_frame_cache[text] = frame
+    return frame
 
 
 async def process_audio_chunk(
     websocket: WebSocket,
     conversation_id: str,
-    audio_data: bytes
+    audio_data: Union[bytes, memoryview]
 ):
     """Process an audio chunk: STT -> LLM -> TTS with retry logic, sentiment analysis, and interruption handling"""
-    start_time = datetime.utcnow()
+    start_ns = time.perf_counter_ns()
     metrics = {}
+    gate = manager.get_gate(conversation_id)
+    if gate is None:
+        return  # Connection already closed
 
     try:
         # Check if assistant is currently speaking (interruption detection)
-        if conversation_id in conversation_playback_state:
-            state = conversation_playback_state[conversation_id]
-            if state.get("is_speaking", False):
-                # User interrupted the assistant
-                logger.info(f"[{conversation_id}] Interruption detected!")
-
-                # Cancel current playback
-                if "task" in state and not state["task"].done():
-                    state["task"].cancel()
-
-                # Send interruption signal
-                await websocket.send_json({"type": "interrupt"})
-
-                # Mark as not speaking
-                state["is_speaking"] = False
-
-                # Log interruption event
-                await db.log_event(
-                    conversation_id=conversation_id,
-                    event_type="interruption",
-                    details={"timestamp": datetime.utcnow().isoformat()}
-                )
+        await handle_interruption(gate, conversation_id)
 
         # 1. Speech to Text (with retry and metrics)
-        stt_start = datetime.utcnow()
+        stt_start = time.perf_counter_ns()
         transcription = await call_stt(audio_data)
-        stt_end = datetime.utcnow()
-        metrics["stt_latency_ms"] = int((stt_end - stt_start).total_seconds() * 1000)
+        metrics["stt_latency_ms"] = (time.perf_counter_ns() - stt_start) // 1_000_000
 
         if not transcription.strip():
             return
 
+        # From here on the turn is saved and sent to the LLM: no speculative cancel
+        commit_turn(conversation_id)
+
         logger.info(f"[{conversation_id}] User: {transcription[:50]}...")
 
-        # Send transcription to client
-        await websocket.send_json({
+        # 2. Sentiment Analysis and response cache embedding, overlapped with the
+        # transcription send and the DB write
+        sentiment_task = asyncio.create_task(analyze_sentiment(transcription))
+        embed_task = asyncio.create_task(response_cache.embed(transcription))
+        db.queue_message(conversation_id, "user", transcription)
+        await gate.send_json({
             "type": "transcription",
             "text": transcription
         })
-
-        # Save user message
-        await db.add_message(conversation_id, "user", transcription)
-
-        # 2. Sentiment Analysis
-        sentiment_start = datetime.utcnow()
-        sentiment = await analyze_sentiment(transcription)
-        sentiment_end = datetime.utcnow()
+        sentiment, query_vector = await asyncio.gather(sentiment_task, embed_task)
         metrics["sentiment_score"] = sentiment["score"]
         metrics["sentiment_label"] = sentiment["label"]
 
         # Send sentiment to client (optional, for real-time dashboard)
-        await websocket.send_json({
-            "type": "sentiment",
-            "sentiment": sentiment["label"],
-            "score": sentiment["score"]
-        })
+        if not gate.is_backpressured():
+            await gate.send_json({
+                "type": "sentiment",
+                "sentiment": sentiment["label"],
+                "score": sentiment["score"]
+            })
 
         logger.info(f"[{conversation_id}] Sentiment: {sentiment['label']} ({sentiment['score']})")
 
         # Trigger webhook if sentiment is negative
         if sentiment["label"] in ["frustrated", "angry"] or sentiment["score"] < -0.5:
-            asyncio.create_task(trigger_webhook_event(
+            enqueue_webhook_event(
                 "sentiment_alert",
                 conversation_id,
                 {"sentiment": sentiment["label"], "score": sentiment["score"], "message": transcription}
-            ))
+            )
 
-        # 3. Get LLM response with context (with retry and metrics)
-        llm_start = datetime.utcnow()
-        use_tools = True  # Enable function calling
-        llm_result = await call_llm(
-            conversation_id,
-            transcription,
-            use_tools=use_tools,
-            context=sentiment.get("guidance")
-        )
-        llm_end = datetime.utcnow()
-        metrics["llm_latency_ms"] = int((llm_end - llm_start).total_seconds() * 1000)
+        # 3. Get LLM response with context (response cache first, then LLM with retry)
+        llm_start = time.perf_counter_ns()
+        cached = await response_cache.lookup(conversation_id, transcription, sentiment.get("guidance"),
+                                             vector=query_vector)
+        if cached:
+            llm_result = {"response": cached["response"], "tool_calls": []}
+            run_in_background(sync_llm_history(conversation_id, transcription, cached["response"]))
+        else:
+            use_tools = True  # Enable function calling
+            llm_result = await call_llm(
+                conversation_id,
+                transcription,
+                use_tools=use_tools,
+                context=sentiment.get("guidance")
+            )
+        metrics["llm_latency_ms"] = (time.perf_counter_ns() - llm_start) // 1_000_000
+        metrics["cache_hit"] = cached is not None
 
         ai_response = llm_result["response"]
         tool_calls = llm_result.get("tool_calls", [])
@@ -1068,7 +1580,7 @@ async def process_audio_chunk(
                 tool_result = await execute_tool_call(tool_name, arguments, conversation_id)
 
                 # Send tool execution result to client
-                await websocket.send_json({
+                await gate.send_json({
                     "type": "tool_call",
                     "tool": tool_name,
                     "result": tool_result
@@ -1077,50 +1589,45 @@ async def process_audio_chunk(
         logger.info(f"[{conversation_id}] AI: {ai_response[:50]}...")
 
         # Send AI response text
-        await websocket.send_json({
+        await gate.send_json({
             "type": "response",
             "text": ai_response
         })
 
         # Save assistant message
-        await db.add_message(conversation_id, "assistant", ai_response)
+        db.queue_message(conversation_id, "assistant", ai_response)
 
         # 5. Text to Speech (with retry and metrics)
-        tts_start = datetime.utcnow()
+        tts_start = time.perf_counter_ns()
         tts_result = await call_tts(ai_response)
-        tts_end = datetime.utcnow()
-        metrics["tts_latency_ms"] = int((tts_end - tts_start).total_seconds() * 1000)
+        metrics["tts_latency_ms"] = (time.perf_counter_ns() - tts_start) // 1_000_000
 
         audio_base64 = tts_result.get("audio_base64")
+        audio_duration_ms = tts_result.get("duration_ms", 0)
         if audio_base64:
             # Mark assistant as speaking
-            if conversation_id not in conversation_playback_state:
-                conversation_playback_state[conversation_id] = {}
-            conversation_playback_state[conversation_id]["is_speaking"] = True
+            add_playback_audio(conversation_id, audio_duration_ms)
 
             # Send audio
-            await websocket.send_json({
+            await gate.send_json({
                 "type": "audio",
                 "audio": audio_base64
             })
 
-            # Create a task that marks speaking as done after audio duration
-            async def mark_speaking_done():
-                # Estimate audio duration (assuming 16kHz, 16-bit)
-                # In production, get actual duration from TTS service
-                await asyncio.sleep(len(ai_response) * 0.05)  # Rough estimate: 50ms per character
-                if conversation_id in conversation_playback_state:
-                    conversation_playback_state[conversation_id]["is_speaking"] = False
+            # Mark speaking as done after the synthesized audio duration
+            schedule_speaking_done(conversation_id)
 
-            task = asyncio.create_task(mark_speaking_done())
-            conversation_playback_state[conversation_id]["task"] = task
+        # Cache the turn for repeated utterances (tool calls have side effects, never cached)
+        if not cached and not tool_calls:
+            await response_cache.store(conversation_id, transcription, sentiment.get("guidance"), ai_response,
+                                       vector=query_vector)
+        response_cache.record_turn(conversation_id, transcription)
 
         # 6. Calculate total latency and log metrics
-        end_time = datetime.utcnow()
-        metrics["total_latency_ms"] = int((end_time - start_time).total_seconds() * 1000)
+        metrics["total_latency_ms"] = (time.perf_counter_ns() - start_ns) // 1_000_000
 
         # Log metrics to database
-        await db.log_event(
+        db.queue_event(
             conversation_id=conversation_id,
             event_type="turn_completed",
             details=metrics
@@ -1131,7 +1638,7 @@ async def process_audio_chunk(
                    f"Total={metrics['total_latency_ms']}ms")
 
         # Trigger webhook for turn completed
-        asyncio.create_task(trigger_webhook_event(
+        enqueue_webhook_event(
             "turn_completed",
             conversation_id,
             {
@@ -1139,11 +1646,11 @@ async def process_audio_chunk(
                 "user_message": transcription[:100],
                 "ai_response": ai_response[:100]
             }
-        ))
+        )
 
     except Exception as e:
         logger.error(f"[{conversation_id}] Audio processing error: {e}")
-        await websocket.send_json({
+        await gate.send_json({
             "type": "error",
             "message": str(e)
         })
@@ -1152,55 +1659,51 @@ async def process_audio_chunk(
 async def process_audio_chunk_with_context(
     websocket: WebSocket,
     conversation_id: str,
-    audio_data: bytes,
+    audio_data: Union[bytes, memoryview],
     prosody_data: Optional[Dict] = None
 ):
     """
     Process audio chunk with prosody context and target speaker extraction.
     Handles questions, pauses, and emotional tone.
     """
-    start_time = datetime.utcnow()
+    start_ns = time.perf_counter_ns()
     metrics = {}
+    gate = manager.get_gate(conversation_id)
+    if gate is None:
+        return  # Connection already closed
 
     try:
         # Check for interruptions
-        if conversation_id in conversation_playback_state:
-            state = conversation_playback_state[conversation_id]
-            if state.get("is_speaking", False):
-                logger.info(f"[{conversation_id}] Interruption detected!")
-                if "task" in state and not state["task"].done():
-                    state["task"].cancel()
-                await websocket.send_json({"type": "interrupt"})
-                state["is_speaking"] = False
-                await db.log_event(conversation_id=conversation_id, event_type="interruption",
-                                  details={"timestamp": datetime.utcnow().isoformat()})
+        await handle_interruption(gate, conversation_id)
 
         # 0. Target Speaker Extraction (if enabled and profile exists)
         if ENABLE_TARGET_EXTRACTION:
             profile_state = conversation_voice_profiles.get(conversation_id)
             if profile_state and profile_state.get("profile") is not None:
                 try:
-                    extraction_start = datetime.utcnow()
+                    extraction_start = time.perf_counter_ns()
                     audio_data = target_extractor.extract_target_speaker(
-                        audio_data,
+                        np.frombuffer(audio_data, dtype=np.int16, count=len(audio_data) // 2),
                         profile_state["profile"],
                         similarity_threshold=0.5
                     )
-                    extraction_time = (datetime.utcnow() - extraction_start).total_seconds() * 1000
+                    extraction_time = (time.perf_counter_ns() - extraction_start) / 1_000_000
                     metrics["target_extraction_ms"] = int(extraction_time)
                     logger.debug(f"[{conversation_id}] Target extraction: {extraction_time:.0f}ms")
                 except Exception as e:
                     logger.error(f"Target extraction error: {e}")
 
         # 1. Speech to Text (with retry and metrics)
-        stt_start = datetime.utcnow()
+        stt_start = time.perf_counter_ns()
         transcription = await call_stt(audio_data)
-        stt_end = datetime.utcnow()
-        metrics["stt_latency_ms"] = int((stt_end - stt_start).total_seconds() * 1000)
+        metrics["stt_latency_ms"] = (time.perf_counter_ns() - stt_start) // 1_000_000
 
         if not transcription.strip():
             return
 
+        # From here on the turn is saved and sent to the LLM: no speculative cancel
+        commit_turn(conversation_id)
+
         logger.info(f"[{conversation_id}] User: {transcription[:50]}...")
 
         # Add prosody information to transcription display
@@ -1212,15 +1715,13 @@ async def process_audio_chunk_with_context(
                 "speech_rate": prosody_data.get("speech_rate", 0)
             }
 
-        await websocket.send_json(transcription_data)
-
-        # Save user message
-        await db.add_message(conversation_id, "user", transcription)
-
-        # 2. Sentiment Analysis
-        sentiment_start = datetime.utcnow()
-        sentiment = await analyze_sentiment(transcription)
-        sentiment_end = datetime.utcnow()
+        # 2. Sentiment Analysis, overlapped with the transcription send, the DB write
+        # and the response cache embedding (all independent of each other)
+        sentiment_task = asyncio.create_task(analyze_sentiment(transcription))
+        embed_task = asyncio.create_task(response_cache.embed(transcription))
+        db.queue_message(conversation_id, "user", transcription)
+        await gate.send_json(transcription_data)
+        sentiment, query_vector = await asyncio.gather(sentiment_task, embed_task)
         metrics["sentiment_score"] = sentiment["score"]
         metrics["sentiment_label"] = sentiment["label"]
 
@@ -1234,22 +1735,23 @@ async def process_audio_chunk_with_context(
                 sentiment["label"] = "frustrated"
                 sentiment["score"] = -0.4
 
-        # Send sentiment to client
-        await websocket.send_json({
-            "type": "sentiment",
-            "sentiment": sentiment["label"],
-            "score": sentiment["score"]
-        })
+        # Send sentiment to client (skipped under backpressure)
+        if not gate.is_backpressured():
+            await gate.send_json({
+                "type": "sentiment",
+                "sentiment": sentiment["label"],
+                "score": sentiment["score"]
+            })
 
         logger.info(f"[{conversation_id}] Sentiment: {sentiment['label']} ({sentiment['score']})")
 
         # Trigger webhook if sentiment is negative
         if sentiment["label"] in ["frustrated", "angry"] or sentiment["score"] < -0.5:
-            asyncio.create_task(trigger_webhook_event(
+            enqueue_webhook_event(
                 "sentiment_alert",
                 conversation_id,
                 {"sentiment": sentiment["label"], "score": sentiment["score"], "message": transcription}
-            ))
+            )
 
         # 3. Build LLM context with prosody information
         llm_context = sentiment.get("guidance", "")
@@ -1267,17 +1769,37 @@ async def process_audio_chunk_with_context(
             elif emotional_tone == "excited":
                 llm_context += " El usuario está entusiasmado. Mantén un tono positivo."
 
-        # 4. Get LLM response with context (with retry and metrics)
-        llm_start = datetime.utcnow()
-        use_tools = True  # Enable function calling
-        llm_result = await call_llm(
-            conversation_id,
-            transcription,
-            use_tools=use_tools,
-            context=llm_context if llm_context else None
-        )
-        llm_end = datetime.utcnow()
-        metrics["llm_latency_ms"] = int((llm_end - llm_start).total_seconds() * 1000)
+        # 4. Get LLM response with context (response cache first, then LLM with retry)
+        llm_start = time.perf_counter_ns()
+        cached = await response_cache.lookup(conversation_id, transcription, llm_context, vector=query_vector)
+        streamed = False
+        if cached:
+            llm_result = {"response": cached["response"], "tool_calls": []}
+            run_in_background(sync_llm_history(conversation_id, transcription, cached["response"]))
+        elif ENABLE_LLM_STREAMING:
+            # Speak sentence by sentence while the LLM is still generating
+            try:
+                tts_pipeline = await stream_llm_to_tts(
+                    gate, conversation_id, transcription, llm_context or None
+                )
+                llm_result = {"response": tts_pipeline.full_response, "tool_calls": []}
+                streamed = True
+                metrics["streaming_chunks"] = tts_pipeline.chunks_sent
+                if tts_pipeline.first_audio_ns:
+                    metrics["first_audio_ms"] = (tts_pipeline.first_audio_ns - start_ns) // 1_000_000
+            except Exception as stream_error:
+                logger.error(f"Streaming error: {stream_error}. Falling back to non-streaming.")
+
+        if not cached and not streamed:
+            use_tools = True  # Enable function calling
+            llm_result = await call_llm(
+                conversation_id,
+                transcription,
+                use_tools=use_tools,
+                context=llm_context if llm_context else None
+            )
+        metrics["llm_latency_ms"] = (time.perf_counter_ns() - llm_start) // 1_000_000
+        metrics["cache_hit"] = cached is not None
 
         ai_response = llm_result["response"]
         tool_calls = llm_result.get("tool_calls", [])
@@ -1292,7 +1814,7 @@ async def process_audio_chunk_with_context(
                 tool_result = await execute_tool_call(tool_name, arguments, conversation_id)
 
                 # Send tool execution result to client
-                await websocket.send_json({
+                await gate.send_json({
                     "type": "tool_call",
                     "tool": tool_name,
                     "result": tool_result
@@ -1301,48 +1823,50 @@ async def process_audio_chunk_with_context(
         logger.info(f"[{conversation_id}] AI: {ai_response[:50]}...")
 
         # Send AI response text
-        await websocket.send_json({
+        await gate.send_json({
             "type": "response",
             "text": ai_response
         })
 
         # Save assistant message
-        await db.add_message(conversation_id, "assistant", ai_response)
+        db.queue_message(conversation_id, "assistant", ai_response)
 
         # 6. Text to Speech (with retry and metrics)
-        tts_start = datetime.utcnow()
-        tts_result = await call_tts(ai_response)
-        tts_end = datetime.utcnow()
-        metrics["tts_latency_ms"] = int((tts_end - tts_start).total_seconds() * 1000)
+        tts_start = time.perf_counter_ns()
+        if streamed:
+            # Audio already sent sentence by sentence
+            tts_result = {}
+            schedule_speaking_done(conversation_id)
+        else:
+            tts_result = await call_tts(ai_response)
+        metrics["tts_latency_ms"] = (time.perf_counter_ns() - tts_start) // 1_000_000
 
         audio_base64 = tts_result.get("audio_base64")
+        audio_duration_ms = tts_result.get("duration_ms", 0)
         if audio_base64:
             # Mark assistant as speaking
-            if conversation_id not in conversation_playback_state:
-                conversation_playback_state[conversation_id] = {}
-            conversation_playback_state[conversation_id]["is_speaking"] = True
+            add_playback_audio(conversation_id, audio_duration_ms)
 
             # Send audio
-            await websocket.send_json({
+            await gate.send_json({
                 "type": "audio",
                 "audio": audio_base64
             })
 
-            # Create a task that marks speaking as done after audio duration
-            async def mark_speaking_done():
-                await asyncio.sleep(len(ai_response) * 0.05)  # Rough estimate
-                if conversation_id in conversation_playback_state:
-                    conversation_playback_state[conversation_id]["is_speaking"] = False
+            # Mark speaking as done after the synthesized audio duration
+            schedule_speaking_done(conversation_id)
 
-            task = asyncio.create_task(mark_speaking_done())
-            conversation_playback_state[conversation_id]["task"] = task
+        # Cache the turn for repeated utterances (tool calls have side effects, never cached)
+        if not cached and not tool_calls:
+            await response_cache.store(conversation_id, transcription, llm_context, ai_response,
+                                       vector=query_vector)
+        response_cache.record_turn(conversation_id, transcription)
 
         # 7. Calculate total latency and log metrics
-        end_time = datetime.utcnow()
-        metrics["total_latency_ms"] = int((end_time - start_time).total_seconds() * 1000)
+        metrics["total_latency_ms"] = (time.perf_counter_ns() - start_ns) // 1_000_000
 
         # Log metrics to database
-        await db.log_event(
+        db.queue_event(
             conversation_id=conversation_id,
             event_type="turn_completed_with_context",
             details=metrics
@@ -1353,7 +1877,7 @@ async def process_audio_chunk_with_context(
                    f"Total={metrics['total_latency_ms']}ms")
 
         # Trigger webhook for turn completed
-        asyncio.create_task(trigger_webhook_event(
+        enqueue_webhook_event(
             "turn_completed",
             conversation_id,
             {
@@ -1362,11 +1886,11 @@ async def process_audio_chunk_with_context(
                 "ai_response": ai_response[:100],
                 "prosody": prosody_data if prosody_data else {}
             }
-        ))
+        )
 
     except Exception as e:
         logger.error(f"[{conversation_id}] Audio processing with context error: {e}")
-        await websocket.send_json({
+        await gate.send_json({
             "type": "error",
             "message": str(e)
         })
@@ -1375,6 +1899,21 @@ async def process_audio_chunk_with_context(
 # ===========================================
 # Asterisk AudioSocket Handler
 # ===========================================
+AUDIOSOCKET_SAMPLE_RATE = int(os.getenv("AUDIOSOCKET_SAMPLE_RATE", "8000"))  # Asterisk slin
+AUDIOSOCKET_FRAME_BYTES = AUDIOSOCKET_SAMPLE_RATE * 2 // 50  # one 20ms Asterisk frame
+# Frames are coalesced into windows of this size before VAD (fewer calls, larger numpy ops)
+AUDIOSOCKET_COALESCE_MS = int(os.getenv("AUDIOSOCKET_COALESCE_MS", "100"))
+AUDIOSOCKET_COALESCE_BYTES = AUDIOSOCKET_SAMPLE_RATE * 2 * AUDIOSOCKET_COALESCE_MS // 1000
+
+
+def pcm_level(data: bytes) -> float:
+    """Mean absolute amplitude of a signed 16-bit PCM frame (AudioSocket slin), vectorized"""
+    samples = np.frombuffer(data, dtype=np.int16, count=len(data) // 2)
+    if not len(samples):
+        return 0.0
+    return float(np.abs(samples, dtype=np.int32).mean())
+
+
 @app.websocket("/audiosocket/{conversation_id}")
 async def audiosocket_handler(websocket: WebSocket, conversation_id: str):
     """
@@ -1399,8 +1938,14 @@ async def audiosocket_handler(websocket: WebSocket, conversation_id: str):
         # Create conversation in database
         await db.create_conversation(conversation_id=conversation_id)
         
-        # Send greeting
-        greeting_audio = await generate_greeting_audio()
+        # Send greeting (raw audio bytes, cached after the first call)
+        try:
+            greeting_audio = (await call_tts(
+                GREETING, return_bytes=True, audio_format="slin", sample_rate=AUDIOSOCKET_SAMPLE_RATE
+            )).get("content")
+        except Exception as e:
+            logger.error(f"Greeting audio error: {e}")
+            greeting_audio = None
         if greeting_audio:
             await websocket.send_bytes(greeting_audio)
         
@@ -1408,15 +1953,40 @@ async def audiosocket_handler(websocket: WebSocket, conversation_id: str):
         silence_frames = 0
         SILENCE_THRESHOLD = 500  # Adjust based on audio format
         MAX_SILENCE_FRAMES = 30  # ~1.5 seconds of silence triggers processing
+
+        # Silero VAD (shared session, per-call state); energy VAD if unavailable
+        vad = get_vad()
+        vad_stream = vad.new_stream(AUDIOSOCKET_SAMPLE_RATE) if vad else None
         
+        pending_frames = bytearray()
+
         while True:
-            data = await websocket.receive_bytes()
+            pending_frames.extend(await websocket.receive_bytes())
+            if len(pending_frames) < AUDIOSOCKET_COALESCE_BYTES:
+                continue
+            data = bytes(pending_frames)
+            pending_frames.clear()
+
+            if vad_stream is not None:
+                was_speaking = vad_stream.speaking
+                if vad_stream.process(data):
+                    audio_buffer.extend(data)
+                elif was_speaking and audio_buffer:
+                    # End of utterance (hysteresis + minimum silence)
+                    response_audio = await process_and_respond(
+                        conversation_id,
+                        bytes(audio_buffer)
+                    )
+                    if response_audio:
+                        await websocket.send_bytes(response_audio)
+                    audio_buffer.clear()
+                continue
             
             # Simple VAD: check if audio is silence
-            audio_level = sum(abs(b - 128) for b in data) / len(data)
+            audio_level = pcm_level(data)
             
             if audio_level < SILENCE_THRESHOLD:
-                silence_frames += 1
+                silence_frames += max(1, len(data) // AUDIOSOCKET_FRAME_BYTES)
                 if silence_frames >= MAX_SILENCE_FRAMES and audio_buffer:
                     # Process accumulated audio
                     response_audio = await process_and_respond(
@@ -1456,16 +2026,18 @@ async def process_and_respond(conversation_id: str, audio_data: bytes) -> Option
             return None
         
         logger.info(f"[Asterisk:{conversation_id}] User: {transcription[:50]}...")
-        await db.add_message(conversation_id, "user", transcription)
+        db.queue_message(conversation_id, "user", transcription)
         
         # LLM (with retry)
-        ai_response = await call_llm(conversation_id, transcription)
+        ai_response = (await call_llm(conversation_id, transcription))["response"]
         
         logger.info(f"[Asterisk:{conversation_id}] AI: {ai_response[:50]}...")
-        await db.add_message(conversation_id, "assistant", ai_response)
+        db.queue_message(conversation_id, "assistant", ai_response)
         
-        # TTS - get raw audio bytes (with retry)
-        tts_result = await call_tts(ai_response, return_bytes=True)
+        # TTS - raw 8kHz slin, what AudioSocket plays (with retry)
+        tts_result = await call_tts(
+            ai_response, return_bytes=True, audio_format="slin", sample_rate=AUDIOSOCKET_SAMPLE_RATE
+        )
         return tts_result.get("content")
                 
     except Exception as e:
@@ -1476,4 +2048,4 @@ async def process_and_respond(conversation_id: str, audio_data: bytes) -> Option
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_max_queue=16)
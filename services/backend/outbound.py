@@ -4,14 +4,17 @@ API for initiating outbound AI calls via Asterisk
 """
 
 import os
+import json
 import uuid
 import asyncio
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import httpx
+from loguru import logger
 
 
 # ===========================================
@@ -20,6 +23,36 @@ import httpx
 ASTERISK_ARI_URL = os.getenv("ASTERISK_ARI_URL", "http://asterisk:8088/ari")
 ASTERISK_ARI_USER = os.getenv("ASTERISK_ARI_USER", "asterisk")
 ASTERISK_ARI_PASSWORD = os.getenv("ASTERISK_ARI_PASSWORD", "asterisk")
+CHANNEL_POLL_INTERVAL = float(os.getenv("ARI_CHANNEL_POLL_INTERVAL", "0.5"))  # seconds
+
+
+# ===========================================
+# ARI Client (shared keep-alive pool)
+# ===========================================
+_ari_client: Optional[httpx.AsyncClient] = None
+
+
+def get_ari_client() -> httpx.AsyncClient:
+    """Get the shared ARI client (authenticated, pooled connections to Asterisk)"""
+    global _ari_client
+    if _ari_client is None or _ari_client.is_closed:
+        _ari_client = httpx.AsyncClient(
+            base_url=ASTERISK_ARI_URL,
+            auth=(ASTERISK_ARI_USER, ASTERISK_ARI_PASSWORD),
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+            timeout=10.0
+        )
+    return _ari_client
+
+
+async def close_ari_client():
+    """Stop the status poller and close the shared ARI client (call from app shutdown)"""
+    global _ari_client
+    if _poller_task is not None:
+        _poller_task.cancel()
+    if _ari_client is not None:
+        await _ari_client.aclose()
+        _ari_client = None
 
 
 # ===========================================
@@ -51,10 +84,89 @@ class CallStatusResponse(BaseModel):
     transcript: Optional[list] = None
 
 
+class StartRateLimiter:
+    """
+    Token bucket for call starts: `rate` starts per second with bursts of up
+    to `capacity`. Waiters are served in order.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._last = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self._last is not None:
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._last = loop.time()
+            self._tokens -= 1
+
+
 # ===========================================
 # Active Calls Store
 # ===========================================
 active_calls = {}
+_call_by_channel: Dict[str, str] = {}  # channel_id -> call_id
+_call_ended: Dict[str, asyncio.Event] = {}  # call_id -> set when the call ends
+_poller_task: Optional[asyncio.Task] = None
+
+
+def _mark_ended(call: dict):
+    call["status"] = "ended"
+    _call_by_channel.pop(call.get("channel_id"), None)
+    event = _call_ended.get(call["call_id"])
+    if event:
+        event.set()
+
+
+async def poll_channels():
+    """
+    Refresh the status of every live outbound call with a single
+    GET /channels per interval (status reads never hit ARI).
+    """
+    while True:
+        await asyncio.sleep(CHANNEL_POLL_INTERVAL)
+        if not _call_by_channel:
+            continue
+        # Snapshot before the GET: calls originated while it is in flight
+        # are not in the response and must not be taken as ended
+        tracked = list(_call_by_channel.items())
+        try:
+            response = await get_ari_client().get("/channels")
+            if response.status_code != 200:
+                continue
+            states = {channel["id"]: channel.get("state", "unknown") for channel in response.json()}
+        except Exception as e:
+            logger.warning(f"ARI channel poll failed: {e}")
+            continue
+
+        for channel_id, call_id in tracked:
+            if _call_by_channel.get(channel_id) != call_id:
+                continue  # Removed meanwhile
+            call = active_calls.get(call_id)
+            if call is None:
+                _call_by_channel.pop(channel_id, None)
+            elif channel_id in states:
+                call["status"] = states[channel_id]
+            else:
+                _mark_ended(call)
+
+
+def start_channel_poller():
+    """Start the background ARI status poller (call from app startup)"""
+    global _poller_task
+    if _poller_task is None or _poller_task.done():
+        _poller_task = asyncio.create_task(poll_channels())
 
 
 # ===========================================
@@ -71,33 +183,30 @@ async def initiate_outbound_call(request: OutboundCallRequest):
     conversation_id = f"outbound-{call_id}"
     
     try:
-        # Originate call via Asterisk ARI
-        async with httpx.AsyncClient() as client:
-            # Create channel
-            response = await client.post(
-                f"{ASTERISK_ARI_URL}/channels",
-                auth=(ASTERISK_ARI_USER, ASTERISK_ARI_PASSWORD),
-                params={
-                    "endpoint": f"PJSIP/{request.phone_number}@trunk-endpoint",
-                    "extension": "s",
-                    "context": "outbound-connect",
-                    "priority": 1,
-                    "callerId": request.caller_id or os.getenv("OUTBOUND_CALLERID", "AI Call Center"),
-                    "timeout": 60,
-                    "variables": {
-                        "CONVERSATION_ID": conversation_id,
-                        "CAMPAIGN_ID": request.campaign_id or ""
-                    }
+        # Originate call via Asterisk ARI (create channel)
+        response = await get_ari_client().post(
+            "/channels",
+            params={
+                "endpoint": f"PJSIP/{request.phone_number}@trunk-endpoint",
+                "extension": "s",
+                "context": "outbound-connect",
+                "priority": 1,
+                "callerId": request.caller_id or os.getenv("OUTBOUND_CALLERID", "AI Call Center"),
+                "timeout": 60,
+                "variables": {
+                    "CONVERSATION_ID": conversation_id,
+                    "CAMPAIGN_ID": request.campaign_id or ""
                 }
+            }
+        )
+        
+        if response.status_code not in [200, 201]:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to originate call: {response.text}"
             )
-            
-            if response.status_code not in [200, 201]:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to originate call: {response.text}"
-                )
-            
-            channel_data = response.json()
+        
+        channel_data = response.json()
             
         # Store call info
         active_calls[call_id] = {
@@ -109,6 +218,9 @@ async def initiate_outbound_call(request: OutboundCallRequest):
             "channel_id": channel_data.get("id"),
             "context": request.context
         }
+        _call_ended[call_id] = asyncio.Event()
+        if channel_data.get("id"):
+            _call_by_channel[channel_data["id"]] = call_id
         
         return OutboundCallResponse(
             call_id=call_id,
@@ -128,25 +240,9 @@ async def get_call_status(call_id: str):
     if call_id not in active_calls:
         raise HTTPException(status_code=404, detail="Call not found")
     
+    # Status is kept fresh by the background channel poller
     call = active_calls[call_id]
     
-    # Get channel status from Asterisk
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ASTERISK_ARI_URL}/channels/{call['channel_id']}",
-                auth=(ASTERISK_ARI_USER, ASTERISK_ARI_PASSWORD)
-            )
-            
-            if response.status_code == 200:
-                channel = response.json()
-                call["status"] = channel.get("state", "unknown")
-            elif response.status_code == 404:
-                call["status"] = "ended"
-                
-    except Exception:
-        pass  # Use cached status
-    
     return CallStatusResponse(
         call_id=call_id,
         status=call["status"],
@@ -155,6 +251,23 @@ async def get_call_status(call_id: str):
     )
 
 
+@router.get("/call/{call_id}/ended")
+async def wait_call_ended(call_id: str, timeout: float = 30.0):
+    """Long-poll until the call ends (or timeout), instead of polling the status"""
+    if call_id not in active_calls:
+        raise HTTPException(status_code=404, detail="Call not found")
+    
+    event = _call_ended.setdefault(call_id, asyncio.Event())
+    if active_calls[call_id]["status"] == "ended":
+        event.set()
+    try:
+        await asyncio.wait_for(event.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    
+    return {"call_id": call_id, "status": active_calls[call_id]["status"], "ended": event.is_set()}
+
+
 @router.delete("/call/{call_id}")
 async def hangup_call(call_id: str):
     """Hangup an active call"""
@@ -164,13 +277,9 @@ async def hangup_call(call_id: str):
     call = active_calls[call_id]
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{ASTERISK_ARI_URL}/channels/{call['channel_id']}",
-                auth=(ASTERISK_ARI_USER, ASTERISK_ARI_PASSWORD)
-            )
+        await get_ari_client().delete(f"/channels/{call['channel_id']}")
             
-        call["status"] = "ended"
+        _mark_ended(call)
         return {"status": "Call terminated"}
         
     except Exception as e:
@@ -183,7 +292,8 @@ async def start_campaign(
     campaign_id: Optional[str] = None,
     caller_id: Optional[str] = None,
     concurrent_calls: int = 5,
-    delay_between_calls: float = 1.0
+    delay_between_calls: float = 1.0,
+    stream: bool = False
 ):
     """
     Start a campaign with multiple outbound calls
@@ -192,14 +302,21 @@ async def start_campaign(
         phone_numbers: List of phone numbers to call
         campaign_id: Optional campaign identifier
         concurrent_calls: Max concurrent calls
-        delay_between_calls: Seconds between initiating calls
+        delay_between_calls: Seconds between initiating calls (per concurrent slot)
+        stream: Return one NDJSON line per call as it completes, then a summary line
     """
     campaign_id = campaign_id or str(uuid.uuid4())
     results = []
     
+    # Starts are paced by a token bucket; originates overlap up to concurrent_calls
     semaphore = asyncio.Semaphore(concurrent_calls)
+    limiter = None
+    if delay_between_calls > 0:
+        limiter = StartRateLimiter(rate=concurrent_calls / delay_between_calls, capacity=concurrent_calls)
     
-    async def call_number(phone: str):
+    async def call_number(phone: str) -> dict:
+        if limiter:
+            await limiter.acquire()
         async with semaphore:
             try:
                 result = await initiate_outbound_call(
@@ -209,22 +326,34 @@ async def start_campaign(
                         campaign_id=campaign_id
                     )
                 )
-                results.append({"phone": phone, "status": "initiated", "call_id": result.call_id})
+                outcome = {"phone": phone, "status": "initiated", "call_id": result.call_id}
             except Exception as e:
-                results.append({"phone": phone, "status": "failed", "error": str(e)})
-            
-            await asyncio.sleep(delay_between_calls)
+                outcome = {"phone": phone, "status": "failed", "error": str(e)}
+        results.append(outcome)
+        return outcome
+    
+    def summary() -> dict:
+        return {
+            "campaign_id": campaign_id,
+            "total_numbers": len(phone_numbers),
+            "initiated": len([r for r in results if r["status"] == "initiated"]),
+            "failed": len([r for r in results if r["status"] == "failed"]),
+            "results": results
+        }
     
     # Start all calls
-    await asyncio.gather(*[call_number(phone) for phone in phone_numbers])
+    tasks = [asyncio.create_task(call_number(phone)) for phone in phone_numbers]
     
-    return {
-        "campaign_id": campaign_id,
-        "total_numbers": len(phone_numbers),
-        "initiated": len([r for r in results if r["status"] == "initiated"]),
-        "failed": len([r for r in results if r["status"] == "failed"]),
-        "results": results
-    }
+    if stream:
+        async def ndjson():
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+            yield json.dumps(summary()) + "\n"
+        
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    await asyncio.gather(*tasks)
+    return summary()
 
 
 @router.get("/active")
@@ -0,0 +1,307 @@
+"""
+Semantic Response Cache
+Reuses LLM responses for repeated user utterances (audio comes from the TTS cache)
+"""
+
+import os
+import re
+import time
+import asyncio
+import threading
+import unicodedata
+from collections import OrderedDict, deque
+from typing import Optional, Dict, List, Tuple
+
+from loguru import logger
+
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    EMBEDDINGS_AVAILABLE = True
+except ImportError:
+    EMBEDDINGS_AVAILABLE = False
+
+
+# ===========================================
+# Configuration
+# ===========================================
+ENABLE_RESPONSE_CACHE = os.getenv("ENABLE_RESPONSE_CACHE", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))  # e5 scores unrelated short utterances 0.8-0.9
+RESPONSE_CACHE_MODEL = os.getenv("RESPONSE_CACHE_MODEL", "intfloat/multilingual-e5-small")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))  # seconds
+# Also cache later turns within their own conversation (rarely hit again: off by default)
+RESPONSE_CACHE_PER_CALLER = os.getenv("RESPONSE_CACHE_PER_CALLER", "false").lower() == "true"
+
+# Number of previous user turns that must match for a cached answer to apply
+CONTEXT_TURNS = 2
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+
+# Utterances that likely trigger a tool call (transfer, callback, customer lookup):
+# never answered from cache, their side effects must run every time
+_ACTION_INTENT_RE = re.compile(
+    r"\b(agend|program|reserv|cancel|anul|transfer|comunic|pas(a|e)me|llam(a|e)me|llamar|"
+    r"devuelv|cita|agente|asesor|humano|persona|supervisor|mi cuenta|mi numero|mi pedido|"
+    r"cedula|documento)",
+)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCT_RE.sub(" ", text)
+    return _WS_RE.sub(" ", text).strip()
+
+
+def tool_calls_likely(normalized: str) -> bool:
+    """Heuristic action-intent check on a normalized utterance"""
+    return _ACTION_INTENT_RE.search(normalized) is not None
+
+
+class ResponseCache:
+    """
+    LRU cache of LLM responses keyed by normalized user utterance.
+
+    An entry only applies when the LLM guidance and the previous user turns
+    of the conversation match the ones it was recorded with. Opening turns
+    (no previous user turn, so the LLM saw no per-caller history) are shared
+    across conversations; later turns are only cached with
+    RESPONSE_CACHE_PER_CALLER, and then only within their own conversation.
+    When sentence-transformers is installed, near-duplicate utterances
+    (cosine >= threshold) also hit.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        threshold: float = RESPONSE_CACHE_THRESHOLD,
+        model_name: str = RESPONSE_CACHE_MODEL,
+        ttl: float = RESPONSE_CACHE_TTL
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.model_name = model_name
+        self.ttl = ttl
+
+        # (context_key, normalized_text) -> entry
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        # Recent normalized user turns per conversation
+        self._recent: Dict[str, deque] = {}
+
+        self._model = None
+        self._model_failed = not EMBEDDINGS_AVAILABLE
+        self._model_lock = threading.Lock()  # warm() and a first lookup may race to load it
+        self._vectors = None  # float32 [max_entries, dim], rows aligned with _slots
+        self._slots: List[Optional[Tuple[str, str]]] = []
+        self._slot_of: Dict[Tuple[str, str], int] = {}
+        self._free_slots: List[int] = []
+
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- context ----------
+
+    def _context_key(self, conversation_id: str, llm_context: Optional[str]) -> Optional[str]:
+        """Context part of the key, or None if this turn is not cacheable"""
+        previous = self._recent.get(conversation_id)
+        if not previous:
+            # Answered from the system prompt alone: safe to reuse for any caller
+            return f"*|{llm_context or ''}"
+        if not RESPONSE_CACHE_PER_CALLER:
+            return None
+        # Answer depends on this caller's history: never shared
+        return f"{conversation_id}|{llm_context or ''}|{'|'.join(previous)}"
+
+    def record_turn(self, conversation_id: str, transcription: str):
+        """Register a completed user turn (after lookup/store for that turn)"""
+        recent = self._recent.setdefault(conversation_id, deque(maxlen=CONTEXT_TURNS))
+        recent.append(normalize_text(transcription))
+
+    def forget(self, conversation_id: str):
+        """Drop per-conversation state and entries when the call ends"""
+        self._recent.pop(conversation_id, None)
+        prefix = f"{conversation_id}|"
+        for key in [key for key in self._entries if key[0].startswith(prefix)]:
+            self._drop(key)
+
+    # ---------- embeddings ----------
+
+    def _get_model(self):
+        if self._model is None and not self._model_failed:
+            with self._model_lock:
+                if self._model is None and not self._model_failed:
+                    try:
+                        self._model = SentenceTransformer(self.model_name)
+                        logger.info(f"Response cache embeddings: {self.model_name}")
+                    except Exception as e:
+                        logger.warning(f"Response cache embeddings no disponibles: {e}")
+                        self._model_failed = True
+        return self._model
+
+    def _embed(self, text: str):
+        model = self._get_model()
+        if model is None:
+            return None
+        vector = model.encode(f"query: {text}", normalize_embeddings=True)
+        return np.asarray(vector, dtype=np.float32)
+
+    def _nearest(self, vector, context_key: str) -> Optional[Tuple[str, str]]:
+        if self._vectors is None or not self._slots:
+            return None
+        scores = self._vectors[:len(self._slots)] @ vector
+        for slot in np.argsort(scores)[::-1][:8]:
+            if scores[slot] < self.threshold:
+                break
+            key = self._slots[slot]
+            if key is not None and key[0] == context_key:
+                return key
+        return None
+
+    def _index(self, key: Tuple[str, str], vector):
+        if vector is None:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+        # Reuse the slot of an evicted entry if any
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._slots)
+            self._slots.append(None)
+        self._slots[slot] = key
+        self._slot_of[key] = slot
+        self._vectors[slot] = vector
+
+    def _drop(self, key: Tuple[str, str]):
+        self._entries.pop(key, None)
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self._slots[slot] = None
+            self._free_slots.append(slot)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _expired(self, entry: Dict) -> bool:
+        return self.ttl > 0 and time.monotonic() - entry["created"] > self.ttl
+
+    # ---------- public API ----------
+
+    async def warm(self):
+        """Load (and download if needed) the embedding model off the call path"""
+        if ENABLE_RESPONSE_CACHE and not self._model_failed:
+            await asyncio.to_thread(self._get_model)
+
+    async def embed(self, transcription: str):
+        """Embed an utterance ahead of lookup/store, so it can overlap other per-turn work"""
+        if not ENABLE_RESPONSE_CACHE or self._model_failed:
+            return None
+        normalized = normalize_text(transcription)
+        if not normalized or tool_calls_likely(normalized):
+            return None
+        try:
+            return await asyncio.to_thread(self._embed, normalized)
+        except Exception as e:
+            logger.warning(f"Response cache embed error: {e}")
+            return None
+
+    async def lookup(
+        self,
+        conversation_id: str,
+        transcription: str,
+        llm_context: Optional[str] = None,
+        vector=None
+    ) -> Optional[Dict]:
+        """Return {"response"} for a compatible cached turn, or None"""
+        if not ENABLE_RESPONSE_CACHE:
+            return None
+
+        context_key = self._context_key(conversation_id, llm_context)
+        if context_key is None:
+            return None
+        key = (context_key, normalize_text(transcription))
+        if tool_calls_likely(key[1]):
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None and not self._model_failed:
+            try:
+                if vector is None:
+                    vector = await asyncio.to_thread(self._embed, key[1])
+                if vector is not None:
+                    near = self._nearest(vector, context_key)
+                    if near is not None:
+                        key, entry = near, self._entries.get(near)
+            except Exception as e:
+                logger.warning(f"Response cache lookup error: {e}")
+
+        if entry is not None and self._expired(entry):
+            self._drop(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    async def store(
+        self,
+        conversation_id: str,
+        transcription: str,
+        llm_context: Optional[str],
+        response: str,
+        vector=None
+    ):
+        """Cache a completed turn (only call for turns without tool calls)"""
+        if not ENABLE_RESPONSE_CACHE or not response:
+            return
+
+        context_key = self._context_key(conversation_id, llm_context)
+        if context_key is None:
+            return
+        key = (context_key, normalize_text(transcription))
+        if not key[1] or tool_calls_likely(key[1]):
+            return
+
+        is_new = key not in self._entries
+        self._entries[key] = {"response": response, "created": time.monotonic()}
+        self._entries.move_to_end(key)
+        self._evict()
+
+        if is_new and not self._model_failed:
+            try:
+                if vector is None:
+                    vector = await asyncio.to_thread(self._embed, key[1])
+                if key in self._entries and key not in self._slot_of:
+                    self._index(key, vector)
+            except Exception as e:
+                logger.warning(f"Response cache store error: {e}")
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "embeddings": self._model is not None
+        }
+
+
+# Singleton
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the singleton response cache"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
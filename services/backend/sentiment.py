@@ -7,7 +7,12 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+import functools
+import os
 import random
+import time
+
+import numpy as np
 
 router = APIRouter(prefix="/sentiment", tags=["Sentiment Analysis"])
 
@@ -88,64 +93,103 @@ EMOTIONS = {
 # Mock Data Generation
 # ===========================================
 
+_RNG = np.random.default_rng()
+
+# (path, low, high) with high inclusive, like random.randint
+_METRIC_INT_FIELDS = (
+    (("nps", "score"), 30, 60),
+    (("nps", "promoters"), 50, 65),
+    (("nps", "passives"), 20, 30),
+    (("nps", "detractors"), 10, 20),
+    (("csat", "distribution", 5), 50, 70),
+    (("csat", "distribution", 4), 20, 35),
+    (("csat", "distribution", 3), 5, 15),
+    (("csat", "distribution", 2), 2, 8),
+    (("csat", "distribution", 1), 1, 5),
+    (("ces", "effort_levels", "very_easy"), 35, 50),
+    (("ces", "effort_levels", "easy"), 25, 40),
+    (("ces", "effort_levels", "neutral"), 10, 20),
+    (("ces", "effort_levels", "difficult"), 5, 15),
+    (("ces", "effort_levels", "very_difficult"), 1, 5),
+    (("emotion_distribution", "happy"), 30, 45),
+    (("emotion_distribution", "neutral"), 35, 50),
+    (("emotion_distribution", "frustrated"), 10, 20),
+    (("emotion_distribution", "angry"), 2, 8),
+    (("emotion_distribution", "sad"), 1, 5),
+    (("rubrics", "vocal", "tone"), 65, 85),
+    (("rubrics", "vocal", "pace"), 60, 80),
+    (("rubrics", "vocal", "clarity"), 75, 95),
+    (("rubrics", "vocal", "energy"), 60, 80),
+    (("rubrics", "linguistic", "politeness"), 75, 95),
+    (("rubrics", "linguistic", "empathy"), 65, 85),
+    (("rubrics", "linguistic", "professionalism"), 80, 98),
+    (("rubrics", "linguistic", "resolution_focus"), 70, 90),
+    (("rubrics", "behavioral", "patience"), 65, 85),
+    (("rubrics", "behavioral", "engagement"), 70, 90),
+    (("rubrics", "behavioral", "frustration_tolerance"), 60, 80),
+    (("rubrics", "behavioral", "rapport"), 65, 85),
+)
+
+# (path, low, high), rounded to 2 decimals
+_METRIC_FLOAT_FIELDS = (
+    (("csat", "score"), 4.2, 4.8),
+    (("ces", "score"), 2.0, 3.5),
+    (("pta_ratio",), 2.5, 5.0),
+)
+
+_CALL_RUBRIC_FIELDS = (
+    (("vocal_rubric", "tone"), 60, 90),
+    (("vocal_rubric", "pace"), 55, 85),
+    (("vocal_rubric", "clarity"), 70, 95),
+    (("vocal_rubric", "energy"), 55, 85),
+    (("linguistic_rubric", "politeness"), 70, 95),
+    (("linguistic_rubric", "empathy"), 60, 90),
+    (("linguistic_rubric", "professionalism"), 75, 98),
+    (("linguistic_rubric", "resolution_focus"), 65, 90),
+    (("behavioral_rubric", "patience"), 60, 90),
+    (("behavioral_rubric", "engagement"), 65, 90),
+    (("behavioral_rubric", "frustration_tolerance"), 55, 85),
+    (("behavioral_rubric", "rapport"), 60, 85),
+    (("nps_prediction",), 6, 10),
+)
+
+
+def _bounds(fields):
+    return (
+        np.array([f[1] for f in fields]),
+        np.array([f[2] for f in fields]),
+    )
+
+
+_METRIC_INT_BOUNDS = _bounds(_METRIC_INT_FIELDS)
+_METRIC_FLOAT_BOUNDS = _bounds(_METRIC_FLOAT_FIELDS)
+_CALL_RUBRIC_BOUNDS = _bounds(_CALL_RUBRIC_FIELDS)
+
+
+def _fill(result: Dict, fields, values: list) -> Dict:
+    """Place one batch of random values at their nested paths"""
+    for (path, _, _), value in zip(fields, values):
+        node = result
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return result
+
+
+def _random_ints(bounds) -> list:
+    low, high = bounds
+    return _RNG.integers(low, high, endpoint=True).tolist()
+
+
+def _random_floats(bounds) -> list:
+    low, high = bounds
+    return np.round(_RNG.uniform(low, high), 2).tolist()
+
+
 def generate_mock_metrics():
-    """Generate mock sentiment metrics for demo"""
-    return {
-        "nps": {
-            "score": random.randint(30, 60),
-            "promoters": random.randint(50, 65),
-            "passives": random.randint(20, 30),
-            "detractors": random.randint(10, 20)
-        },
-        "csat": {
-            "score": round(random.uniform(4.2, 4.8), 2),
-            "distribution": {
-                5: random.randint(50, 70),
-                4: random.randint(20, 35),
-                3: random.randint(5, 15),
-                2: random.randint(2, 8),
-                1: random.randint(1, 5)
-            }
-        },
-        "ces": {
-            "score": round(random.uniform(2.0, 3.5), 2),
-            "effort_levels": {
-                "very_easy": random.randint(35, 50),
-                "easy": random.randint(25, 40),
-                "neutral": random.randint(10, 20),
-                "difficult": random.randint(5, 15),
-                "very_difficult": random.randint(1, 5)
-            }
-        },
-        "pta_ratio": round(random.uniform(2.5, 5.0), 2),
-        "emotion_distribution": {
-            "happy": random.randint(30, 45),
-            "neutral": random.randint(35, 50),
-            "frustrated": random.randint(10, 20),
-            "angry": random.randint(2, 8),
-            "sad": random.randint(1, 5)
-        },
-        "rubrics": {
-            "vocal": {
-                "tone": random.randint(65, 85),
-                "pace": random.randint(60, 80),
-                "clarity": random.randint(75, 95),
-                "energy": random.randint(60, 80)
-            },
-            "linguistic": {
-                "politeness": random.randint(75, 95),
-                "empathy": random.randint(65, 85),
-                "professionalism": random.randint(80, 98),
-                "resolution_focus": random.randint(70, 90)
-            },
-            "behavioral": {
-                "patience": random.randint(65, 85),
-                "engagement": random.randint(70, 90),
-                "frustration_tolerance": random.randint(60, 80),
-                "rapport": random.randint(65, 85)
-            }
-        }
-    }
+    """Generate mock sentiment metrics for demo (two vectorized draws)"""
+    result = _fill({}, _METRIC_INT_FIELDS, _random_ints(_METRIC_INT_BOUNDS))
+    return _fill(result, _METRIC_FLOAT_FIELDS, _random_floats(_METRIC_FLOAT_BOUNDS))
 
 
 def analyze_call_sentiment(transcript: List[Dict], audio_features: Optional[Dict] = None) -> Dict:
@@ -156,15 +200,14 @@ def analyze_call_sentiment(transcript: List[Dict], audio_features: Optional[Dict
     # Mock analysis - in production, use ML models
     emotions = list(EMOTIONS.keys())
     
-    # Generate emotion timeline
-    timeline = []
-    for i in range(0, 300, 30):  # Every 30 seconds for 5 minutes
-        emotion = random.choice(emotions)
-        timeline.append({
-            "emotion": emotion,
-            "confidence": round(random.uniform(0.6, 0.95), 2),
-            "timestamp": i
-        })
+    # Generate emotion timeline: every 30 seconds for 5 minutes
+    timestamps = range(0, 300, 30)
+    timeline_emotions = _RNG.choice(emotions, size=len(timestamps)).tolist()
+    confidences = np.round(_RNG.uniform(0.6, 0.95, size=len(timestamps)), 2).tolist()
+    timeline = [
+        {"emotion": emotion, "confidence": confidence, "timestamp": i}
+        for emotion, confidence, i in zip(timeline_emotions, confidences, timestamps)
+    ]
     
     # Calculate summary
     emotion_counts = {e: 0 for e in emotions}
@@ -187,7 +230,7 @@ def analyze_call_sentiment(transcript: List[Dict], audio_features: Optional[Dict
         label = "neutral"
         score = round(random.uniform(-0.2, 0.3), 2)
     
-    return {
+    result = {
         "overall_sentiment": {
             "score": score,
             "label": label,
@@ -195,27 +238,36 @@ def analyze_call_sentiment(transcript: List[Dict], audio_features: Optional[Dict
         },
         "emotion_timeline": timeline,
         "emotion_summary": summary,
-        "vocal_rubric": {
-            "tone": random.randint(60, 90),
-            "pace": random.randint(55, 85),
-            "clarity": random.randint(70, 95),
-            "energy": random.randint(55, 85)
-        },
-        "linguistic_rubric": {
-            "politeness": random.randint(70, 95),
-            "empathy": random.randint(60, 90),
-            "professionalism": random.randint(75, 98),
-            "resolution_focus": random.randint(65, 90)
-        },
-        "behavioral_rubric": {
-            "patience": random.randint(60, 90),
-            "engagement": random.randint(65, 90),
-            "frustration_tolerance": random.randint(55, 85),
-            "rapport": random.randint(60, 85)
-        },
-        "nps_prediction": random.randint(6, 10),
         "csat_prediction": round(random.uniform(3.5, 5.0), 1)
     }
+    return _fill(result, _CALL_RUBRIC_FIELDS, _random_ints(_CALL_RUBRIC_BOUNDS))
+
+
+# ===========================================
+# Dashboard response cache
+# ===========================================
+# Aggregate endpoints are polled every few seconds by every open dashboard:
+# compute them once per TTL window
+SENTIMENT_METRICS_CACHE_TTL = float(os.getenv("SENTIMENT_METRICS_CACHE_TTL", "2"))
+_metrics_cache: Dict[str, tuple] = {}  # endpoint -> (expires_at, response)
+
+
+def ttl_cached(endpoint):
+    """Cache the response of a parameterless endpoint for SENTIMENT_METRICS_CACHE_TTL seconds"""
+    key = endpoint.__name__
+
+    @functools.wraps(endpoint)
+    async def wrapper():
+        now = time.monotonic()
+        cached = _metrics_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        response = await endpoint()
+        if SENTIMENT_METRICS_CACHE_TTL > 0:
+            _metrics_cache[key] = (now + SENTIMENT_METRICS_CACHE_TTL, response)
+        return response
+
+    return wrapper
 
 
 # ===========================================
@@ -223,12 +275,14 @@ def analyze_call_sentiment(transcript: List[Dict], audio_features: Optional[Dict
 # ===========================================
 
 @router.get("/metrics")
+@ttl_cached
 async def get_sentiment_metrics():
     """Get overall sentiment metrics for the dashboard"""
     return generate_mock_metrics()
 
 
 @router.get("/metrics/nps")
+@ttl_cached
 async def get_nps_details():
     """Get detailed NPS breakdown and trends"""
     base = generate_mock_metrics()["nps"]
@@ -251,6 +305,7 @@ async def get_nps_details():
 
 
 @router.get("/metrics/csat")
+@ttl_cached
 async def get_csat_details():
     """Get detailed CSAT breakdown and trends"""
     base = generate_mock_metrics()["csat"]
@@ -272,6 +327,7 @@ async def get_csat_details():
 
 
 @router.get("/metrics/ces")
+@ttl_cached
 async def get_ces_details():
     """Get detailed CES (Customer Effort Score) breakdown"""
     return {
@@ -282,6 +338,7 @@ async def get_ces_details():
 
 
 @router.get("/rubrics")
+@ttl_cached
 async def get_rubrics():
     """Get sentiment rubrics (vocal, linguistic, behavioral)"""
     return generate_mock_metrics()["rubrics"]
@@ -310,6 +367,7 @@ async def get_emotion_definitions():
 
 
 @router.get("/trends/emotions")
+@ttl_cached
 async def get_emotion_trends():
     """Get emotion distribution trends over time"""
     trends = []
@@ -330,6 +388,7 @@ async def get_emotion_trends():
 
 
 @router.get("/fcr-impact")
+@ttl_cached
 async def get_fcr_sentiment_impact():
     """Get First Call Resolution impact on sentiment"""
     return {
@@ -0,0 +1,54 @@
+"""
+Shared HTTP Client
+One pooled httpx.AsyncClient for calls to the internal services (STT, LLM, TTS, audio)
+"""
+
+import os
+from typing import Optional
+
+import httpx
+from loguru import logger
+
+
+# ===========================================
+# Configuration
+# ===========================================
+SERVICE_HTTP_MAX_CONNECTIONS = int(os.getenv("SERVICE_HTTP_MAX_CONNECTIONS", "1024"))
+SERVICE_HTTP_MAX_KEEPALIVE = int(os.getenv("SERVICE_HTTP_MAX_KEEPALIVE", "256"))
+SERVICE_HTTP_TIMEOUT = float(os.getenv("SERVICE_HTTP_TIMEOUT", "60"))
+# HTTP/2 only helps behind a TLS proxy that speaks it (uvicorn is HTTP/1.1); needs the h2 package
+SERVICE_HTTP2 = os.getenv("SERVICE_HTTP2", "false").lower() == "true"
+
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared client (keep-alive pool reused across requests and calls)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        if SERVICE_HTTP2 and not H2_AVAILABLE:
+            logger.warning("SERVICE_HTTP2 habilitado pero h2 no está instalado, usando HTTP/1.1")
+        _http_client = httpx.AsyncClient(
+            http2=SERVICE_HTTP2 and H2_AVAILABLE,
+            timeout=SERVICE_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=SERVICE_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=SERVICE_HTTP_MAX_KEEPALIVE
+            )
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared client (call from app shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -0,0 +1,143 @@
+"""
+Voice Activity Detection
+Silero VAD (ONNX) shared across calls, with per-call streaming state
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+
+# ===========================================
+# Configuration
+# ===========================================
+ENABLE_SILERO_VAD = os.getenv("ENABLE_SILERO_VAD", "true").lower() == "true"
+SILERO_VAD_MODEL = os.getenv("SILERO_VAD_MODEL", "")  # Default: model bundled with the silero-vad package
+VAD_START_THRESHOLD = float(os.getenv("VAD_START_THRESHOLD", "0.5"))
+VAD_END_THRESHOLD = float(os.getenv("VAD_END_THRESHOLD", "0.35"))
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "700"))
+
+
+def _default_model_path() -> Optional[str]:
+    try:
+        from importlib.resources import files
+        path = files("silero_vad") / "data" / "silero_vad.onnx"
+        return str(path) if path.is_file() else None
+    except Exception:
+        return None
+
+
+class SileroVAD:
+    """
+    Single ONNX session shared by every call (stateless between runs: the
+    recurrent state lives in each VADStream).
+    """
+
+    STATE_SHAPE = (2, 1, 128)
+
+    def __init__(self, model_path: str):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        logger.info(f"Silero VAD cargado: {model_path}")
+
+    def new_stream(self, sample_rate: int = 16000) -> "VADStream":
+        return VADStream(self, sample_rate)
+
+    def run(self, window: np.ndarray, state: np.ndarray, sample_rate: int):
+        prob, state = self.session.run(None, {
+            "input": window[np.newaxis, :],
+            "state": state,
+            "sr": np.array(sample_rate, dtype=np.int64)
+        })
+        return float(prob[0, 0]), state
+
+
+class VADStream:
+    """
+    Per-call VAD state: feeds PCM int16 in windows of 512 (16kHz) / 256 (8kHz)
+    samples and applies start/end hysteresis.
+    """
+
+    def __init__(self, vad: SileroVAD, sample_rate: int):
+        if sample_rate not in (8000, 16000):
+            raise ValueError("Silero VAD soporta 8000 o 16000 Hz")
+        self.vad = vad
+        self.sample_rate = sample_rate
+        self.window_size = 512 if sample_rate == 16000 else 256
+        self.context_size = 64 if sample_rate == 16000 else 32
+        self.reset()
+
+    def reset(self):
+        self.state = np.zeros(SileroVAD.STATE_SHAPE, dtype=np.float32)
+        self.context = np.zeros(self.context_size, dtype=np.float32)
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.speaking = False
+        self.silence_ms = 0.0
+
+    def process(self, pcm: bytes) -> bool:
+        """
+        Feed a PCM int16 frame; returns whether the caller is currently speaking.
+        A True -> False transition marks the end of the utterance.
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2).astype(np.float32)
+        samples *= 1.0 / 32768.0
+        if len(self.pending):
+            samples = np.concatenate((self.pending, samples))
+
+        window_ms = self.window_size * 1000.0 / self.sample_rate
+        n_windows = len(samples) // self.window_size
+        for i in range(n_windows):
+            window = samples[i * self.window_size:(i + 1) * self.window_size]
+            prob, self.state = self.vad.run(
+                np.concatenate((self.context, window)), self.state, self.sample_rate
+            )
+            self.context = window[-self.context_size:]
+
+            # Hysteresis: start above the high threshold, stop below the low one
+            if prob >= VAD_START_THRESHOLD:
+                self.speaking = True
+                self.silence_ms = 0.0
+            elif prob < VAD_END_THRESHOLD:
+                self.silence_ms += window_ms
+                if self.silence_ms >= VAD_MIN_SILENCE_MS:
+                    self.speaking = False
+
+        self.pending = samples[n_windows * self.window_size:]
+        return self.speaking
+
+
+# Singleton
+_vad: Optional[SileroVAD] = None
+_vad_failed = False
+
+
+def get_vad() -> Optional[SileroVAD]:
+    """Get the shared Silero VAD, or None if it is disabled/unavailable (callers fall back to energy VAD)"""
+    global _vad, _vad_failed
+    if _vad is None and not _vad_failed:
+        model_path = SILERO_VAD_MODEL or _default_model_path()
+        if not ENABLE_SILERO_VAD or not ONNXRUNTIME_AVAILABLE or not model_path:
+            _vad_failed = True
+            if ENABLE_SILERO_VAD:
+                logger.warning("Silero VAD no disponible (onnxruntime o modelo faltante), usando VAD por energía")
+            return None
+        try:
+            _vad = SileroVAD(model_path)
+        except Exception as e:
+            logger.warning(f"Silero VAD no disponible: {e}")
+            _vad_failed = True
+    return _vad
@@ -4,19 +4,35 @@ Backend for managing custom vocabulary audio samples
 """
 
 import os
+import time
 import uuid
+import asyncio
 import shutil
 from datetime import datetime
 from typing import Optional, List
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
+from loguru import logger
 import aiofiles
 
-# Database imports (will use same DB as main backend)
-from database import Database
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# Database imports (same shared manager and pool as the main backend)
+from database import get_database
 
 
 # ===========================================
@@ -24,13 +40,97 @@ from database import Database
 # ===========================================
 VOCABULARY_AUDIO_DIR = Path(os.getenv("VOCABULARY_DIR", "/app/vocabulary"))
 VOCABULARY_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# /stats response kept for a while (exact COUNT(*) gets slow as tables grow);
+# every write endpoint drops it
+VOCABULARY_STATS_TTL = float(os.getenv("VOCABULARY_STATS_TTL", "60"))
+_stats_cache: Optional[tuple] = None  # (expires_at, stats)
+
+
+def invalidate_stats():
+    """Drop the cached /stats response after a write"""
+    global _stats_cache
+    _stats_cache = None
+
+
+def _copy_upload(source, path: Path):
+    source.seek(0)
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(source, f, UPLOAD_CHUNK_SIZE)
+
+
+async def save_upload(upload: UploadFile, path: Path):
+    """
+    Copy an uploaded file to disk in 64KB chunks (never the whole file in memory).
+    The whole copy runs in one worker thread instead of one thread-pool hop per chunk.
+    """
+    await asyncio.to_thread(_copy_upload, upload.file, path)
+
+
+async def insert_with_audio(table: str, row_id: str, insert, upload: UploadFile, audio_path: Path):
+    """
+    Write the uploaded audio and INSERT its row concurrently (latency = max, not sum);
+    duration_seconds is filled in afterwards, off the request path.
+    """
+    write_result, insert_result = await asyncio.gather(
+        save_upload(upload, audio_path), insert, return_exceptions=True
+    )
+    if isinstance(insert_result, BaseException):
+        audio_path.unlink(missing_ok=True)
+        raise insert_result
+    if isinstance(write_result, BaseException):
+        await db.execute(f"DELETE FROM {table} WHERE id = $1", row_id)
+        audio_path.unlink(missing_ok=True)
+        raise HTTPException(500, f"Could not store audio: {write_result}")
+    _spawn(_store_duration(table, row_id, audio_path))
+
+
+async def _store_duration(table: str, row_id: str, audio_path: Path):
+    # Background task: nobody awaits it, so failures are logged here
+    try:
+        duration = await asyncio.to_thread(audio_duration, audio_path)
+        if duration is not None:
+            await db.execute(f"UPDATE {table} SET duration_seconds = $1 WHERE id = $2", duration, row_id)
+            invalidate_stats()
+    except Exception as e:
+        logger.error(f"Error storing audio duration for {table} {row_id}: {e}")
+
+
+_background_tasks = set()
+
+
+def _spawn(coro):
+    # Keep a reference so the task is not garbage-collected mid-flight
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def audio_duration(path: Path) -> Optional[float]:
+    """Duration in seconds from the file header (frames / samplerate), without decoding the audio"""
+    if not SOUNDFILE_AVAILABLE:
+        return None
+    try:
+        info = sf.info(str(path))
+        return info.frames / info.samplerate
+    except Exception:
+        return None
+
+
+async def save_request_body(request: Request, path: Path):
+    """Stream a raw request body (e.g. Content-Type: audio/wav) straight to disk"""
+    async with aiofiles.open(path, 'wb') as f:
+        async for chunk in request.stream():
+            if chunk:
+                await f.write(chunk)
 
 
 # ===========================================
 # Router
 # ===========================================
 router = APIRouter(prefix="/vocabulary", tags=["Voice Vocabulary"])
-db = Database()
+db = get_database()
 
 
 # ===========================================
@@ -85,51 +185,75 @@ async def create_category(category: VocabularyCategory):
         VALUES ($1, $2, $3, $4, $5)
     """, category_id, category.name, category.description, category.parent_id, datetime.utcnow())
     
+    invalidate_stats()
     return {"id": category_id, "name": category.name}
 
 
 @router.get("/categories")
 async def list_categories():
     """List all vocabulary categories"""
+    # Counts come from two grouped aggregates, not two correlated subqueries per row
     categories = await db.fetch("""
-        SELECT c.*, 
-               (SELECT COUNT(*) FROM vocabulary_words WHERE category_id = c.id) as word_count,
-               (SELECT COUNT(*) FROM vocabulary_phrases WHERE category_id = c.id) as phrase_count
+        SELECT c.*,
+               COALESCE(w.cnt, 0) AS word_count,
+               COALESCE(p.cnt, 0) AS phrase_count
         FROM vocabulary_categories c
+        LEFT JOIN (
+            SELECT category_id, COUNT(*) AS cnt FROM vocabulary_words GROUP BY category_id
+        ) w ON w.category_id = c.id
+        LEFT JOIN (
+            SELECT category_id, COUNT(*) AS cnt FROM vocabulary_phrases GROUP BY category_id
+        ) p ON p.category_id = c.id
         ORDER BY c.name
     """)
     return {"categories": categories}
 
 
+def _json_rows(value) -> list:
+    """Rows aggregated with json_agg (asyncpg returns json columns as text)"""
+    if not isinstance(value, (str, bytes)):
+        return value or []
+    return orjson.loads(value) if ORJSON_AVAILABLE else json.loads(value)
+
+
 @router.get("/categories/{category_id}")
 async def get_category(category_id: str):
-    """Get category with its words and phrases"""
-    category = await db.fetchrow(
-        "SELECT * FROM vocabulary_categories WHERE id = $1", category_id
-    )
+    """Get category with its words and phrases (one round-trip)"""
+    category = await db.fetchrow("""
+        SELECT c.*,
+               COALESCE((SELECT json_agg(w ORDER BY w.word)
+                         FROM vocabulary_words w WHERE w.category_id = c.id), '[]'::json) AS words,
+               COALESCE((SELECT json_agg(p ORDER BY p.phrase)
+                         FROM vocabulary_phrases p WHERE p.category_id = c.id), '[]'::json) AS phrases
+        FROM vocabulary_categories c
+        WHERE c.id = $1
+    """, category_id)
     if not category:
         raise HTTPException(404, "Category not found")
-    
-    words = await db.fetch(
-        "SELECT * FROM vocabulary_words WHERE category_id = $1 ORDER BY word", category_id
-    )
-    phrases = await db.fetch(
-        "SELECT * FROM vocabulary_phrases WHERE category_id = $1 ORDER BY phrase", category_id
-    )
-    
+
+    words = _json_rows(category.pop("words"))
+    phrases = _json_rows(category.pop("phrases"))
+
     return {
-        "category": dict(category),
-        "words": [dict(w) for w in words],
-        "phrases": [dict(p) for p in phrases]
+        "category": category,
+        "words": words,
+        "phrases": phrases
     }
 
 
 @router.delete("/categories/{category_id}")
 async def delete_category(category_id: str):
     """Delete a category and its contents"""
-    await db.execute("DELETE FROM vocabulary_words WHERE category_id = $1", category_id)
-    await db.execute("DELETE FROM vocabulary_phrases WHERE category_id = $1", category_id)
-    await db.execute("DELETE FROM vocabulary_categories WHERE id = $1", category_id)
+    # Single atomic statement (FK checks run at statement end, after the child deletes)
+    await db.execute("""
+        WITH deleted_words AS (
+            DELETE FROM vocabulary_words WHERE category_id = $1
+        ), deleted_phrases AS (
+            DELETE FROM vocabulary_phrases WHERE category_id = $1
+        )
+        DELETE FROM vocabulary_categories WHERE id = $1
+    """, category_id)
+    invalidate_stats()
     return {"status": "deleted"}
 
 
@@ -147,36 +271,56 @@ async def create_word(
     """Create a new vocabulary word with optional audio"""
     word_id = str(uuid.uuid4())
     audio_path = None
-    duration = None
     
     if audio:
-        # Save audio file
         audio_filename = f"{word_id}_{word.replace(' ', '_')}.wav"
         audio_path = VOCABULARY_AUDIO_DIR / "words" / audio_filename
         audio_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        async with aiofiles.open(audio_path, 'wb') as f:
-            content = await audio.read()
-            await f.write(content)
-        
-        # Calculate duration (simplified)
-        import soundfile as sf
-        try:
-            data, sr = sf.read(str(audio_path))
-            duration = len(data) / sr
-        except:
-            pass
     
-    await db.execute("""
+    insert = db.execute("""
         INSERT INTO vocabulary_words 
         (id, word, phonetic, category_id, audio_path, duration_seconds, notes, sample_count, created_at, updated_at)
-        VALUES ($1, $2, $3, $4, $5, $6, $7, 1, $8, $8)
+        VALUES ($1, $2, $3, $4, $5, NULL, $6, 1, $7, $7)
     """, word_id, word, phonetic, category_id, str(audio_path) if audio_path else None, 
-        duration, notes, datetime.utcnow())
+        notes, datetime.utcnow())
     
+    if audio:
+        # Save audio file while the row is inserted
+        await insert_with_audio("vocabulary_words", word_id, insert, audio, audio_path)
+    else:
+        await insert
+    
+    invalidate_stats()
     return {"id": word_id, "word": word, "audio_path": str(audio_path) if audio_path else None}
 
 
+def _filtered_query(table: str, column: str, category: bool, search: bool, has_audio: Optional[bool] = None) -> str:
+    """SELECT for one filter signature (params numbered in order: category_id, search)"""
+    query = f"SELECT * FROM {table} WHERE 1=1"
+    n = 0
+    if category:
+        n += 1
+        query += f" AND category_id = ${n}"
+    if search:
+        n += 1
+        query += f" AND {column} ILIKE ${n}"
+    if has_audio is not None:
+        query += " AND audio_path IS NOT NULL" if has_audio else " AND audio_path IS NULL"
+    return query + f" ORDER BY {column}"
+
+
+# One fixed statement text per filter signature, so asyncpg's prepared statement
+# cache gets a hit on every call instead of re-planning
+_WORD_QUERIES = {
+    (category, search, has_audio): _filtered_query("vocabulary_words", "word", category, search, has_audio)
+    for category in (False, True) for search in (False, True) for has_audio in (None, True, False)
+}
+_PHRASE_QUERIES = {
+    (category, search): _filtered_query("vocabulary_phrases", "phrase", category, search)
+    for category in (False, True) for search in (False, True)
+}
+
+
 @router.get("/words")
 async def list_words(
     category_id: Optional[str] = Query(None),
@@ -184,27 +328,15 @@ async def list_words(
     has_audio: Optional[bool] = Query(None)
 ):
     """List vocabulary words with filters"""
-    query = "SELECT * FROM vocabulary_words WHERE 1=1"
     params = []
-    
     if category_id:
         params.append(category_id)
-        query += f" AND category_id = ${len(params)}"
-    
     if search:
         params.append(f"%{search}%")
-        query += f" AND word ILIKE ${len(params)}"
-    
-    if has_audio is not None:
-        if has_audio:
-            query += " AND audio_path IS NOT NULL"
-        else:
-            query += " AND audio_path IS NULL"
-    
-    query += " ORDER BY word"
     
+    query = _WORD_QUERIES[(bool(category_id), bool(search), has_audio)]
     words = await db.fetch(query, *params)
-    return {"words": [dict(w) for w in words], "total": len(words)}
+    return {"words": words, "total": len(words)}
 
 
 @router.get("/words/{word_id}")
@@ -213,7 +345,7 @@ async def get_word(word_id: str):
     word = await db.fetchrow("SELECT * FROM vocabulary_words WHERE id = $1", word_id)
     if not word:
         raise HTTPException(404, "Word not found")
-    return dict(word)
+    return word
 
 
 @router.post("/words/{word_id}/audio")
@@ -228,18 +360,27 @@ async def upload_word_audio(word_id: str, audio: UploadFile = File(...)):
     audio_path = VOCABULARY_AUDIO_DIR / "words" / audio_filename
     audio_path.parent.mkdir(parents=True, exist_ok=True)
     
-    async with aiofiles.open(audio_path, 'wb') as f:
-        content = await audio.read()
-        await f.write(content)
-    
-    # Calculate duration
-    import soundfile as sf
-    duration = None
-    try:
-        data, sr = sf.read(str(audio_path))
-        duration = len(data) / sr
-    except:
-        pass
+    await save_upload(audio, audio_path)
+    return await _record_word_audio(word_id, audio_path)
+
+
+@router.put("/words/{word_id}/audio")
+async def put_word_audio(word_id: str, request: Request):
+    """Upload or replace audio for a word as a raw body (Content-Type: audio/wav), streamed to disk"""
+    word = await db.fetchrow("SELECT * FROM vocabulary_words WHERE id = $1", word_id)
+    if not word:
+        raise HTTPException(404, "Word not found")
+
+    audio_filename = f"{word_id}_{word['word'].replace(' ', '_')}.wav"
+    audio_path = VOCABULARY_AUDIO_DIR / "words" / audio_filename
+    audio_path.parent.mkdir(parents=True, exist_ok=True)
+
+    await save_request_body(request, audio_path)
+    return await _record_word_audio(word_id, audio_path)
+
+
+async def _record_word_audio(word_id: str, audio_path: Path) -> dict:
+    duration = await asyncio.to_thread(audio_duration, audio_path)
     
     # Update database
     await db.execute("""
@@ -248,6 +389,7 @@ async def upload_word_audio(word_id: str, audio: UploadFile = File(...)):
         WHERE id = $4
     """, str(audio_path), duration, datetime.utcnow(), word_id)
     
+    invalidate_stats()
     return {"status": "uploaded", "audio_path": str(audio_path), "duration": duration}
 
 
@@ -269,6 +411,7 @@ async def delete_word(word_id: str):
         Path(word['audio_path']).unlink(missing_ok=True)
     
     await db.execute("DELETE FROM vocabulary_words WHERE id = $1", word_id)
+    invalidate_stats()
     return {"status": "deleted"}
 
 
@@ -286,31 +429,25 @@ async def create_phrase(
     """Create a new vocabulary phrase"""
     phrase_id = str(uuid.uuid4())
     audio_path = None
-    duration = None
     
     if audio:
         audio_filename = f"{phrase_id}.wav"
         audio_path = VOCABULARY_AUDIO_DIR / "phrases" / audio_filename
         audio_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        async with aiofiles.open(audio_path, 'wb') as f:
-            content = await audio.read()
-            await f.write(content)
-        
-        import soundfile as sf
-        try:
-            data, sr = sf.read(str(audio_path))
-            duration = len(data) / sr
-        except:
-            pass
     
-    await db.execute("""
+    insert = db.execute("""
         INSERT INTO vocabulary_phrases 
         (id, phrase, category_id, audio_path, duration_seconds, context, notes, created_at)
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        VALUES ($1, $2, $3, $4, NULL, $5, $6, $7)
     """, phrase_id, phrase, category_id, str(audio_path) if audio_path else None,
-        duration, context, notes, datetime.utcnow())
+        context, notes, datetime.utcnow())
+    
+    if audio:
+        await insert_with_audio("vocabulary_phrases", phrase_id, insert, audio, audio_path)
+    else:
+        await insert
     
+    invalidate_stats()
     return {"id": phrase_id, "phrase": phrase}
 
 
@@ -320,21 +457,15 @@ async def list_phrases(
     search: Optional[str] = Query(None)
 ):
     """List vocabulary phrases"""
-    query = "SELECT * FROM vocabulary_phrases WHERE 1=1"
     params = []
-    
     if category_id:
         params.append(category_id)
-        query += f" AND category_id = ${len(params)}"
-    
     if search:
         params.append(f"%{search}%")
-        query += f" AND phrase ILIKE ${len(params)}"
-    
-    query += " ORDER BY phrase"
     
+    query = _PHRASE_QUERIES[(bool(category_id), bool(search))]
     phrases = await db.fetch(query, *params)
-    return {"phrases": [dict(p) for p in phrases]}
+    return {"phrases": phrases}
 
 
 # ===========================================
@@ -362,7 +493,7 @@ async def create_recording_guide(guide: RecordingGuide):
 async def list_guides():
     """List all recording guides"""
     guides = await db.fetch("SELECT * FROM recording_guides ORDER BY created_at DESC")
-    return {"guides": [dict(g) for g in guides]}
+    return {"guides": guides}
 
 
 @router.get("/guides/{guide_id}")
@@ -371,7 +502,7 @@ async def get_guide(guide_id: str):
     guide = await db.fetchrow("SELECT * FROM recording_guides WHERE id = $1", guide_id)
     if not guide:
         raise HTTPException(404, "Guide not found")
-    return dict(guide)
+    return guide
 
 
 @router.get("/guides/{guide_id}/export")
@@ -381,16 +512,14 @@ async def export_guide(guide_id: str, format: str = Query("txt")):
     if not guide:
         raise HTTPException(404, "Guide not found")
     
-    content = f"# {guide['name']}\n"
+    parts = [f"# {guide['name']}\n"]
     if guide['description']:
-        content += f"# {guide['description']}\n"
-    content += f"# Total items: {len(guide['items'])}\n"
-    content += f"# Estimated duration: {guide['estimated_duration_minutes']:.1f} minutes\n\n"
+        parts.append(f"# {guide['description']}\n")
+    parts.append(f"# Total items: {len(guide['items'])}\n")
+    parts.append(f"# Estimated duration: {guide['estimated_duration_minutes']:.1f} minutes\n\n")
+    parts.extend(f"{i:03d}. {item}\n" for i, item in enumerate(guide['items'], 1))
     
-    for i, item in enumerate(guide['items'], 1):
-        content += f"{i:03d}. {item}\n"
-    
-    return {"content": content, "filename": f"{guide['name']}.txt"}
+    return {"content": "".join(parts), "filename": f"{guide['name']}.txt"}
 
 
 # ===========================================
@@ -401,65 +530,100 @@ async def bulk_create_words(
     words: List[str] = Form(...),
     category_id: Optional[str] = Form(None)
 ):
-    """Create multiple words at once (without audio)"""
-    created = []
-    for word in words:
-        word_id = str(uuid.uuid4())
-        await db.execute("""
-            INSERT INTO vocabulary_words 
-            (id, word, category_id, sample_count, created_at, updated_at)
-            VALUES ($1, $2, $3, 0, $4, $4)
-            ON CONFLICT (word) DO NOTHING
-        """, word_id, word.strip(), category_id, datetime.utcnow())
-        created.append({"id": word_id, "word": word})
-    
+    """Create multiple words at once (without audio), in a single INSERT"""
+    word_ids = [str(uuid.uuid4()) for _ in words]
+    # Arrays unnested server-side: one round-trip for the whole batch
+    created = await db.fetch("""
+        INSERT INTO vocabulary_words
+        (id, word, category_id, sample_count, created_at, updated_at)
+        SELECT t.id, t.word, CAST($3 AS VARCHAR), 0, CAST($4 AS TIMESTAMP), CAST($4 AS TIMESTAMP)
+        FROM unnest(CAST($1 AS VARCHAR[]), CAST($2 AS VARCHAR[])) AS t(id, word)
+        ON CONFLICT (word) DO NOTHING
+        RETURNING id, word
+    """, word_ids, [word.strip() for word in words], category_id, datetime.utcnow())
+
+    invalidate_stats()
     return {"created": len(created), "words": created}
 
 
 @router.get("/export/corpus")
-async def export_corpus(category_id: Optional[str] = Query(None)):
-    """Export all vocabulary as corpus for training"""
+async def export_corpus(
+    category_id: Optional[str] = Query(None),
+    stream: bool = Query(False)
+):
+    """
+    Export all vocabulary as corpus for training.
+    With stream=true, returns NDJSON (one metadata entry per line) read through a
+    database cursor, without building the whole list in memory.
+    """
     query = """
         SELECT w.word, w.audio_path, w.phonetic, c.name as category
         FROM vocabulary_words w
         LEFT JOIN vocabulary_categories c ON w.category_id = c.id
         WHERE w.audio_path IS NOT NULL
     """
+    params = []
     if category_id:
-        query += f" AND w.category_id = '{category_id}'"
+        params.append(category_id)
+        query += f" AND w.category_id = ${len(params)}"
     
-    words = await db.fetch(query)
+    if stream:
+        async def ndjson():
+            async for w in db.stream(query, *params):
+                yield _dumps_line(_corpus_entry(w))
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    words = await db.fetch(query, *params)
     
     # Generate metadata.json format
-    metadata = []
-    for w in words:
-        metadata.append({
-            "audio_file": Path(w['audio_path']).name,
-            "text": w['word'],
-            "category": w['category'],
-            "phonetic": w['phonetic']
-        })
+    metadata = [_corpus_entry(w) for w in words]
     
     return {"metadata": metadata, "total": len(metadata)}
 
 
+def _corpus_entry(w: dict) -> dict:
+    return {
+        "audio_file": Path(w['audio_path']).name,
+        "text": w['word'],
+        "category": w['category'],
+        "phonetic": w['phonetic']
+    }
+
+
+def _dumps_line(data: dict) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data) + b"\n"
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode()
+
+
 # ===========================================
 # Statistics
 # ===========================================
 @router.get("/stats")
 async def get_vocabulary_stats():
-    """Get vocabulary statistics"""
-    total_words = await db.fetchval("SELECT COUNT(*) FROM vocabulary_words")
-    words_with_audio = await db.fetchval(
-        "SELECT COUNT(*) FROM vocabulary_words WHERE audio_path IS NOT NULL"
-    )
-    total_phrases = await db.fetchval("SELECT COUNT(*) FROM vocabulary_phrases")
-    total_categories = await db.fetchval("SELECT COUNT(*) FROM vocabulary_categories")
-    total_duration = await db.fetchval(
-        "SELECT COALESCE(SUM(duration_seconds), 0) FROM vocabulary_words"
-    ) or 0
+    """Get vocabulary statistics (cached for VOCABULARY_STATS_TTL seconds)"""
+    global _stats_cache
+    now = time.monotonic()
+    if _stats_cache is not None and _stats_cache[0] > now:
+        return _stats_cache[1]
+
+    # One round-trip; the three word aggregates share a single scan
+    stats = await db.fetchrow("""
+        SELECT COUNT(*) AS total_words,
+               COUNT(*) FILTER (WHERE audio_path IS NOT NULL) AS words_with_audio,
+               COALESCE(SUM(duration_seconds), 0) AS total_duration,
+               (SELECT COUNT(*) FROM vocabulary_phrases) AS total_phrases,
+               (SELECT COUNT(*) FROM vocabulary_categories) AS total_categories
+        FROM vocabulary_words
+    """)
+    total_words = stats["total_words"]
+    words_with_audio = stats["words_with_audio"]
+    total_phrases = stats["total_phrases"]
+    total_categories = stats["total_categories"]
+    total_duration = stats["total_duration"] or 0
     
-    return {
+    result = {
         "total_words": total_words,
         "words_with_audio": words_with_audio,
         "words_without_audio": total_words - words_with_audio,
@@ -468,3 +632,6 @@ async def get_vocabulary_stats():
         "total_audio_duration_minutes": total_duration / 60,
         "coverage_percent": (words_with_audio / total_words * 100) if total_words > 0 else 0
     }
+    if VOCABULARY_STATS_TTL > 0:
+        _stats_cache = (now + VOCABULARY_STATS_TTL, result)
+    return result
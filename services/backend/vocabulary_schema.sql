@@ -1,6 +1,9 @@
 -- Vocabulary Management Schema
 -- Extension to the main database for voice corpus management
 
+-- Trigram indexes back the substring searches (ILIKE '%x%') of the vocabulary API
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ===========================================
 -- VOCABULARY CATEGORIES
 -- ===========================================
@@ -43,6 +46,7 @@ CREATE TABLE IF NOT EXISTS vocabulary_words (
 -- Create index for search
 CREATE INDEX IF NOT EXISTS idx_vocabulary_words_word ON vocabulary_words(word);
 CREATE INDEX IF NOT EXISTS idx_vocabulary_words_category ON vocabulary_words(category_id);
+CREATE INDEX IF NOT EXISTS idx_vocabulary_words_word_trgm ON vocabulary_words USING gin (word gin_trgm_ops);
 
 
 -- ===========================================
@@ -60,6 +64,7 @@ CREATE TABLE IF NOT EXISTS vocabulary_phrases (
 );
 
 CREATE INDEX IF NOT EXISTS idx_vocabulary_phrases_category ON vocabulary_phrases(category_id);
+CREATE INDEX IF NOT EXISTS idx_vocabulary_phrases_phrase_trgm ON vocabulary_phrases USING gin (phrase gin_trgm_ops);
 
 
 -- ===========================================
@@ -5,7 +5,9 @@ Allows external systems to subscribe to call center events
 
 import os
 import uuid
+import hmac
 import asyncio
+import hashlib
 from datetime import datetime
 from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException
@@ -13,6 +15,8 @@ from pydantic import BaseModel, HttpUrl
 import httpx
 from loguru import logger
 
+from service_client import H2_AVAILABLE
+
 router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
 
@@ -48,6 +52,28 @@ class WebhookEvent(BaseModel):
 # ===========================================
 
 webhooks: Dict[str, dict] = {}
+# event_type -> {webhook_id: webhook}, active webhooks only (kept in sync by
+# create/delete/toggle) so dispatch doesn't scan every registered webhook
+subscribers: Dict[str, Dict[str, dict]] = {}
+
+# Outbound delivery queue
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1024"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "16"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "100"))
+WEBHOOK_MAX_KEEPALIVE = int(os.getenv("WEBHOOK_MAX_KEEPALIVE", "50"))
+WEBHOOK_HTTP2 = os.getenv("WEBHOOK_HTTP2", "true").lower() == "true"
+# Delivery attempts per subscriber (backoff 1s, 2s, ...) and cap on in-flight POSTs
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "3"))
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "50"))
+
+webhook_queue: Optional[asyncio.Queue] = None
+dropped_events = 0
+_webhook_client: Optional[httpx.AsyncClient] = None
+_worker_tasks: List[asyncio.Task] = []
+_send_semaphore = asyncio.Semaphore(WEBHOOK_CONCURRENCY)
+# Pending retries run off the worker so one failing subscriber doesn't stall the queue
+_retry_tasks: set = set()
 
 # Supported event types
 SUPPORTED_EVENTS = [
@@ -66,6 +92,17 @@ SUPPORTED_EVENTS = [
 # Webhook Management
 # ===========================================
 
+def _index_webhook(webhook: dict):
+    if webhook["active"]:
+        for event_type in webhook["events"]:
+            subscribers.setdefault(event_type, {})[webhook["id"]] = webhook
+
+
+def _unindex_webhook(webhook_id: str):
+    for subscribed in subscribers.values():
+        subscribed.pop(webhook_id, None)
+
+
 @router.post("/", response_model=WebhookResponse)
 async def create_webhook(webhook: WebhookCreate):
     """Register a new webhook"""
@@ -89,6 +126,7 @@ async def create_webhook(webhook: WebhookCreate):
     }
 
     webhooks[webhook_id] = webhook_data
+    _index_webhook(webhook_data)
     logger.info(f"Webhook created: {webhook_id} -> {webhook.url}")
 
     return WebhookResponse(**webhook_data)
@@ -120,6 +158,7 @@ async def delete_webhook(webhook_id: str):
         raise HTTPException(status_code=404, detail="Webhook not found")
 
     del webhooks[webhook_id]
+    _unindex_webhook(webhook_id)
     logger.info(f"Webhook deleted: {webhook_id}")
     return {"status": "deleted", "webhook_id": webhook_id}
 
@@ -132,6 +171,8 @@ async def toggle_webhook(webhook_id: str):
 
     webhook = webhooks[webhook_id]
     webhook["active"] = not webhook["active"]
+    _unindex_webhook(webhook_id)
+    _index_webhook(webhook)
     status = "enabled" if webhook["active"] else "disabled"
 
     logger.info(f"Webhook {webhook_id} {status}")
@@ -148,18 +189,48 @@ async def trigger_webhook_event(
     data: dict
 ):
     """
-    Trigger webhooks subscribed to this event type
-    This should be called from main.py when events occur
+    Trigger webhooks subscribed to this event type and wait for delivery.
+    From the call hot path use enqueue_webhook_event() instead.
     """
+    await _deliver_event(event_type, conversation_id, data, datetime.utcnow().isoformat())
+
+
+def enqueue_webhook_event(
+    event_type: str,
+    conversation_id: str,
+    data: dict
+):
+    """
+    Queue an event for the outbound workers (non-blocking).
+    Events are dropped (and counted) when the queue is full.
+    """
+    global webhook_queue, dropped_events
+
+    if event_type not in SUPPORTED_EVENTS:
+        logger.warning(f"Unknown event type: {event_type}")
+        return
+
+    # Nothing subscribed: skip the queue entirely
+    if not subscribers.get(event_type):
+        return
+
+    if webhook_queue is None:
+        webhook_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+
+    try:
+        webhook_queue.put_nowait((event_type, conversation_id, data, datetime.utcnow().isoformat()))
+    except asyncio.QueueFull:
+        dropped_events += 1
+        logger.warning(f"Webhook queue full, dropped {event_type} (total dropped: {dropped_events})")
+
+
+async def _deliver_event(event_type: str, conversation_id: str, data: dict, timestamp: str):
     if event_type not in SUPPORTED_EVENTS:
         logger.warning(f"Unknown event type: {event_type}")
         return
 
     # Find webhooks subscribed to this event
-    subscribed_webhooks = [
-        w for w in webhooks.values()
-        if w["active"] and event_type in w["events"]
-    ]
+    subscribed_webhooks = list(subscribers.get(event_type, {}).values())
 
     if not subscribed_webhooks:
         return
@@ -168,54 +239,127 @@ async def trigger_webhook_event(
         event_type=event_type,
         conversation_id=conversation_id,
         data=data,
-        timestamp=datetime.utcnow().isoformat()
+        timestamp=timestamp
     )
 
     logger.info(f"Triggering {len(subscribed_webhooks)} webhooks for event: {event_type}")
 
-    # Send webhook requests asynchronously
-    tasks = [
-        send_webhook_request(webhook, event_payload)
-        for webhook in subscribed_webhooks
-    ]
+    # Serialized once for every subscriber (and signed over these exact bytes)
+    body = event_payload.model_dump_json().encode()
+    delivered = await asyncio.gather(
+        *(send_webhook_request(webhook, event_payload, body) for webhook in subscribed_webhooks),
+        return_exceptions=True
+    )
 
-    # Fire and forget (don't block main flow)
-    asyncio.create_task(asyncio.gather(*tasks, return_exceptions=True))
+    for webhook, ok in zip(subscribed_webhooks, delivered):
+        if ok is not True and WEBHOOK_MAX_ATTEMPTS > 1:
+            task = asyncio.create_task(_retry_delivery(webhook, event_payload, body))
+            _retry_tasks.add(task)
+            task.add_done_callback(_retry_tasks.discard)
+
+
+async def _retry_delivery(webhook: dict, event: WebhookEvent, body: bytes):
+    """Re-send a failed delivery with exponential backoff (1s, 2s, ...)"""
+    for attempt in range(1, WEBHOOK_MAX_ATTEMPTS):
+        await asyncio.sleep(2 ** (attempt - 1))
+        if not webhook["active"]:
+            return
+        if await send_webhook_request(webhook, event, body):
+            return
+    logger.error(f"Webhook {webhook['id']} gave up on {event.event_type} after {WEBHOOK_MAX_ATTEMPTS} attempts")
+
+
+async def _webhook_worker():
+    """Consume the queue, delivering up to WEBHOOK_BATCH_SIZE events concurrently"""
+    while True:
+        batch = [await webhook_queue.get()]
+        while len(batch) < WEBHOOK_BATCH_SIZE and not webhook_queue.empty():
+            batch.append(webhook_queue.get_nowait())
+
+        try:
+            await asyncio.gather(*(_deliver_event(*event) for event in batch), return_exceptions=True)
+        finally:
+            for _ in batch:
+                webhook_queue.task_done()
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _webhook_client
+    if _webhook_client is None:
+        if WEBHOOK_HTTP2 and not H2_AVAILABLE:
+            logger.warning("WEBHOOK_HTTP2 habilitado pero h2 no está instalado, usando HTTP/1.1")
+        _webhook_client = httpx.AsyncClient(
+            # Subscribers are external HTTPS endpoints: HTTP/2 multiplexes the fan-out
+            http2=WEBHOOK_HTTP2 and H2_AVAILABLE,
+            timeout=10.0,
+            limits=httpx.Limits(
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                max_keepalive_connections=WEBHOOK_MAX_KEEPALIVE
+            )
+        )
+    return _webhook_client
 
 
-async def send_webhook_request(webhook: dict, event: WebhookEvent):
-    """Send HTTP POST request to webhook URL"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            headers = {"Content-Type": "application/json"}
-
-            # Add signature if secret is configured
-            if webhook.get("secret"):
-                import hmac
-                import hashlib
-                payload = event.json()
-                signature = hmac.new(
-                    webhook["secret"].encode(),
-                    payload.encode(),
-                    hashlib.sha256
-                ).hexdigest()
-                headers["X-Webhook-Signature"] = signature
+async def start_webhook_workers():
+    """Start the outbound delivery workers (call from app startup)"""
+    global webhook_queue
+    if webhook_queue is None:
+        webhook_queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    for _ in range(WEBHOOK_WORKERS):
+        _worker_tasks.append(asyncio.create_task(_webhook_worker()))
+    logger.info(f"Webhook workers started ({WEBHOOK_WORKERS}, queue={WEBHOOK_QUEUE_SIZE})")
+
+
+async def stop_webhook_workers():
+    """Stop the workers and close the shared client (call from app shutdown)"""
+    global _webhook_client
+    for task in _worker_tasks + list(_retry_tasks):
+        task.cancel()
+    _worker_tasks.clear()
+    _retry_tasks.clear()
+    if _webhook_client is not None:
+        await _webhook_client.aclose()
+        _webhook_client = None
+
 
+async def send_webhook_request(webhook: dict, event: WebhookEvent, body: Optional[bytes] = None) -> bool:
+    """
+    Send HTTP POST request to webhook URL (body: the pre-serialized event, shared across the fan-out).
+    Returns False on errors worth retrying (network, 429, 5xx).
+    """
+    try:
+        client = _get_client()
+        headers = {"Content-Type": "application/json"}
+        if body is None:
+            body = event.model_dump_json().encode()
+
+        # Add signature if secret is configured (over the exact bytes sent)
+        if webhook.get("secret"):
+            signature = hmac.new(
+                webhook["secret"].encode(),
+                body,
+                hashlib.sha256
+            ).hexdigest()
+            headers["X-Webhook-Signature"] = signature
+
+        async with _send_semaphore:
             response = await client.post(
                 webhook["url"],
-                json=event.dict(),
+                content=body,
                 headers=headers
             )
 
-            if response.status_code >= 400:
-                logger.error(
-                    f"Webhook {webhook['id']} failed: {response.status_code} - {response.text[:100]}"
-                )
-            else:
-                logger.debug(f"Webhook {webhook['id']} delivered successfully")
+        if response.status_code >= 400:
+            logger.error(
+                f"Webhook {webhook['id']} failed: {response.status_code} - {response.text[:100]}"
+            )
+            return response.status_code < 500 and response.status_code != 429
+        logger.debug(f"Webhook {webhook['id']} delivered successfully")
+        return True
 
     except Exception as e:
         logger.error(f"Webhook {webhook['id']} error: {e}")
+        return False
 
 
 # ===========================================
@@ -3,8 +3,90 @@ WebSocket Connection Manager
 Handles multiple WebSocket connections for real-time audio streaming
 """
 
-from typing import Dict, Optional
+import os
+import json
+import asyncio
+from typing import Dict, Optional, Union
 from fastapi import WebSocket
+from loguru import logger
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Per-connection send queue (frames): senders wait when it is full, and
+# optional events are skipped once HIGH_WATER frames are already waiting
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+WS_SEND_HIGH_WATER = int(os.getenv("WS_SEND_HIGH_WATER", "16"))
+
+
+def dumps_json(data) -> str:
+    """Serialize a message with orjson (C extension), falling back to stdlib json"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+async def send_json_fast(websocket: WebSocket, data: dict):
+    """Drop-in for websocket.send_json() using the faster serializer (still a text frame)"""
+    await websocket.send_text(dumps_json(data))
+
+
+class BackpressureGate:
+    """
+    Bounded send queue of a WebSocket connection, written by a single task.
+
+    Every frame of the connection goes through send()/send_json(), which
+    wait while the queue is full, so a slow client cannot grow memory
+    unboundedly. Non-critical events (prosody, sentiment) should be skipped
+    while is_backpressured() is True.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queued: int = WS_SEND_QUEUE_SIZE,
+                 high_water: int = WS_SEND_HIGH_WATER):
+        self.websocket = websocket
+        self.high_water = high_water
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self.error: Optional[Exception] = None
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def _write_loop(self):
+        while True:
+            message = await self.queue.get()
+            if self.error is not None:
+                continue  # Connection gone: discard so senders never block
+            try:
+                if isinstance(message, bytes):
+                    await self.websocket.send_bytes(message)
+                else:
+                    await self.websocket.send_text(message)
+            except Exception as e:
+                self.error = e
+
+    def is_backpressured(self) -> bool:
+        """True when HIGH_WATER frames or more are waiting to be written"""
+        return self.queue.qsize() >= self.high_water
+
+    async def send(self, message: Union[str, bytes]):
+        """Queue a text or binary frame, waiting for room if the client is slow"""
+        if self.error is not None:
+            raise ConnectionError(f"WebSocket send failed: {self.error}")
+        await self.queue.put(message)
+
+    async def send_json(self, data: dict):
+        await self.send(dumps_json(data))
+
+    def close(self):
+        """Stop the writer: queued frames are dropped and later sends raise"""
+        if self.error is None:
+            self.error = ConnectionError("closed")
+        self._writer.cancel()
+        # Make room for senders blocked on a full queue (nothing will write for them)
+        while not self.queue.empty():
+            self.queue.get_nowait()
 
 
 class ConnectionManager:
@@ -12,34 +94,52 @@ class ConnectionManager:
     
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.gates: Dict[str, BackpressureGate] = {}
         
     async def connect(self, websocket: WebSocket, conversation_id: str):
         """Accept and store a new WebSocket connection"""
         await websocket.accept()
         self.active_connections[conversation_id] = websocket
+        self.gates[conversation_id] = BackpressureGate(websocket)
         
     def disconnect(self, conversation_id: str):
         """Remove a WebSocket connection"""
         if conversation_id in self.active_connections:
             del self.active_connections[conversation_id]
+        gate = self.gates.pop(conversation_id, None)
+        if gate is not None:
+            gate.close()
             
     def get_connection(self, conversation_id: str) -> Optional[WebSocket]:
         """Get a WebSocket connection by conversation ID"""
         return self.active_connections.get(conversation_id)
+
+    def get_gate(self, conversation_id: str) -> Optional[BackpressureGate]:
+        """Get the backpressure gate of a connection"""
+        return self.gates.get(conversation_id)
         
     async def send_json(self, conversation_id: str, data: dict):
         """Send JSON data to a specific connection"""
-        websocket = self.active_connections.get(conversation_id)
-        if websocket:
-            await websocket.send_json(data)
+        gate = self.gates.get(conversation_id)
+        if gate:
+            await gate.send_json(data)
             
     async def send_bytes(self, conversation_id: str, data: bytes):
         """Send binary data to a specific connection"""
-        websocket = self.active_connections.get(conversation_id)
-        if websocket:
-            await websocket.send_bytes(data)
+        gate = self.gates.get(conversation_id)
+        if gate:
+            await gate.send(data)
             
     async def broadcast(self, data: dict):
-        """Send data to all connections"""
-        for websocket in self.active_connections.values():
-            await websocket.send_json(data)
+        """Send data to all connections concurrently (encoded once; a slow client doesn't stall the rest)"""
+        message = dumps_json(data)
+        connections = list(self.gates.items())
+        results = await asyncio.gather(
+            *(gate.send(message) for _, gate in connections),
+            return_exceptions=True
+        )
+        # Prune sockets that failed (closed without a clean disconnect)
+        for (conversation_id, gate), result in zip(connections, results):
+            if isinstance(result, Exception) and self.gates.get(conversation_id) is gate:
+                logger.warning(f"[{conversation_id}] Broadcast failed, dropping connection: {result}")
+                self.disconnect(conversation_id)
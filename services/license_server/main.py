@@ -6,23 +6,77 @@ Servidor centralizado para validar licencias de clientes on-premise.
 Rastrea uso, valida hardware binding, y previene piratería.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Path, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Boolean, JSON
+from sqlalchemy import (
+    Column, String, Integer, DateTime, Boolean, JSON, LargeBinary, Index, MetaData, Table,
+    event, inspect, select, insert, update, func, text
+)
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import Session, sessionmaker
 import secrets
 import hashlib
+import asyncio
+import json
+import logging
+import orjson
 import os
+import time
 from contextlib import asynccontextmanager
 
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger("license_server")
+
 # Database setup
 DATABASE_URL = os.getenv("LICENSE_DATABASE_URL", "sqlite:///./licenses.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Pool sized for concurrent validate/heartbeat traffic from every on-premise client
+LICENSE_DB_POOL_SIZE = int(os.getenv("LICENSE_DB_POOL_SIZE", "20"))
+LICENSE_DB_MAX_OVERFLOW = int(os.getenv("LICENSE_DB_MAX_OVERFLOW", "40"))
+LICENSE_DB_POOL_TIMEOUT = int(os.getenv("LICENSE_DB_POOL_TIMEOUT", "30"))
+
+
+def _async_database_url(url: str) -> str:
+    """Map sync driver URLs to their async drivers (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql://") or url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_async_engine(_async_database_url(DATABASE_URL))
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, _):
+        # WAL + synchronous=NORMAL: un fsync por checkpoint en vez de uno por commit
+        # (aceptable para telemetría; los datos comprometidos sobreviven a un crash del proceso)
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+else:
+    engine = create_async_engine(
+        _async_database_url(DATABASE_URL),
+        pool_size=LICENSE_DB_POOL_SIZE,
+        max_overflow=LICENSE_DB_MAX_OVERFLOW,
+        pool_timeout=LICENSE_DB_POOL_TIMEOUT,
+        pool_recycle=3600,
+        pool_pre_ping=True
+    )
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
 # Models
@@ -30,7 +84,9 @@ class License(Base):
     """Modelo de licencia en la base de datos"""
     __tablename__ = "licenses"
 
-    license_key = Column(String, primary_key=True, index=True)
+    # La clave solo se guarda como SHA-256 (se muestra completa una única vez, al generarla)
+    license_key_hash = Column(LargeBinary(32), primary_key=True)
+    license_key_hint = Column(String, nullable=True)  # "****XXXX" para identificarla en listados
     client_name = Column(String, nullable=False)
     client_email = Column(String, nullable=False)
     hardware_id = Column(String, nullable=True)  # Se vincula en primera activación
@@ -40,7 +96,7 @@ class License(Base):
     max_agents = Column(Integer, default=10)
 
     # Dates
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     activated_at = Column(DateTime, nullable=True)
     expires_at = Column(DateTime, nullable=False)
     last_heartbeat = Column(DateTime, nullable=True)
@@ -52,7 +108,17 @@ class License(Base):
     # Telemetry
     total_calls = Column(Integer, default=0)
     total_minutes = Column(Integer, default=0)
-    metadata = Column(JSON, default={})  # Información adicional
+    # "metadata" está reservado por el declarative Base: atributo metadata_, columna "metadata"
+    metadata_ = Column("metadata", JSON, default=dict)  # Información adicional
+
+    # Licencias activas por vencimiento (parcial en Postgres / SQLite)
+    __table_args__ = (
+        Index(
+            "ix_licenses_active_expires", "expires_at",
+            postgresql_where=is_active.is_(True),
+            sqlite_where=is_active.is_(True)
+        ),
+    )
 
 
 class Heartbeat(Base):
@@ -60,7 +126,7 @@ class Heartbeat(Base):
     __tablename__ = "heartbeats"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    license_key = Column(String, index=True)
+    license_key_hash = Column(LargeBinary(32))
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     # Telemetry data
@@ -74,8 +140,17 @@ class Heartbeat(Base):
     memory_usage = Column(Integer, nullable=True)
     disk_usage = Column(Integer, nullable=True)
 
+    # Últimos heartbeats de una licencia: range scan sin sort (cubre también el filtro por licencia)
+    __table_args__ = (
+        Index("ix_heartbeats_license_ts", "license_key_hash", "timestamp"),
+    )
+
 
 # Pydantic models
+# Formato de generate_license_key: se valida en pydantic-core antes de tocar la DB
+LICENSE_KEY_PATTERN = r"^[0-9A-F]{4}(-[0-9A-F]{4}){7}$"
+
+
 class LicenseCreate(BaseModel):
     """Request para crear nueva licencia"""
     client_name: str = Field(..., min_length=3, max_length=100)
@@ -86,9 +161,14 @@ class LicenseCreate(BaseModel):
     is_trial: bool = False
 
 
+class LicenseBulkCreate(BaseModel):
+    """Request para crear varias licencias en una sola transacción"""
+    clients: List[LicenseCreate] = Field(..., min_length=1, max_length=5000)
+
+
 class LicenseValidateRequest(BaseModel):
     """Request para validar licencia"""
-    license_key: str = Field(..., min_length=32, max_length=64)
+    license_key: str = Field(..., pattern=LICENSE_KEY_PATTERN)
     hardware_id: str = Field(..., min_length=32, max_length=128)
 
 
@@ -101,7 +181,7 @@ class LicenseValidateResponse(BaseModel):
 
 class HeartbeatRequest(BaseModel):
     """Request de heartbeat desde cliente"""
-    license_key: str
+    license_key: str = Field(..., pattern=LICENSE_KEY_PATTERN)
     active_calls: int = 0
     active_agents: int = 0
     server_ip: Optional[str] = None
@@ -113,29 +193,217 @@ class HeartbeatRequest(BaseModel):
 
 class CallReportRequest(BaseModel):
     """Reporte de llamadas completadas"""
-    license_key: str
+    license_key: str = Field(..., pattern=LICENSE_KEY_PATTERN)
     calls_count: int
     total_minutes: int
 
 
-# Database dependency
-def get_db():
-    db = SessionLocal()
+# ===========================================
+# License cache (cache-aside delante del SELECT por clave)
+# ===========================================
+# Redis si LICENSE_REDIS_URL está configurado, si no un dict en proceso con el mismo TTL
+LICENSE_REDIS_URL = os.getenv("LICENSE_REDIS_URL", "")
+LICENSE_CACHE_TTL = int(os.getenv("LICENSE_CACHE_TTL", "60"))
+LICENSE_CACHE_PREFIX = "v1:license:"
+
+_redis = aioredis.from_url(LICENSE_REDIS_URL, decode_responses=True) if REDIS_AVAILABLE and LICENSE_REDIS_URL else None
+_local_cache: dict = {}  # key -> (expires_at_monotonic, json)
+
+
+class LicenseSnapshot:
+    """Campos de la licencia que deciden la validación (solo cambian en deactivate/extend/activación)"""
+
+    __slots__ = ("client_name", "hardware_id", "max_concurrent_calls", "max_agents",
+                 "activated_at", "expires_at", "is_active", "is_trial")
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_license(cls, license: "License") -> "LicenseSnapshot":
+        return cls(**{name: getattr(license, name) for name in cls.__slots__})
+
+    def dumps(self) -> str:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        for name in ("activated_at", "expires_at"):
+            if data[name] is not None:
+                data[name] = data[name].isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def loads(cls, raw: str) -> "LicenseSnapshot":
+        data = json.loads(raw)
+        for name in ("activated_at", "expires_at"):
+            if data[name] is not None:
+                data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
+
+
+async def _cache_get(key: str) -> Optional[str]:
+    if _redis is not None:
+        try:
+            return await _redis.get(key)
+        except Exception as e:
+            logger.warning(f"Redis GET falló, usando DB: {e}")
+            return None
+    entry = _local_cache.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+async def _cache_set(key: str, value: str):
+    if _redis is not None:
+        try:
+            await _redis.set(key, value, ex=LICENSE_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Redis SET falló: {e}")
+        return
+    _local_cache[key] = (time.monotonic() + LICENSE_CACHE_TTL, value)
+
+
+async def invalidate_license(key_hash: bytes):
+    """Borra la licencia cacheada (llamar tras cualquier escritura de los campos del snapshot)"""
+    key = LICENSE_CACHE_PREFIX + key_hash.hex()
+    _local_cache.pop(key, None)
+    if _redis is not None:
+        try:
+            await _redis.delete(key)
+        except Exception as e:
+            logger.warning(f"Redis DEL falló: {e}")
+
+
+async def get_license_snapshot(db: AsyncSession, key_hash: bytes) -> Optional[LicenseSnapshot]:
+    """Snapshot de la licencia desde cache, o desde la DB en un miss"""
+    key = LICENSE_CACHE_PREFIX + key_hash.hex()
+    cached = await _cache_get(key)
+    if cached is not None:
+        return LicenseSnapshot.loads(cached)
+
+    license = await get_license(db, key_hash)
+    if license is None:
+        return None
+    snapshot = LicenseSnapshot.from_license(license)
+    await _cache_set(key, snapshot.dumps())
+    return snapshot
+
+
+# ===========================================
+# Heartbeat writer (un solo commit por lote en vez de uno por request)
+# ===========================================
+HEARTBEAT_BATCH_SIZE = int(os.getenv("HEARTBEAT_BATCH_SIZE", "50"))
+HEARTBEAT_FLUSH_INTERVAL = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL", "5"))
+HEARTBEAT_QUEUE_SIZE = int(os.getenv("HEARTBEAT_QUEUE_SIZE", "10000"))
+# COPY FROM STDIN para los lotes en Postgres (asyncpg); SQLite usa INSERT multi-fila
+HEARTBEAT_USE_COPY = os.getenv("HEARTBEAT_USE_COPY", "true").lower() == "true"
+HEARTBEAT_COPY_COLUMNS = (
+    "license_key_hash", "timestamp", "active_calls", "active_agents",
+    "server_ip", "version", "cpu_usage", "memory_usage", "disk_usage"
+)
+
+heartbeat_buffer: Optional[asyncio.Queue] = None
+_heartbeat_flusher: Optional[asyncio.Task] = None
+
+
+async def flush_heartbeats():
+    """Inserta los heartbeats encolados en lotes de hasta HEARTBEAT_BATCH_SIZE, como máximo cada HEARTBEAT_FLUSH_INTERVAL"""
+    loop = asyncio.get_running_loop()
+    while True:
+        rows = [await heartbeat_buffer.get()]
+        deadline = loop.time() + HEARTBEAT_FLUSH_INTERVAL
+        while len(rows) < HEARTBEAT_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                rows.append(await asyncio.wait_for(heartbeat_buffer.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        await _write_heartbeats(rows)
+
+
+async def _write_heartbeats(rows: List[dict]):
+    # Un UPDATE por licencia con el heartbeat más reciente del lote
+    last_seen = {}
+    for row in rows:
+        key = row["license_key_hash"]
+        if key not in last_seen or row["timestamp"] > last_seen[key]:
+            last_seen[key] = row["timestamp"]
     try:
+        async with SessionLocal() as db:
+            if HEARTBEAT_USE_COPY and engine.dialect.driver == "asyncpg":
+                conn = await db.connection()
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    Heartbeat.__tablename__,
+                    records=[tuple(row[col] for col in HEARTBEAT_COPY_COLUMNS) for row in rows],
+                    columns=HEARTBEAT_COPY_COLUMNS
+                )
+            else:
+                await db.execute(insert(Heartbeat), rows)
+            await db.execute(
+                update(License),
+                [{"license_key_hash": key, "last_heartbeat": ts} for key, ts in last_seen.items()]
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Error guardando {len(rows)} heartbeats: {e}")
+
+
+async def _stop_heartbeat_flusher():
+    """Detiene el flusher y escribe lo que quede en la cola"""
+    global _heartbeat_flusher
+    if _heartbeat_flusher is not None:
+        _heartbeat_flusher.cancel()
+        try:
+            await _heartbeat_flusher
+        except asyncio.CancelledError:
+            pass
+        _heartbeat_flusher = None
+    rows = []
+    while heartbeat_buffer is not None and not heartbeat_buffer.empty():
+        rows.append(heartbeat_buffer.get_nowait())
+    if rows:
+        await _write_heartbeats(rows)
+
+
+def hash_license_key(license_key: str) -> bytes:
+    """SHA-256 de la clave: es lo único que se guarda y por lo que se busca"""
+    return hashlib.sha256(license_key.encode()).digest()
+
+
+def license_key_hint(license_key: str) -> str:
+    return "****" + license_key[-4:]
+
+
+# Database dependency
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_license(db: AsyncSession, key_hash: bytes) -> Optional[License]:
+    """Busca una licencia por el hash de su clave"""
+    result = await db.execute(select(License).where(License.license_key_hash == key_hash))
+    return result.scalar_one_or_none()
 
 
 # License generation
+def _format_license_key(h: str) -> str:
+    # Formato: XXXX-XXXX-XXXX-XXXX-XXXX-XXXX-XXXX-XXXX (32 dígitos hex)
+    return f"{h[0:4]}-{h[4:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:24]}-{h[24:28]}-{h[28:32]}"
+
+
 def generate_license_key() -> str:
-    """Genera una clave de licencia única"""
-    # Formato: XXXX-XXXX-XXXX-XXXX-XXXX-XXXX-XXXX-XXXX
-    parts = []
-    for _ in range(8):
-        part = secrets.token_hex(2).upper()
-        parts.append(part)
-    return '-'.join(parts)
+    """Genera una clave de licencia única (16 bytes aleatorios en una sola llamada)"""
+    return _format_license_key(secrets.token_hex(16).upper())
+
+
+def generate_license_keys(count: int) -> List[str]:
+    """Genera count claves con una sola lectura de 16*count bytes aleatorios"""
+    h = secrets.token_hex(16 * count).upper()
+    return [_format_license_key(h[i:i + 32]) for i in range(0, 32 * count, 32)]
 
 
 def verify_hardware_binding(license: License, hardware_id: str) -> bool:
@@ -146,27 +414,94 @@ def verify_hardware_binding(license: License, hardware_id: str) -> bool:
     return license.hardware_id == hardware_id
 
 
+# Migración de esquema: license_key en texto plano -> license_key_hash
+def _migrate_plaintext_license_keys(conn):
+    """
+    Convierte bases creadas antes de guardar solo el hash de la clave
+    (licenses.license_key como PK, heartbeats.license_key). create_all no
+    altera tablas existentes, así que sin esto toda consulta por
+    license_key_hash falla. Corre en la transacción del arranque.
+    """
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+
+    # licenses: cambia la PK, así que se recrea la tabla (es pequeña)
+    if "licenses" in tables and "license_key" in {c["name"] for c in inspector.get_columns("licenses")}:
+        legacy = Table("licenses", MetaData(), autoload_with=conn)
+        rows = conn.execute(select(legacy)).mappings().all()
+        legacy.drop(conn)
+        License.__table__.create(conn)
+        if rows:
+            columns = [c for c in License.__table__.columns if c.name in rows[0]]
+            conn.execute(License.__table__.insert(), [
+                {
+                    "license_key_hash": hash_license_key(row["license_key"]),
+                    "license_key_hint": license_key_hint(row["license_key"]),
+                    **{c.key: row[c.name] for c in columns}
+                }
+                for row in rows
+            ])
+        logger.warning(f"Migradas {len(rows)} licencias a license_key_hash (claves en texto plano eliminadas)")
+
+    # heartbeats: puede ser grande, se migra en sitio con un UPDATE por licencia
+    if "heartbeats" in tables and "license_key" in {c["name"] for c in inspector.get_columns("heartbeats")}:
+        legacy_indexes = [
+            index["name"] for index in inspector.get_indexes("heartbeats")
+            if "license_key" in index["column_names"]
+        ]
+        hash_type = LargeBinary(32).compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE heartbeats ADD COLUMN license_key_hash {hash_type}"))
+        keys = conn.execute(text(
+            "SELECT DISTINCT license_key FROM heartbeats WHERE license_key IS NOT NULL"
+        )).scalars().all()
+        if keys:
+            conn.execute(
+                text("UPDATE heartbeats SET license_key_hash = :key_hash WHERE license_key = :license_key"),
+                [{"key_hash": hash_license_key(key), "license_key": key} for key in keys]
+            )
+        for name in legacy_indexes:
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(text("ALTER TABLE heartbeats DROP COLUMN license_key"))
+        for index in Heartbeat.__table__.indexes:
+            index.create(conn, checkfirst=True)
+        logger.warning(f"Heartbeats migrados a license_key_hash ({len(keys)} licencias)")
+
+
 # FastAPI app
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize database on startup"""
-    Base.metadata.create_all(bind=engine)
+    global heartbeat_buffer, _heartbeat_flusher
+    async with engine.begin() as conn:
+        await conn.run_sync(_migrate_plaintext_license_keys)
+        await conn.run_sync(Base.metadata.create_all)
+    heartbeat_buffer = asyncio.Queue(maxsize=HEARTBEAT_QUEUE_SIZE)
+    _heartbeat_flusher = asyncio.create_task(flush_heartbeats())
     yield
+    await _stop_heartbeat_flusher()
+    await engine.dispose()
+    if _redis is not None:
+        await _redis.aclose()
 
 app = FastAPI(
     title="License Server",
     description="Sistema de gestión de licencias para Call Center AI on-premise",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS
+# CORS: orígenes explícitos en producción (LICENSE_ALLOWED_ORIGINS="https://a,https://b").
+# Con "*" no se permiten credenciales (la spec no admite ambos a la vez)
+LICENSE_ALLOWED_ORIGINS = [
+    origin.strip() for origin in os.getenv("LICENSE_ALLOWED_ORIGINS", "*").split(",") if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # En producción, especificar dominios
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=LICENSE_ALLOWED_ORIGINS,
+    allow_credentials="*" not in LICENSE_ALLOWED_ORIGINS,
+    allow_methods=["GET", "POST", "PUT"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
 
@@ -181,7 +516,7 @@ async def health_check():
 @app.post("/api/license/generate", response_model=dict)
 async def generate_license(
     license_data: LicenseCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Genera una nueva licencia para un cliente.
@@ -193,11 +528,13 @@ async def generate_license(
         license_key = generate_license_key()
 
         # Calcular fecha de expiración
-        expires_at = datetime.utcnow() + timedelta(days=license_data.validity_days)
+        now = datetime.utcnow()
+        expires_at = now + timedelta(days=license_data.validity_days)
 
         # Crear licencia
         new_license = License(
-            license_key=license_key,
+            license_key_hash=hash_license_key(license_key),
+            license_key_hint=license_key_hint(license_key),
             client_name=license_data.client_name,
             client_email=license_data.client_email,
             max_concurrent_calls=license_data.max_concurrent_calls,
@@ -205,15 +542,14 @@ async def generate_license(
             expires_at=expires_at,
             is_trial=license_data.is_trial,
             is_active=True,
-            metadata={
+            metadata_={
                 "generated_by": "admin",
-                "creation_timestamp": datetime.utcnow().isoformat()
+                "creation_timestamp": now.isoformat()
             }
         )
 
         db.add(new_license)
-        db.commit()
-        db.refresh(new_license)
+        await db.commit()
 
         return {
             "success": True,
@@ -226,25 +562,93 @@ async def generate_license(
         }
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating license: {str(e)}"
         )
 
 
+LICENSE_BULK_BATCH_SIZE = 500  # filas por INSERT (lejos del límite de parámetros de Postgres)
+
+
+@app.post("/api/license/bulk-generate", response_model=dict)
+async def bulk_generate_licenses(
+    bulk: LicenseBulkCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Genera varias licencias (alta de un revendedor) con un INSERT por lote y un solo commit.
+
+    Devuelve las claves en el mismo orden que `clients`.
+    Solo debe ser accesible por administradores internos.
+    """
+    try:
+        now = datetime.utcnow()
+        license_keys = generate_license_keys(len(bulk.clients))
+        rows = [
+            {
+                "license_key_hash": hash_license_key(license_key),
+                "license_key_hint": license_key_hint(license_key),
+                "client_name": client.client_name,
+                "client_email": client.client_email,
+                "max_concurrent_calls": client.max_concurrent_calls,
+                "max_agents": client.max_agents,
+                "created_at": now,
+                "expires_at": now + timedelta(days=client.validity_days),
+                "is_trial": client.is_trial,
+                "is_active": True,
+                "total_calls": 0,
+                "total_minutes": 0,
+                "metadata_": {
+                    "generated_by": "admin",
+                    "creation_timestamp": now.isoformat(),
+                    "bulk": True
+                }
+            }
+            for license_key, client in zip(license_keys, bulk.clients)
+        ]
+
+        for start in range(0, len(rows), LICENSE_BULK_BATCH_SIZE):
+            await db.execute(insert(License), rows[start:start + LICENSE_BULK_BATCH_SIZE])
+        await db.commit()
+
+        return {
+            "success": True,
+            "count": len(rows),
+            "licenses": [
+                {
+                    "license_key": license_key,
+                    "client_name": row["client_name"],
+                    "expires_at": row["expires_at"].isoformat(),
+                    "is_trial": row["is_trial"]
+                }
+                for license_key, row in zip(license_keys, rows)
+            ]
+        }
+
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating licenses: {str(e)}"
+        )
+
+
 @app.post("/api/license/validate", response_model=LicenseValidateResponse)
 async def validate_license(
     request: LicenseValidateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Valida una licencia y vincula hardware en primera activación.
 
     Usado por clientes on-premise para verificar licencias.
     """
-    # Buscar licencia
-    license = db.query(License).filter(License.license_key == request.license_key).first()
+    # Buscar licencia (cache-aside: en un hit no se toca la DB)
+    now = datetime.utcnow()
+    key_hash = hash_license_key(request.license_key)
+    license = await get_license_snapshot(db, key_hash)
 
     if not license:
         return LicenseValidateResponse(
@@ -260,7 +664,7 @@ async def validate_license(
         )
 
     # Verificar expiración
-    if datetime.utcnow() > license.expires_at:
+    if now > license.expires_at:
         return LicenseValidateResponse(
             valid=False,
             message=f"Licencia expirada el {license.expires_at.isoformat()}"
@@ -273,18 +677,32 @@ async def validate_license(
             message="Hardware no autorizado. Esta licencia está vinculada a otro servidor."
         )
 
-    # Primera activación - vincular hardware
+    # Primera activación - vincular hardware (last_heartbeat lo mantiene /heartbeat)
     if license.hardware_id is None:
-        license.hardware_id = request.hardware_id
-        license.activated_at = datetime.utcnow()
-        db.commit()
-
-    # Actualizar último heartbeat
-    license.last_heartbeat = datetime.utcnow()
-    db.commit()
+        result = await db.execute(
+            update(License)
+            .where(License.license_key_hash == key_hash, License.hardware_id.is_(None))
+            .values(hardware_id=request.hardware_id, activated_at=now, last_heartbeat=now)
+        )
+        await db.commit()
+        await invalidate_license(key_hash)
+        if result.rowcount == 0:
+            # Ya estaba vinculada (activación concurrente, reintento o snapshot de cache
+            # desactualizado): se decide con el binding real, que puede ser este mismo hardware
+            bound = await get_license(db, key_hash)
+            if bound is None or not verify_hardware_binding(bound, request.hardware_id):
+                return LicenseValidateResponse(
+                    valid=False,
+                    message="Hardware no autorizado. Esta licencia está vinculada a otro servidor."
+                )
+            license.hardware_id = bound.hardware_id
+            license.activated_at = bound.activated_at
+        else:
+            license.hardware_id = request.hardware_id
+            license.activated_at = now
 
     # Calcular días restantes
-    days_remaining = (license.expires_at - datetime.utcnow()).days
+    days_remaining = (license.expires_at - now).days
 
     return LicenseValidateResponse(
         valid=True,
@@ -304,15 +722,17 @@ async def validate_license(
 @app.post("/api/license/heartbeat")
 async def receive_heartbeat(
     heartbeat: HeartbeatRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Recibe heartbeat de cliente on-premise.
 
     Permite rastrear uso y detectar instalaciones no autorizadas.
     """
-    # Verificar que la licencia existe
-    license = db.query(License).filter(License.license_key == heartbeat.license_key).first()
+    # Verificar que la licencia existe (límites desde el snapshot cacheado)
+    now = datetime.utcnow()
+    key_hash = hash_license_key(heartbeat.license_key)
+    license = await get_license_snapshot(db, key_hash)
 
     if not license:
         raise HTTPException(
@@ -320,22 +740,21 @@ async def receive_heartbeat(
             detail="Licencia no encontrada"
         )
 
-    # Actualizar último heartbeat en licencia
-    license.last_heartbeat = datetime.utcnow()
-
-    # Registrar heartbeat
-    new_heartbeat = Heartbeat(
-        license_key=heartbeat.license_key,
-        active_calls=heartbeat.active_calls,
-        active_agents=heartbeat.active_agents,
-        server_ip=heartbeat.server_ip,
-        version=heartbeat.version,
-        cpu_usage=heartbeat.cpu_usage,
-        memory_usage=heartbeat.memory_usage,
-        disk_usage=heartbeat.disk_usage
-    )
-
-    db.add(new_heartbeat)
+    # Registrar heartbeat (y last_heartbeat de la licencia) en el próximo lote
+    try:
+        heartbeat_buffer.put_nowait({
+            "license_key_hash": key_hash,
+            "timestamp": now,
+            "active_calls": heartbeat.active_calls,
+            "active_agents": heartbeat.active_agents,
+            "server_ip": heartbeat.server_ip,
+            "version": heartbeat.version,
+            "cpu_usage": heartbeat.cpu_usage,
+            "memory_usage": heartbeat.memory_usage,
+            "disk_usage": heartbeat.disk_usage
+        })
+    except asyncio.QueueFull:
+        logger.warning(f"Cola de heartbeats llena, descartando heartbeat de {license_key_hint(heartbeat.license_key)}")
 
     # Verificar límites
     warnings = []
@@ -345,59 +764,64 @@ async def receive_heartbeat(
     if heartbeat.active_agents > license.max_agents:
         warnings.append(f"Agentes activos ({heartbeat.active_agents}) exceden el límite ({license.max_agents})")
 
-    db.commit()
-
     return {
         "success": True,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": now.isoformat(),
         "warnings": warnings if warnings else None,
         "license_status": "active" if license.is_active else "inactive",
-        "days_remaining": (license.expires_at - datetime.utcnow()).days
+        "days_remaining": (license.expires_at - now).days
     }
 
 
 @app.post("/api/license/report-calls")
 async def report_calls(
     report: CallReportRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Recibe reporte de llamadas completadas.
 
     Actualiza estadísticas de uso.
     """
-    license = db.query(License).filter(License.license_key == report.license_key).first()
+    # Actualizar estadísticas (incremento atómico en la DB, sin leer la fila antes)
+    result = await db.execute(
+        update(License)
+        .where(License.license_key_hash == hash_license_key(report.license_key))
+        .values(
+            total_calls=License.total_calls + report.calls_count,
+            total_minutes=License.total_minutes + report.total_minutes
+        )
+        .returning(License.total_calls, License.total_minutes)
+    )
+    totals = result.first()
 
-    if not license:
+    if not totals:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Licencia no encontrada"
         )
 
-    # Actualizar estadísticas
-    license.total_calls += report.calls_count
-    license.total_minutes += report.total_minutes
-
-    db.commit()
+    await db.commit()
 
     return {
         "success": True,
-        "total_calls": license.total_calls,
-        "total_minutes": license.total_minutes
+        "total_calls": totals.total_calls,
+        "total_minutes": totals.total_minutes
     }
 
 
 @app.get("/api/license/{license_key}/info")
 async def get_license_info(
-    license_key: str,
-    db: Session = Depends(get_db)
+    license_key: str = Path(..., pattern=LICENSE_KEY_PATTERN),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtiene información detallada de una licencia.
 
     Solo para administradores.
     """
-    license = db.query(License).filter(License.license_key == license_key).first()
+    key_hash = hash_license_key(license_key)
+    license = await get_license(db, key_hash)
 
     if not license:
         raise HTTPException(
@@ -406,21 +830,26 @@ async def get_license_info(
         )
 
     # Obtener últimos heartbeats
-    recent_heartbeats = db.query(Heartbeat).filter(
-        Heartbeat.license_key == license_key
-    ).order_by(Heartbeat.timestamp.desc()).limit(10).all()
+    result = await db.execute(
+        select(Heartbeat)
+        .where(Heartbeat.license_key_hash == key_hash)
+        .order_by(Heartbeat.timestamp.desc())
+        .limit(10)
+    )
+    recent_heartbeats = result.scalars().all()
 
-    return {
-        "license_key": license.license_key,
+    # Respuesta directa: orjson serializa los datetime sin pasar por jsonable_encoder
+    return ORJSONResponse({
+        "license_key": license.license_key_hint,
         "client_name": license.client_name,
         "client_email": license.client_email,
         "hardware_id": license.hardware_id,
         "max_concurrent_calls": license.max_concurrent_calls,
         "max_agents": license.max_agents,
-        "created_at": license.created_at.isoformat(),
-        "activated_at": license.activated_at.isoformat() if license.activated_at else None,
-        "expires_at": license.expires_at.isoformat(),
-        "last_heartbeat": license.last_heartbeat.isoformat() if license.last_heartbeat else None,
+        "created_at": license.created_at,
+        "activated_at": license.activated_at,
+        "expires_at": license.expires_at,
+        "last_heartbeat": license.last_heartbeat,
         "is_active": license.is_active,
         "is_trial": license.is_trial,
         "total_calls": license.total_calls,
@@ -428,7 +857,7 @@ async def get_license_info(
         "days_remaining": (license.expires_at - datetime.utcnow()).days,
         "recent_heartbeats": [
             {
-                "timestamp": hb.timestamp.isoformat(),
+                "timestamp": hb.timestamp,
                 "active_calls": hb.active_calls,
                 "active_agents": hb.active_agents,
                 "server_ip": hb.server_ip,
@@ -436,52 +865,99 @@ async def get_license_info(
             }
             for hb in recent_heartbeats
         ]
+    })
+
+
+def license_summary(lic: License, now: datetime) -> dict:
+    """Fila de licencia para listados/exportación (datetime crudos, los serializa orjson)"""
+    return {
+        "license_key": lic.license_key_hint,
+        "client_name": lic.client_name,
+        "client_email": lic.client_email,
+        "expires_at": lic.expires_at,
+        "is_active": lic.is_active,
+        "is_trial": lic.is_trial,
+        "total_calls": lic.total_calls,
+        "last_heartbeat": lic.last_heartbeat,
+        "days_remaining": (lic.expires_at - now).days
     }
 
 
 @app.get("/api/licenses/list")
 async def list_licenses(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Lista todas las licencias.
 
     Solo para administradores.
     """
-    licenses = db.query(License).offset(skip).limit(limit).all()
+    # Página y total en una sola consulta (count() OVER () se calcula antes del LIMIT)
+    result = await db.execute(
+        select(License, func.count().over().label("total"))
+        .order_by(License.created_at, License.license_key_hash)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = result.all()
+    licenses = [row.License for row in rows]
+    if rows:
+        total = rows[0].total
+    else:
+        # Página vacía (skip más allá del final): no hay fila de la que leer el total
+        total = await db.scalar(select(func.count()).select_from(License))
+    now = datetime.utcnow()
+
+    # Respuesta directa: orjson serializa los datetime sin pasar por jsonable_encoder
+    return ORJSONResponse({
+        "total": total,
+        "licenses": [license_summary(lic, now) for lic in licenses]
+    })
+
+
+@app.get("/api/licenses/export.ndjson")
+async def export_licenses():
+    """
+    Exporta todas las licencias como NDJSON (una por línea).
 
-    return {
-        "total": db.query(License).count(),
-        "licenses": [
-            {
-                "license_key": lic.license_key,
-                "client_name": lic.client_name,
-                "client_email": lic.client_email,
-                "expires_at": lic.expires_at.isoformat(),
-                "is_active": lic.is_active,
-                "is_trial": lic.is_trial,
-                "total_calls": lic.total_calls,
-                "last_heartbeat": lic.last_heartbeat.isoformat() if lic.last_heartbeat else None,
-                "days_remaining": (lic.expires_at - datetime.utcnow()).days
-            }
-            for lic in licenses
-        ]
-    }
+    Cursor del lado del servidor: memoria constante sin importar el tamaño de la tabla.
+    Solo para administradores.
+    """
+    async def generate():
+        # Sesión propia: la de Depends(get_db) se cierra antes de que termine el streaming
+        async with SessionLocal() as db:
+            now = datetime.utcnow()
+            result = await db.stream(
+                select(License)
+                .order_by(License.created_at, License.license_key_hash)
+                .execution_options(yield_per=500)
+            )
+            async for lic in result.scalars():
+                yield orjson.dumps(license_summary(lic, now)) + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @app.put("/api/license/{license_key}/deactivate")
 async def deactivate_license(
-    license_key: str,
-    db: Session = Depends(get_db)
+    license_key: str = Path(..., pattern=LICENSE_KEY_PATTERN),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Desactiva una licencia.
 
     Útil para cancelaciones o violaciones de términos.
     """
-    license = db.query(License).filter(License.license_key == license_key).first()
+    key_hash = hash_license_key(license_key)
+    result = await db.execute(
+        update(License)
+        .where(License.license_key_hash == key_hash)
+        .values(is_active=False)
+        .returning(License.client_name)
+    )
+    license = result.first()
 
     if not license:
         raise HTTPException(
@@ -489,28 +965,29 @@ async def deactivate_license(
             detail="Licencia no encontrada"
         )
 
-    license.is_active = False
-    db.commit()
+    await db.commit()
+    await invalidate_license(key_hash)
 
     return {
         "success": True,
-        "message": f"Licencia {license_key} desactivada",
+        "message": f"Licencia {license_key_hint(license_key)} desactivada",
         "client_name": license.client_name
     }
 
 
 @app.put("/api/license/{license_key}/extend")
 async def extend_license(
-    license_key: str,
     days: int,
-    db: Session = Depends(get_db)
+    license_key: str = Path(..., pattern=LICENSE_KEY_PATTERN),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Extiende la validez de una licencia.
 
     Útil para renovaciones.
     """
-    license = db.query(License).filter(License.license_key == license_key).first()
+    key_hash = hash_license_key(license_key)
+    license = await get_license(db, key_hash)
 
     if not license:
         raise HTTPException(
@@ -519,7 +996,8 @@ async def extend_license(
         )
 
     license.expires_at = license.expires_at + timedelta(days=days)
-    db.commit()
+    await db.commit()
+    await invalidate_license(key_hash)
 
     return {
         "success": True,
@@ -4,12 +4,18 @@ LangChain integration with LM Studio for conversational AI
 """
 
 import os
+import re
+import json
+import time
 import asyncio
+from collections import OrderedDict, deque
+from itertools import islice
+from functools import lru_cache
 from typing import Optional, List, Dict, AsyncGenerator
 from datetime import datetime
 
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
 from langchain.memory import ConversationBufferWindowMemory
@@ -17,6 +23,18 @@ from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.schema import HumanMessage, AIMessage, SystemMessage
 from loguru import logger
 
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Configure loguru
 logger.add(
     "logs/llm_{time}.log",
@@ -33,6 +51,10 @@ logger.add(
 LM_STUDIO_URL = os.getenv("LM_STUDIO_URL", "http://host.docker.internal:1234/v1")
 LM_STUDIO_MODEL = os.getenv("LM_STUDIO_MODEL", "local-model")
 
+# /chat/stream: tokens per SSE event, or less if STREAM_FLUSH_MS passed since the last one
+STREAM_FLUSH_TOKENS = int(os.getenv("STREAM_FLUSH_TOKENS", "4"))
+STREAM_FLUSH_MS = float(os.getenv("STREAM_FLUSH_MS", "20"))
+
 # Call center system prompt
 SYSTEM_PROMPT = """Eres un asistente de atención al cliente profesional y amable para un call center.
 
@@ -51,6 +73,63 @@ INFORMACIÓN DEL SERVICIO:
 
 Responde de manera natural como si estuvieras hablando por teléfono."""
 
+# Context guidance appended to the system prompt
+ESCALATION_GUIDANCE = "IMPORTANT: El cliente necesita asistencia especializada. Ofrece transferir la llamada a un agente humano de manera proactiva y empática."
+TOOLS_ESCALATION_GUIDANCE = "IMPORTANT: Usa la función 'transfer_to_agent' proactivamente para ofrecer transferencia a un agente humano."
+CONFUSED_GUIDANCE = "IMPORTANT: El cliente parece confundido. Simplifica tu respuesta al máximo y ofrece explicaciones paso a paso."
+
+# Function schemas for /chat_with_tools
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "lookup_customer",
+            "description": "Buscar información del cliente en la base de datos",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "customer_id": {
+                        "type": "string",
+                        "description": "ID del cliente"
+                    }
+                },
+                "required": ["customer_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "schedule_callback",
+            "description": "Programar llamada de seguimiento",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "phone": {"type": "string"},
+                    "datetime": {"type": "string"},
+                    "reason": {"type": "string"}
+                },
+                "required": ["phone", "datetime"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "transfer_to_agent",
+            "description": "Transferir llamada a agente humano",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "department": {"type": "string"},
+                    "priority": {"type": "string"}
+                },
+                "required": ["department"]
+            }
+        }
+    }
+]
+
 
 # ===========================================
 # App Initialization
@@ -58,48 +137,125 @@ Responde de manera natural como si estuvieras hablando por teléfono."""
 app = FastAPI(
     title="LLM Service",
     description="LangChain-powered conversational AI for call center",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson encodes the context_analysis/history payloads in C
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
 )
 
 
 # ===========================================
 # Conversation Memory Store
 # ===========================================
-conversation_memories: Dict[str, List[Dict]] = {}
+# Redis (shared by every uvicorn worker) when CONVERSATION_REDIS_URL is set,
+# otherwise a bounded in-process LRU. Both expire idle conversations.
+CONVERSATION_REDIS_URL = os.getenv("CONVERSATION_REDIS_URL", "")
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "3600"))  # seconds since last message
+CONVERSATION_MAX_MESSAGES = 20  # messages kept per conversation
+CONTEXT_MESSAGES = 10  # recent messages sent to the LLM / used for context analysis
+CONVERSATION_MAX_LOCAL = int(os.getenv("CONVERSATION_MAX_LOCAL", "10000"))
+
+# Stored as raw bytes (orjson when installed): no str decode on LRANGE
+_redis = (
+    aioredis.from_url(CONVERSATION_REDIS_URL)
+    if REDIS_AVAILABLE and CONVERSATION_REDIS_URL else None
+)
+_dumps_message = orjson.dumps if ORJSON_AVAILABLE else (lambda entry: json.dumps(entry).encode())
+_loads_message = orjson.loads if ORJSON_AVAILABLE else json.loads
+if CONVERSATION_REDIS_URL and not REDIS_AVAILABLE:
+    logger.warning("CONVERSATION_REDIS_URL configurado pero redis no está instalado, usando memoria local")
+
+# conversation_id -> [last_used_monotonic, deque(maxlen=CONVERSATION_MAX_MESSAGES)], oldest first
+conversation_memories: "OrderedDict[str, list]" = OrderedDict()
+
+
+def _history_key(conversation_id: str) -> str:
+    return f"conv:{conversation_id}"
+
+
+def _local_history(conversation_id: str) -> Optional[deque]:
+    entry = conversation_memories.get(conversation_id)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] > CONVERSATION_TTL:
+        del conversation_memories[conversation_id]
+        return None
+    return entry[1]
+
+
+async def get_conversation_history(conversation_id: str, limit: Optional[int] = None) -> List[Dict]:
+    """Get the last `limit` messages (all kept messages if None; empty for new or expired conversations)"""
+    if _redis is not None:
+        items = await _redis.lrange(_history_key(conversation_id), -limit if limit else 0, -1)
+        return [_loads_message(item) for item in items]
+
+    history = _local_history(conversation_id)
+    if history is None:
+        return []
+    start = max(len(history) - limit, 0) if limit else 0
+    return list(islice(history, start, None))
+
+
+async def add_to_history(conversation_id: str, *messages: tuple):
+    """Append (role, content) messages, keeping the last CONVERSATION_MAX_MESSAGES"""
+    now = datetime.utcnow().isoformat()
+    entries = [{"role": role, "content": content, "timestamp": now} for role, content in messages]
+
+    if _redis is not None:
+        key = _history_key(conversation_id)
+        pipe = _redis.pipeline(transaction=False)
+        pipe.rpush(key, *(_dumps_message(entry) for entry in entries))
+        pipe.ltrim(key, -CONVERSATION_MAX_MESSAGES, -1)
+        pipe.expire(key, CONVERSATION_TTL)
+        await pipe.execute()
+        return
 
+    history = _local_history(conversation_id)
+    if history is None:
+        history = deque(maxlen=CONVERSATION_MAX_MESSAGES)
+    history.extend(entries)
+    conversation_memories[conversation_id] = [time.monotonic(), history]
+    conversation_memories.move_to_end(conversation_id)
+    while len(conversation_memories) > CONVERSATION_MAX_LOCAL:
+        conversation_memories.popitem(last=False)
 
-def get_conversation_history(conversation_id: str) -> List[Dict]:
-    """Get or create conversation history"""
-    if conversation_id not in conversation_memories:
-        conversation_memories[conversation_id] = []
-    return conversation_memories[conversation_id]
 
+_background_tasks: set = set()
 
-def add_to_history(conversation_id: str, role: str, content: str):
-    """Add message to conversation history"""
-    history = get_conversation_history(conversation_id)
-    history.append({
-        "role": role,
-        "content": content,
-        "timestamp": datetime.utcnow().isoformat()
-    })
-    # Keep last 20 messages for context window
-    if len(history) > 20:
-        conversation_memories[conversation_id] = history[-20:]
+
+def persist_in_background(conversation_id: str, *messages: tuple):
+    """add_to_history off the response path (task kept referenced until done)"""
+    task = asyncio.create_task(add_to_history(conversation_id, *messages))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def clear_history(conversation_id: str):
+    if _redis is not None:
+        await _redis.delete(_history_key(conversation_id))
+    conversation_memories.pop(conversation_id, None)
 
 
 # ===========================================
 # LLM Client
 # ===========================================
-def get_llm():
-    """Get LangChain LLM client configured for LM Studio"""
-    return ChatOpenAI(
-        base_url=LM_STUDIO_URL,
-        api_key="not-needed",  # LM Studio doesn't require API key
-        model=LM_STUDIO_MODEL,
-        temperature=0.7,
-        max_tokens=256,  # Keep responses short for voice
-    )
+_llm: Optional[ChatOpenAI] = None
+
+
+def get_llm() -> ChatOpenAI:
+    """
+    Get the shared LangChain LLM client configured for LM Studio (one instance,
+    so its underlying OpenAI/httpx clients keep connections to LM Studio alive)
+    """
+    global _llm
+    if _llm is None:
+        _llm = ChatOpenAI(
+            base_url=LM_STUDIO_URL,
+            api_key="not-needed",  # LM Studio doesn't require API key
+            model=LM_STUDIO_MODEL,
+            temperature=0.7,
+            max_tokens=256,  # Keep responses short for voice
+        )
+    return _llm
 
 
 # ===========================================
@@ -119,6 +275,17 @@ class ChatResponse(BaseModel):
 # ===========================================
 # Context Analysis
 # ===========================================
+FRUSTRATION_RE = re.compile(r"no funciona|problema|mal|otra vez|ya dije|no entiende")
+ESCALATION_RE = re.compile(r"hablar con|agente|humano|persona|supervisor|gerente")
+QUESTION_RE = re.compile(r"qué|cómo|cuál|dónde|por qué|cuándo")
+
+
+@lru_cache(maxsize=4096)
+def message_tokens(text: str) -> frozenset:
+    """Word set of a lowercased message, cached: history turns are re-scanned on every request"""
+    return frozenset(text.split())
+
+
 def analyze_conversation_context(history: List[Dict], current_message: str) -> Dict:
     """
     Analyze conversation flow to detect issues:
@@ -137,18 +304,19 @@ def analyze_conversation_context(history: List[Dict], current_message: str) -> D
         return analysis
 
     # Get last 5 user messages
-    user_messages = [msg["content"].lower() for msg in history[-10:] if msg["role"] == "user"]
+    user_messages = [msg["content"].lower() for msg in history[-CONTEXT_MESSAGES:] if msg["role"] == "user"]
     current_lower = current_message.lower()
 
     # 1. Detect repetition (user asking same thing multiple times)
     repetition_count = 0
+    curr_words = message_tokens(current_lower)
     for prev_msg in user_messages:
         # Check similarity (simple word overlap)
-        prev_words = set(prev_msg.split())
-        curr_words = set(current_lower.split())
-        overlap = len(prev_words & curr_words) / max(len(curr_words), 1)
+        overlap = len(message_tokens(prev_msg) & curr_words) / max(len(curr_words), 1)
         if overlap > 0.6:  # 60% word overlap
             repetition_count += 1
+            if repetition_count >= 2:
+                break  # threshold reached, the rest can't change the outcome
 
     if repetition_count >= 2:
         analysis["issues"].append("repeated_question")
@@ -156,9 +324,12 @@ def analyze_conversation_context(history: List[Dict], current_message: str) -> D
         analysis["suggested_action"] = "transfer_to_agent"
         analysis["confidence_level"] = 0.4
 
-    # 2. Detect frustration keywords in history
-    frustration_keywords = ["no funciona", "problema", "mal", "otra vez", "ya dije", "no entiende"]
-    frustration_count = sum(1 for msg in user_messages[-3:] for kw in frustration_keywords if kw in msg)
+    # 2. Detect frustration keywords in history (each distinct keyword per message counts once)
+    frustration_count = 0
+    for msg in user_messages[-3:]:
+        frustration_count += len(set(FRUSTRATION_RE.findall(msg)))
+        if frustration_count >= 2:
+            break
 
     if frustration_count >= 2:
         analysis["issues"].append("user_frustrated")
@@ -167,16 +338,14 @@ def analyze_conversation_context(history: List[Dict], current_message: str) -> D
         analysis["confidence_level"] = 0.3
 
     # 3. Detect explicit escalation requests
-    escalation_keywords = ["hablar con", "agente", "humano", "persona", "supervisor", "gerente"]
-    if any(kw in current_lower for kw in escalation_keywords):
+    if ESCALATION_RE.search(current_lower):
         analysis["issues"].append("explicit_escalation_request")
         analysis["needs_escalation"] = True
         analysis["suggested_action"] = "transfer_to_agent"
         analysis["confidence_level"] = 0.2
 
     # 4. Detect confusion (many questions in a row)
-    question_keywords = ["qué", "cómo", "cuál", "dónde", "por qué", "cuándo"]
-    recent_questions = sum(1 for msg in user_messages[-4:] if any(kw in msg for kw in question_keywords))
+    recent_questions = sum(1 for msg in user_messages[-4:] if QUESTION_RE.search(msg))
 
     if recent_questions >= 3:
         analysis["issues"].append("user_confused")
@@ -185,9 +354,80 @@ def analyze_conversation_context(history: List[Dict], current_message: str) -> D
     return analysis
 
 
+def build_chat_messages(request: "ChatRequest", history: List[Dict]) -> tuple:
+    """System prompt with sentiment/context guidance + last 10 turns + current message"""
+    context_analysis = analyze_conversation_context(history, request.message)
+
+    # System prompt with sentiment/context guidance
+    system = system_message(
+        SYSTEM_PROMPT,
+        sentiment_guidance(request),
+        ESCALATION_GUIDANCE if context_analysis["needs_escalation"] else None,
+        "user_confused" in context_analysis["issues"]
+    )
+
+    # System prompt + last 10 history messages + current message
+    messages = build_lc_messages(system, history, request.message)
+    return messages, context_analysis
+
+
+def sentiment_guidance(request: "ChatRequest") -> Optional[str]:
+    """Sentiment guidance sent by the backend, if any"""
+    if request.context:
+        return request.context.get("sentiment_guidance") or None
+    return None
+
+
+@lru_cache(maxsize=256)
+def system_message(
+    prompt: str,
+    guidance: Optional[str] = None,
+    escalation: Optional[str] = None,
+    confused: bool = False
+) -> SystemMessage:
+    """
+    SystemMessage for a prompt + guidance combination.
+    Guidance comes from a small set of templates, so the joined prompt is built
+    once per combination and reused across requests.
+    """
+    parts = [prompt]
+    if guidance:
+        parts.append(f"GUIDANCE: {guidance}")
+    if escalation:
+        parts.append(escalation)
+    if confused:
+        parts.append(CONFUSED_GUIDANCE)
+    return SystemMessage(content="\n\n".join(parts))
+
+
+def build_lc_messages(system: SystemMessage, history: List[Dict], current_message: str) -> list:
+    """System message + last CONTEXT_MESSAGES history turns + current message"""
+    to_message = lc_message
+    return [
+        system,
+        *[to_message(msg["role"], msg["content"]) for msg in history[-CONTEXT_MESSAGES:]],
+        HumanMessage(content=current_message)
+    ]
+
+
+@lru_cache(maxsize=4096)
+def lc_message(role: str, content: str):
+    """
+    LangChain message for a history entry. Each turn is resent with the next
+    CONTEXT_MESSAGES requests, so the object is built once and reused.
+    """
+    return HumanMessage(content=content) if role == "user" else AIMessage(content=content)
+
+
 # ===========================================
 # Endpoints
 # ===========================================
+@app.on_event("startup")
+async def init_llm():
+    """Build the LLM client on startup so the first call doesn't pay for it"""
+    get_llm()
+
+
 @app.get("/health")
 async def health():
     """Health check"""
@@ -215,50 +455,18 @@ async def chat(request: ChatRequest):
         llm = get_llm()
 
         # Get conversation history
-        history = get_conversation_history(request.conversation_id)
-
-        # Analyze conversation context
-        context_analysis = analyze_conversation_context(history, request.message)
-
-        # Build system prompt with context guidance
-        system_prompt = SYSTEM_PROMPT
-
-        # Add sentiment guidance if provided
-        if request.context and "sentiment_guidance" in request.context:
-            sentiment_guidance = request.context["sentiment_guidance"]
-            if sentiment_guidance:
-                system_prompt += f"\n\nGUIDANCE: {sentiment_guidance}"
-
-        # Add context-aware guidance
-        if context_analysis["needs_escalation"]:
-            system_prompt += "\n\nIMPORTANT: El cliente necesita asistencia especializada. Ofrece transferir la llamada a un agente humano de manera proactiva y empática."
-
-        if "user_confused" in context_analysis["issues"]:
-            system_prompt += "\n\nIMPORTANT: El cliente parece confundido. Simplifica tu respuesta al máximo y ofrece explicaciones paso a paso."
-
-        # Build messages
-        messages = [SystemMessage(content=system_prompt)]
+        history = await get_conversation_history(request.conversation_id, limit=CONTEXT_MESSAGES)
+        messages, context_analysis = build_chat_messages(request, history)
 
-        # Add conversation history (last 10 messages)
-        for msg in history[-10:]:
-            if msg["role"] == "user":
-                messages.append(HumanMessage(content=msg["content"]))
-            else:
-                messages.append(AIMessage(content=msg["content"]))
-
-        # Add current message
-        messages.append(HumanMessage(content=request.message))
-
-        # Get response
-        response = llm.invoke(messages)
+        # Get response (async: the event loop keeps serving other calls meanwhile)
+        response = await llm.ainvoke(messages)
         ai_response = response.content
 
         # Clean up response for voice
         ai_response = clean_for_voice(ai_response)
 
         # Save to history
-        add_to_history(request.conversation_id, "user", request.message)
-        add_to_history(request.conversation_id, "assistant", ai_response)
+        await add_to_history(request.conversation_id, ("user", request.message), ("assistant", ai_response))
 
         # Return response with context analysis
         return ChatResponse(
@@ -271,50 +479,65 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# SSE frames are yielded as bytes so Starlette doesn't re-encode them
+SSE_DONE = b"data: [DONE]\n\n"
+
+
+def sse_event(data: str) -> bytes:
+    return b"data: " + data.encode() + b"\n\n"
+
+
 @app.post("/chat/stream")
 async def chat_stream(request: ChatRequest):
     """
     Stream chat response token by token using SSE
     Reduces perceived latency by sending tokens as they're generated
     """
-    async def generate() -> AsyncGenerator[str, None]:
+    async def generate() -> AsyncGenerator[bytes, None]:
         try:
             llm = get_llm()
             
-            # Build messages
-            messages = [SystemMessage(content=SYSTEM_PROMPT)]
-            
-            # Add conversation history
-            history = get_conversation_history(request.conversation_id)
-            for msg in history[-10:]:
-                if msg["role"] == "user":
-                    messages.append(HumanMessage(content=msg["content"]))
-                else:
-                    messages.append(AIMessage(content=msg["content"]))
+            # Same prompt as /chat (sentiment + context guidance)
+            history = await get_conversation_history(request.conversation_id, limit=CONTEXT_MESSAGES)
+            messages, _ = build_chat_messages(request, history)
             
-            # Add current message
-            messages.append(HumanMessage(content=request.message))
+            # User turn persisted while the model generates
+            persist_in_background(request.conversation_id, ("user", request.message))
             
             logger.info(f"Streaming response for conversation {request.conversation_id}")
             
-            # Stream tokens
-            full_response = ""
+            # Stream tokens, cleaned for voice as they arrive, batched into fewer
+            # SSE events (the first token goes out alone to keep time-to-first-token)
+            loop = asyncio.get_running_loop()
+            flush_interval = STREAM_FLUSH_MS / 1000
+            voice_stream = VoiceStreamCleaner()
+            parts = []
+            pending = 0
+            last_flush = loop.time()
             async for chunk in llm.astream(messages):
-                token = chunk.content
-                full_response += token
-                yield f"data: {token}\n\n"
+                token = voice_stream.feed(chunk.content)
+                if not token:
+                    continue
+                parts.append(token)
+                pending += 1
+                now = loop.time()
+                if len(parts) == pending or pending >= STREAM_FLUSH_TOKENS or now - last_flush >= flush_interval:
+                    yield sse_event(''.join(parts[-pending:]))
+                    pending = 0
+                    last_flush = now
+            if pending:
+                yield sse_event(''.join(parts[-pending:]))
             
-            # Clean and save to history
-            cleaned = clean_for_voice(full_response)
-            add_to_history(request.conversation_id, "user", request.message)
-            add_to_history(request.conversation_id, "assistant", cleaned)
+            # Save to history without holding back [DONE]
+            cleaned = "".join(parts).strip()
+            persist_in_background(request.conversation_id, ("assistant", cleaned))
             
-            yield "data: [DONE]\n\n"
+            yield SSE_DONE
             logger.info(f"Completed streaming for {request.conversation_id}")
             
         except Exception as e:
             logger.error(f"Streaming error: {e}")
-            yield f"data: [ERROR] {str(e)}\n\n"
+            yield sse_event(f"[ERROR] {str(e)}")
     
     return StreamingResponse(
         generate(),
@@ -333,91 +556,27 @@ async def chat_with_tools(request: ChatRequest):
         llm = get_llm()
 
         # Get conversation history
-        history = get_conversation_history(request.conversation_id)
+        history = await get_conversation_history(request.conversation_id, limit=CONTEXT_MESSAGES)
 
         # Analyze conversation context
         context_analysis = analyze_conversation_context(history, request.message)
 
         # Build system prompt with context guidance
-        system_prompt = SYSTEM_PROMPT
-
-        # Add sentiment guidance if provided
-        if request.context and "sentiment_guidance" in request.context:
-            sentiment_guidance = request.context["sentiment_guidance"]
-            if sentiment_guidance:
-                system_prompt += f"\n\nGUIDANCE: {sentiment_guidance}"
-
         # If escalation is needed, automatically suggest transfer
-        if context_analysis["needs_escalation"]:
-            system_prompt += "\n\nIMPORTANT: Usa la función 'transfer_to_agent' proactivamente para ofrecer transferencia a un agente humano."
-
-        # Define available tools
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "lookup_customer",
-                    "description": "Buscar información del cliente en la base de datos",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "customer_id": {
-                                "type": "string",
-                                "description": "ID del cliente"
-                            }
-                        },
-                        "required": ["customer_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "schedule_callback",
-                    "description": "Programar llamada de seguimiento",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "phone": {"type": "string"},
-                            "datetime": {"type": "string"},
-                            "reason": {"type": "string"}
-                        },
-                        "required": ["phone", "datetime"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "transfer_to_agent",
-                    "description": "Transferir llamada a agente humano",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "department": {"type": "string"},
-                            "priority": {"type": "string"}
-                        },
-                        "required": ["department"]
-                    }
-                }
-            }
-        ]
+        system = system_message(
+            SYSTEM_PROMPT,
+            sentiment_guidance(request),
+            TOOLS_ESCALATION_GUIDANCE if context_analysis["needs_escalation"] else None
+        )
 
         # Build messages
-        messages = [SystemMessage(content=system_prompt)]
-        for msg in history[-10:]:
-            if msg["role"] == "user":
-                messages.append(HumanMessage(content=msg["content"]))
-            else:
-                messages.append(AIMessage(content=msg["content"]))
-        messages.append(HumanMessage(content=request.message))
+        messages = build_lc_messages(system, history, request.message)
 
         # Get response (note: tool calling depends on model support)
-        response = llm.invoke(messages)
+        response = await llm.ainvoke(messages)
         ai_response = clean_for_voice(response.content)
 
-        add_to_history(request.conversation_id, "user", request.message)
-        add_to_history(request.conversation_id, "assistant", ai_response)
+        await add_to_history(request.conversation_id, ("user", request.message), ("assistant", ai_response))
 
         # Check if model returned tool calls (if supported)
         tool_calls = []
@@ -446,15 +605,26 @@ async def get_history(conversation_id: str):
     """Get conversation history"""
     return {
         "conversation_id": conversation_id,
-        "messages": get_conversation_history(conversation_id)
+        "messages": await get_conversation_history(conversation_id)
     }
 
 
+class HistoryAppendRequest(BaseModel):
+    messages: List[Dict[str, str]]
+
+
+@app.post("/conversation/{conversation_id}/history")
+async def append_history(conversation_id: str, request: HistoryAppendRequest):
+    """Append turns answered outside the LLM (e.g. backend response cache)"""
+    if request.messages:
+        await add_to_history(conversation_id, *((msg["role"], msg["content"]) for msg in request.messages))
+    return {"status": "appended", "count": len(request.messages)}
+
+
 @app.delete("/conversation/{conversation_id}")
 async def clear_conversation(conversation_id: str):
     """Clear conversation history"""
-    if conversation_id in conversation_memories:
-        del conversation_memories[conversation_id]
+    await clear_history(conversation_id)
     return {"status": "cleared"}
 
 
@@ -463,37 +633,62 @@ async def update_prompt(prompt: str):
     """Update the system prompt (for customization)"""
     global SYSTEM_PROMPT
     SYSTEM_PROMPT = prompt
+    system_message.cache_clear()
     return {"status": "updated"}
 
 
 # ===========================================
 # Utilities
 # ===========================================
+_MARKDOWN_RE = re.compile(r"[*`]+")
+_BULLET_RE = re.compile(r"^[ \t]*[-•][ \t]*", re.MULTILINE)
+_WS_RE = re.compile(r"\s+")
+
+
 def clean_for_voice(text: str) -> str:
     """Clean text for TTS output"""
-    # Remove markdown formatting
-    text = text.replace("**", "").replace("*", "")
-    text = text.replace("```", "").replace("`", "")
-    
-    # Remove bullet points
-    lines = text.split("\n")
-    cleaned_lines = []
-    for line in lines:
-        line = line.strip()
-        if line.startswith("-") or line.startswith("•"):
-            line = line[1:].strip()
-        if line.startswith("*"):
-            line = line[1:].strip()
-        if line:
-            cleaned_lines.append(line)
-    
-    text = " ".join(cleaned_lines)
-    
-    # Remove multiple spaces
-    while "  " in text:
-        text = text.replace("  ", " ")
-    
-    return text.strip()
+    # Remove markdown formatting, then bullet points, then join lines / collapse spaces
+    text = _MARKDOWN_RE.sub("", text)
+    text = _BULLET_RE.sub("", text)
+    return _WS_RE.sub(" ", text).strip()
+
+
+class VoiceStreamCleaner:
+    """
+    Incremental clean_for_voice for streamed tokens: drops markdown markers and
+    bullets at line starts, and turns newlines into single spaces (also keeps
+    tokens SSE-safe, a raw newline would split the data: line).
+    """
+
+    __slots__ = ("line_start", "last_space")
+
+    def __init__(self):
+        self.line_start = True
+        self.last_space = True
+
+    def feed(self, token: str) -> str:
+        out = []
+        for ch in token:
+            if ch in "*`":
+                continue
+            if ch == "\n":
+                self.line_start = True
+                ch = " "
+            elif self.line_start:
+                if ch in " \t":
+                    continue
+                self.line_start = False
+                if ch in "-•":
+                    continue
+            if ch in " \t":
+                if self.last_space:
+                    continue
+                ch = " "
+                self.last_space = True
+            else:
+                self.last_space = False
+            out.append(ch)
+        return "".join(out)
 
 
 if __name__ == "__main__":
@@ -129,7 +129,7 @@ class CorrectionPipeline:
         Target: Máxima precisión, sin límite de tiempo
         """
         import time
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
 
         result = {
             "text": transcription,
@@ -194,8 +194,7 @@ class CorrectionPipeline:
             result["clarification_type"] = clarification.get("type")
 
         # Estadísticas
-        end_time = time.time()
-        result["processing_time_ms"] = (end_time - start_time) * 1000
+        result["processing_time_ms"] = (time.perf_counter_ns() - start_ns) / 1_000_000
 
         self.stats["offline_corrections"] += len(result["corrections_made"])
         self.stats["total_processed"] += 1
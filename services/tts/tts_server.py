@@ -14,7 +14,7 @@ import io
 import base64
 import uuid
 import hashlib
-from typing import Optional, Dict
+from typing import Optional, Dict, Literal
 from pathlib import Path
 from collections import OrderedDict
 
@@ -180,6 +180,30 @@ class SynthesizeRequest(BaseModel):
     reference_text: Optional[str] = None   # Transcript of reference audio
     speed: float = 1.0
     return_bytes: bool = False
+    # Only with return_bytes: "wav" or "slin" (raw 16-bit little-endian PCM, Asterisk AudioSocket)
+    format: Literal["wav", "slin"] = "wav"
+    sample_rate: Optional[int] = None  # Resample to this rate (e.g. 8000 for telephony)
+
+
+def audio_bytes_response(audio: np.ndarray, sample_rate: int, request: SynthesizeRequest) -> Response:
+    """Raw audio response in the format/sample rate the caller plays natively"""
+    if request.sample_rate and request.sample_rate != sample_rate:
+        from scipy.signal import resample_poly
+        g = np.gcd(int(request.sample_rate), int(sample_rate))
+        audio = resample_poly(audio, request.sample_rate // g, sample_rate // g)
+        sample_rate = request.sample_rate
+
+    duration_ms = int(len(audio) * 1000 / sample_rate)
+    headers = {"X-Audio-Duration-Ms": str(duration_ms), "X-Sample-Rate": str(sample_rate)}
+
+    if request.format == "slin":
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+        return Response(content=pcm.tobytes(), media_type="audio/L16", headers=headers)
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sample_rate, format='WAV')
+    return Response(content=buffer.getvalue(), media_type="audio/wav", headers=headers)
+
 
 class SynthesizeResponse(BaseModel):
     audio_url: Optional[str] = None
@@ -253,9 +277,7 @@ async def _synthesize_kokoro(request: SynthesizeRequest):
         duration = len(audio) / sample_rate
 
         if request.return_bytes:
-            buffer = io.BytesIO()
-            sf.write(buffer, audio, sample_rate, format='WAV')
-            return Response(content=buffer.getvalue(), media_type="audio/wav")
+            return audio_bytes_response(audio, sample_rate, request)
 
         # Save to file
         audio_id = str(uuid.uuid4())
@@ -337,9 +359,7 @@ async def _synthesize_f5(request: SynthesizeRequest):
         duration = len(audio) / sample_rate
 
         if request.return_bytes:
-            buffer = io.BytesIO()
-            sf.write(buffer, audio, sample_rate, format='WAV')
-            return Response(content=buffer.getvalue(), media_type="audio/wav")
+            return audio_bytes_response(audio, sample_rate, request)
 
         # Save to file
         audio_id = str(uuid.uuid4())